@@ -0,0 +1,438 @@
+"""
+Benchmark aplikacji na syntetycznych danych.
+
+    python benchmark.py generate --rows 100000     #tworzy bazę testową i wypełnia ją danymi
+    python benchmark.py run --output wyniki.json   #mierzy czasy i zapisuje wyniki jako JSON
+    python benchmark.py compare stare.json nowe.json
+
+Dane trafiają do osobnej bazy (domyślnie `<DB_NAME>_benchmark`), zakładanej od nowa przy każdym
+`generate` - bez wyzwalaczy i procedur, żeby wczytywanie milionów wierszy nie uruchamiało logiki biznesowej.
+`--rows` to liczba przesyłek (rozsądnie 10 tys. - 10 mln); pozostałe tabele skalowane są proporcjonalnie.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+import mysql.connector
+from dotenv import load_dotenv
+from db_pool import get_pool
+import delivery_rollup
+import report_cache
+
+load_dotenv()
+
+DEFAULT_DATABASE = f"{os.getenv('DB_NAME')}_benchmark"
+INSERT_BATCH_SIZE = 5000 #liczba wierszy w jednym INSERT (executemany) i jednej transakcji
+STATES_PER_SHIPMENT = 3 #liczba wpisów w opis_stanu_przesylki na przesyłkę
+POSITIONS = ["Kurier", "Kurier", "Kurier", "Magazynier", "Dostawca", "Kierownik"]
+FIRST_NAMES = ["Jan", "Anna", "Marek", "Kasia", "Piotr", "Ewa", "Tomasz", "Agnieszka", "Rafał", "Justyna"]
+LAST_NAMES = ["Kowalski", "Nowak", "Zieliński", "Wójcik", "Wiśniewski", "Kaczmarek", "Dąb", "Maj", "Kwiat", "Kosa"]
+CITIES = ["Warszawa", "Kraków", "Bydgoszcz", "Olsztyn", "Katowice", "Szczecin", "Opole", "Lublin", "Gdańsk", "Poznań"]
+PAYMENT_METHODS = ["BLIK", "przelew", "karta", "gotówka"]
+SIZES = ["S", "M", "L", "XL"]
+DATA_START = datetime(2024, 1, 1)
+
+#schemat zgodny z docs/dokumentacja_projektu.pdf (tabele używane przez main.py i raport.py)
+SCHEMA = [
+    """
+    CREATE TABLE `stan_przesyłki` (
+        `ID_stanu` int(10) NOT NULL AUTO_INCREMENT,
+        `stan` varchar(255) NOT NULL,
+        `opis` varchar(255) NOT NULL,
+        PRIMARY KEY (`ID_stanu`)
+    )""",
+    """
+    CREATE TABLE `pracownik` (
+        `ID_pracownika` int(10) NOT NULL AUTO_INCREMENT,
+        `imię` varchar(255) NOT NULL,
+        `nazwisko` varchar(255) NOT NULL,
+        `numer_tel` varchar(20) NOT NULL,
+        `stanowisko` varchar(255) NOT NULL,
+        `pensja` float NOT NULL,
+        `ID_przełożonego` int(10),
+        PRIMARY KEY (`ID_pracownika`),
+        FOREIGN KEY (`ID_przełożonego`) REFERENCES `pracownik` (`ID_pracownika`)
+    )""",
+    """
+    CREATE TABLE `kurier` (
+        `ID_pracownika` int(10) NOT NULL,
+        `obszar_działania` varchar(255) NOT NULL,
+        `kod_pocztowy_od` varchar(6),
+        `kod_pocztowy_do` varchar(6),
+        `ID_kuriera` int(10) NOT NULL AUTO_INCREMENT,
+        PRIMARY KEY (`ID_kuriera`),
+        FOREIGN KEY (`ID_pracownika`) REFERENCES `pracownik` (`ID_pracownika`)
+    )""",
+    """
+    CREATE TABLE `nadawca` (
+        `ID_nadawcy` int(10) NOT NULL AUTO_INCREMENT,
+        `imię` varchar(255) NOT NULL,
+        `nazwisko` varchar(255) NOT NULL,
+        `email` varchar(255) NOT NULL,
+        `nr_tel` varchar(20) NOT NULL,
+        `miasto` varchar(255) NOT NULL,
+        `ulica` varchar(255) NOT NULL,
+        `kod_pocztowy` varchar(6) NOT NULL,
+        PRIMARY KEY (`ID_nadawcy`)
+    )""",
+    """
+    CREATE TABLE `adresat` (
+        `ID_adresata` int(10) NOT NULL AUTO_INCREMENT,
+        `imię` varchar(255) NOT NULL,
+        `nazwisko` varchar(255) NOT NULL,
+        `email` varchar(255) NOT NULL,
+        `nr_tel` varchar(20) NOT NULL,
+        `miasto` varchar(255) NOT NULL,
+        `ulica` varchar(255) NOT NULL,
+        `kod_pocztowy` varchar(6) NOT NULL,
+        PRIMARY KEY (`ID_adresata`)
+    )""",
+    """
+    CREATE TABLE `rachunek` (
+        `ID_rachunku` int(10) NOT NULL AUTO_INCREMENT,
+        `data_wystawienia` datetime NOT NULL,
+        `kwota` float NOT NULL,
+        `forma_platnosci` varchar(255) NOT NULL,
+        `status_platnosci` varchar(255) NOT NULL,
+        `data_oplacenia` datetime NULL,
+        PRIMARY KEY (`ID_rachunku`)
+    )""",
+    """
+    CREATE TABLE `przesylka` (
+        `ID_przesyłki` int(10) NOT NULL AUTO_INCREMENT,
+        `waga` float NOT NULL,
+        `rozmiar` varchar(2) NOT NULL,
+        `ID_nadawcy` int(10) NOT NULL,
+        `ID_adresata` int(10) NOT NULL,
+        `ID_rachunku` int(10) NOT NULL,
+        PRIMARY KEY (`ID_przesyłki`),
+        FOREIGN KEY (`ID_nadawcy`) REFERENCES `nadawca` (`ID_nadawcy`),
+        FOREIGN KEY (`ID_adresata`) REFERENCES `adresat` (`ID_adresata`),
+        FOREIGN KEY (`ID_rachunku`) REFERENCES `rachunek` (`ID_rachunku`)
+    )""",
+    """
+    CREATE TABLE `opis_stanu_przesylki` (
+        `ID_opisu_stanu` int(10) NOT NULL AUTO_INCREMENT,
+        `data_zmiany_stanu` datetime NOT NULL,
+        `lokalizacja_paczki` varchar(255),
+        `ID_przesyłki` int(10) NOT NULL,
+        `ID_stanu` int(10) NOT NULL,
+        `ID_magazynu` int(10),
+        PRIMARY KEY (`ID_opisu_stanu`),
+        FOREIGN KEY (`ID_przesyłki`) REFERENCES `przesylka` (`ID_przesyłki`),
+        FOREIGN KEY (`ID_stanu`) REFERENCES `stan_przesyłki` (`ID_stanu`)
+    )""",
+    """
+    CREATE TABLE `realizacja_dostawy` (
+        `data_przypisania` datetime NOT NULL,
+        `ID_kuriera` int(10) NOT NULL,
+        `ID_przesyłki` int(10) NOT NULL,
+        `data_zakonczenia` datetime NULL,
+        FOREIGN KEY (`ID_kuriera`) REFERENCES `kurier` (`ID_kuriera`),
+        FOREIGN KEY (`ID_przesyłki`) REFERENCES `przesylka` (`ID_przesyłki`)
+    )""",
+]
+
+#kolejność usuwania (odwrotna do zależności kluczy obcych)
+TABLES = ["realizacja_dostawy", "opis_stanu_przesylki", "przesylka", "rachunek", "adresat", "nadawca",
+          "kurier", "pracownik", "stan_przesyłki"]
+
+
+def table_sizes(rows): #liczba wierszy w każdej tabeli dla `rows` przesyłek
+    return {
+        "stan_przesyłki": 15,
+        "pracownik": max(100, rows // 200),
+        "nadawca": max(1000, rows // 5),
+        "adresat": max(1000, rows // 5),
+        "rachunek": rows,
+        "przesylka": rows,
+        "opis_stanu_przesylki": rows * STATES_PER_SHIPMENT,
+        "realizacja_dostawy": rows,
+    }
+
+
+def _random_date(rng):
+    return DATA_START + timedelta(minutes=rng.randrange(365 * 24 * 60))
+
+
+def _postal_code(rng):
+    return f"{rng.randrange(100):02d}-{rng.randrange(1000):03d}"
+
+
+def _people(rng, count): #wiersze dla nadawcy / adresata
+    for i in range(1, count + 1):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (i, first_name, f"{last_name}{i}", f"osoba{i}@example.com", f"{rng.randrange(10 ** 9):09d}",
+               rng.choice(CITIES), f"Ulica {rng.randrange(1, 200)}", _postal_code(rng))
+
+
+def _employees(rng, count):
+    for i in range(1, count + 1):
+        supervisor = rng.randrange(1, i) if i > 1 else None
+        yield (i, rng.choice(FIRST_NAMES), f"{rng.choice(LAST_NAMES)}{i}", f"{rng.randrange(10 ** 9):09d}",
+               POSITIONS[i % len(POSITIONS)], round(rng.uniform(3500, 12000), 2), supervisor)
+
+
+def _couriers(employee_count):
+    courier_id = 0
+    for employee_id in range(1, employee_count + 1):
+        if POSITIONS[employee_id % len(POSITIONS)] == "Kurier":
+            courier_id += 1
+            region = courier_id % 100
+            yield employee_id, f"Obszar {region}", f"{region:02d}-000", f"{region:02d}-999", courier_id
+
+
+def _invoices(rng, count):
+    for i in range(1, count + 1):
+        issued = _random_date(rng)
+        paid = rng.random() < 0.9
+        yield (i, issued, round(rng.uniform(8, 60), 2), rng.choice(PAYMENT_METHODS),
+               "opłacona" if paid else "nieopłacona", issued + timedelta(hours=rng.randrange(1, 48)) if paid else None)
+
+
+def _shipments(rng, count, senders, recipients):
+    for i in range(1, count + 1):
+        yield (i, round(rng.uniform(0.1, 30), 2), rng.choice(SIZES),
+               rng.randrange(1, senders + 1), rng.randrange(1, recipients + 1), i)
+
+
+def _state_descriptions(rng, count):
+    for shipment_id in range(1, count + 1):
+        changed = _random_date(rng)
+        for state_id in range(1, STATES_PER_SHIPMENT + 1):
+            yield changed, f"lokalizacja {state_id}", shipment_id, state_id, None
+            changed += timedelta(hours=rng.randrange(1, 72))
+
+
+def _deliveries(rng, count, couriers):
+    for shipment_id in range(1, count + 1):
+        assigned = _random_date(rng)
+        finished = assigned + timedelta(hours=rng.randrange(2, 96)) if rng.random() < 0.9 else None
+        yield assigned, rng.randrange(1, couriers + 1), shipment_id, finished
+
+
+def _insert(pool, query, rows, batch_size=INSERT_BATCH_SIZE): #wstawia wiersze partiami, każda partia w osobnej transakcji
+    inserted = 0
+    batch = []
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    cursor.executemany(query, batch)
+                    connection.commit()
+                    inserted += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(query, batch)
+                connection.commit()
+                inserted += len(batch)
+    return inserted
+
+
+def generate(database, rows, seed=0, batch_size=INSERT_BATCH_SIZE):
+    """Zakłada od nowa bazę `database` i wypełnia ją danymi dla `rows` przesyłek. Zwraca liczby wierszy."""
+    rng = random.Random(seed)
+    sizes = table_sizes(rows)
+
+    server = mysql.connector.connect(host=os.getenv("DB_HOST"), port=int(os.getenv("DB_PORT")),
+                                     user=os.getenv("DB_USER"), password=os.getenv("DB_PASSWORD"))
+    try:
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{database}`;")
+            cursor.execute(f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_polish_ci;")
+    finally:
+        server.close()
+
+    pool = get_pool(database=database)
+    with pool.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+    counts = {}
+    started = time.perf_counter()
+    counts["stan_przesyłki"] = _insert(pool, "INSERT INTO `stan_przesyłki` (`ID_stanu`, `stan`, `opis`) VALUES (%s, %s, %s)",
+                                       ((i, f"Stan {i}", f"Opis stanu {i}") for i in range(1, sizes["stan_przesyłki"] + 1)),
+                                       batch_size)
+    counts["pracownik"] = _insert(pool, "INSERT INTO `pracownik` VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                                  _employees(rng, sizes["pracownik"]), batch_size)
+    counts["kurier"] = _insert(pool, "INSERT INTO `kurier` VALUES (%s, %s, %s, %s, %s)",
+                               _couriers(sizes["pracownik"]), batch_size)
+    counts["nadawca"] = _insert(pool, "INSERT INTO `nadawca` VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                                _people(rng, sizes["nadawca"]), batch_size)
+    counts["adresat"] = _insert(pool, "INSERT INTO `adresat` VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                                _people(rng, sizes["adresat"]), batch_size)
+    counts["rachunek"] = _insert(pool, "INSERT INTO `rachunek` VALUES (%s, %s, %s, %s, %s, %s)",
+                                 _invoices(rng, sizes["rachunek"]), batch_size)
+    counts["przesylka"] = _insert(pool, "INSERT INTO `przesylka` VALUES (%s, %s, %s, %s, %s, %s)",
+                                  _shipments(rng, sizes["przesylka"], sizes["nadawca"], sizes["adresat"]), batch_size)
+    counts["opis_stanu_przesylki"] = _insert(
+        pool,
+        "INSERT INTO `opis_stanu_przesylki` (`data_zmiany_stanu`, `lokalizacja_paczki`, `ID_przesyłki`, `ID_stanu`, `ID_magazynu`) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        _state_descriptions(rng, sizes["przesylka"]), batch_size)
+    counts["realizacja_dostawy"] = _insert(pool, "INSERT INTO `realizacja_dostawy` VALUES (%s, %s, %s, %s)",
+                                           _deliveries(rng, sizes["przesylka"], counts["kurier"]), batch_size)
+    counts["dostawy_dzienne"] = delivery_rollup.install(pool) #podsumowanie dla raportu z wykresem
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Wstawiono {total} wierszy w {elapsed:.1f} s ({total / elapsed:.0f} wierszy/s).")
+    return counts
+
+
+def measure(func, repeat): #czasy kolejnych wywołań funkcji w sekundach
+    times = []
+    for _ in range(repeat):
+        #każde powtórzenie od zera - bez pamięci podręcznej raportów mierzony byłby tylko jej odczyt
+        report_cache.cache.clear()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return {
+        "runs": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "max": max(times),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(database, repeat=3, full_scans=True):
+    """
+    Mierzy czasy operacji aplikacji na bazie `database`: DatabaseManager.get_data / get_page,
+    podpowiedzi kluczy obcych i trzy raporty (generowane do pamięci). Zwraca słownik z wynikami.
+    """
+    os.environ["DB_NAME"] = database #raport.py korzysta z domyślnej puli (parametry z .env)
+    import raport
+    from main import DatabaseManager
+
+    manager = DatabaseManager(os.getenv("DB_HOST"), int(os.getenv("DB_PORT")), os.getenv("DB_USER"),
+                              os.getenv("DB_PASSWORD"), database)
+    with manager.pool.cursor() as cursor:
+        counts = {}
+        for table in TABLES:
+            cursor.execute(f"SELECT COUNT(*) FROM `{table}`;")
+            counts[table] = cursor.fetchone()[0]
+        cursor.execute("SELECT VERSION();")
+        server_version = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(`ID_przesyłki`), MIN(DATE(`data_zakonczenia`)), MAX(DATE(`data_zakonczenia`)) "
+                       "FROM `realizacja_dostawy`;")
+        shipment_id, start_date, end_date = cursor.fetchone()
+
+    benchmarks = {}
+    for table in TABLES:
+        if full_scans:
+            benchmarks[f"get_data[{table}]"] = lambda table=table: manager.get_data(table)
+        primary_key = manager.get_primary_key(table)
+        if primary_key:
+            benchmarks[f"get_page[{table}]"] = lambda table=table, key=primary_key: manager.get_page(table, key)
+    benchmarks.update({
+        "fk_lookup[przesylka.ID_nadawcy:prefix]": lambda: manager.search_foreign_key_options("przesylka", "ID_nadawcy", "Now"),
+        "fk_lookup[przesylka.ID_nadawcy:key]": lambda: manager.search_foreign_key_options("przesylka", "ID_nadawcy", "5000"),
+        "fk_lookup[przesylka.ID_adresata:empty]": lambda: manager.search_foreign_key_options("przesylka", "ID_adresata"),
+        "fk_lookup[realizacja_dostawy.ID_kuriera:key]": lambda: manager.search_foreign_key_options("realizacja_dostawy", "ID_kuriera", "1"),
+        "report[1:grupowanie]": lambda: raport.render_report_bytes("1"),
+        "report[1:grupowanie:stream]": lambda: raport.generate_grouped_report(output_path=_NullBuffer(), streaming=True),
+        "report[2:wykres]": lambda: raport.render_report_bytes("2", str(start_date), str(end_date)),
+        "report[3:formularz]": lambda: raport.render_report_bytes("3", shipment_id),
+    })
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = measure(func, repeat)
+        print(f"{name:50} {results[name]['median'] * 1000:10.1f} ms")
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "database": database,
+        "server_version": server_version,
+        "python": platform.python_version(),
+        "table_rows": counts,
+        "results": results,
+    }
+
+
+class _NullBuffer: #plik, który tylko zlicza zapisane bajty (raport strumieniowy bez trzymania PDF w pamięci)
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def compare(old_path, new_path, threshold=1.2):
+    """Porównuje dwa pliki wyników (mediany). Zwraca liczbę pomiarów wolniejszych o więcej niż `threshold` razy."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name]["median"] / old[name]["median"] if old[name]["median"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- wolniej"
+            regressions += 1
+        print(f"{name:50} {old[name]['median'] * 1000:10.1f} ms -> {new[name]['median'] * 1000:10.1f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark aplikacji na syntetycznych danych.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="utwórz bazę testową z syntetycznymi danymi")
+    generate_parser.add_argument("--rows", type=int, default=10_000, help="liczba przesyłek (10 tys. - 10 mln)")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE)
+    generate_parser.add_argument("--database", default=DEFAULT_DATABASE)
+
+    run_parser = commands.add_parser("run", help="zmierz czasy operacji i zapisz wyniki jako JSON")
+    run_parser.add_argument("--database", default=DEFAULT_DATABASE)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--no-full-scans", action="store_true", help="pomiń get_data (SELECT * całych tabel)")
+    run_parser.add_argument("--output", default=None, help="plik wyników (domyślnie benchmark_<commit>_<czas>.json)")
+
+    compare_parser = commands.add_parser("compare", help="porównaj dwa pliki wyników")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.2, help="dopuszczalny stosunek median")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate(args.database, args.rows, args.seed, args.batch_size)
+    elif args.command == "run":
+        result = run(args.database, args.repeat, full_scans=not args.no_full_scans)
+        output = args.output
+        if output is None:
+            commit = (result["commit"] or "brak")[:8]
+            output = f"benchmark_{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Wyniki zapisano w '{output}'.")
+    elif args.command == "compare":
+        return 1 if compare(args.old, args.new, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Dziennik zmian wierszy (tabela zmiany_wierszy) dla odświeżania otwartej tabeli na żywo.
+
+    python change_log.py --install [tabela ...]   #tworzy dziennik i wyzwalacze (domyślnie przesylka, opis_stanu_przesylki)
+    python change_log.py --uninstall [tabela ...] #usuwa wyzwalacze (dziennik zostaje)
+    python change_log.py --prune DNI              #usuwa wpisy starsze niż DNI dni
+
+Wyzwalacze AFTER INSERT / UPDATE / DELETE zapisują w dzienniku klucz główny zmienionego wiersza.
+Kolejne id wpisów są znacznikiem postępu (watermark): okno przeglądania pamięta ostatnie
+odczytane id i przy każdym odświeżeniu pobiera tylko klucze zmienione od tego czasu, a potem
+same te wiersze. Dla tabel bez wyzwalaczy znacznikiem jest klucz AUTO_INCREMENT (tylko nowe wiersze).
+"""
+import argparse
+import sys
+from mysql.connector import Error
+from db_pool import get_pool
+from schema_catalog import SchemaCatalog
+
+CHANGE_LOG_TABLE = "zmiany_wierszy"
+TRACKED_TABLES = ("przesylka", "opis_stanu_przesylki") #tabele otwarte przez dyspozytorów przez cały dzień
+TRIGGER_PREFIX = "trg_zmiany_"
+CHANGES_LIMIT = 500 #najwięcej zmian odczytywanych przy jednym odświeżeniu (reszta przy kolejnych)
+
+CREATE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS `{CHANGE_LOG_TABLE}` (
+    `id` bigint NOT NULL AUTO_INCREMENT,
+    `tabela` varchar(64) NOT NULL,
+    `klucz` varchar(255) NOT NULL,
+    `zmieniono` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`),
+    KEY `idx_zmiany_tabela` (`tabela`, `id`)
+)"""
+
+#klucze zmienione po znaczniku; ten sam wiersz zmieniony kilka razy zwracany jest raz (wystarczy go odczytać)
+CHANGES_QUERY = f"""
+SELECT MAX(`id`) AS id, `klucz`
+FROM (
+    SELECT `id`, `klucz` FROM `{CHANGE_LOG_TABLE}`
+    WHERE `tabela` = %s AND `id` > %s
+    ORDER BY `id`
+    LIMIT %s
+) ostatnie
+GROUP BY `klucz`
+ORDER BY id;
+"""
+
+
+def _trigger_name(table_name, event):
+    return f"{TRIGGER_PREFIX}{table_name}_{event}"[:64]
+
+
+def triggers(table_name, key_column):
+    """Instrukcje CREATE TRIGGER dla tabeli: nazwa -> instrukcja."""
+    log = f"INSERT INTO `{CHANGE_LOG_TABLE}` (`tabela`, `klucz`) VALUES ('{table_name}', {{}}.`{key_column}`);"
+    return {
+        _trigger_name(table_name, "insert"): f"""
+        CREATE TRIGGER `{_trigger_name(table_name, "insert")}` AFTER INSERT ON `{table_name}`
+        FOR EACH ROW {log.format("NEW")}""",
+        #zmiana klucza głównego: stary klucz znika, nowy się pojawia - zapisywane są oba
+        _trigger_name(table_name, "update"): f"""
+        CREATE TRIGGER `{_trigger_name(table_name, "update")}` AFTER UPDATE ON `{table_name}`
+        FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.`{key_column}` <=> NEW.`{key_column}`) THEN
+                {log.format("OLD")}
+            END IF;
+            {log.format("NEW")}
+        END""",
+        _trigger_name(table_name, "delete"): f"""
+        CREATE TRIGGER `{_trigger_name(table_name, "delete")}` AFTER DELETE ON `{table_name}`
+        FOR EACH ROW {log.format("OLD")}""",
+    }
+
+
+def _key_column(schema, table_name):
+    if not schema.has_table(table_name):
+        raise ValueError(f"Tabela {table_name} nie istnieje.")
+    key = schema.primary_key(table_name)
+    if len(key) != 1:
+        raise ValueError(f"Dziennik zmian wymaga jednokolumnowego klucza głównego (tabela {table_name}).")
+    return key[0]
+
+
+def install(tables=TRACKED_TABLES, pool=None, schema=None):
+    """Tworzy dziennik i wyzwalacze dla podanych tabel (istniejące wyzwalacze są zastępowane)."""
+    pool = pool or get_pool()
+    schema = schema or SchemaCatalog(pool)
+    statements = {table_name: triggers(table_name, _key_column(schema, table_name)) for table_name in tables}
+    with pool.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for table_triggers in statements.values():
+            for name, statement in table_triggers.items():
+                cursor.execute(f"DROP TRIGGER IF EXISTS `{name}`;")
+                cursor.execute(statement)
+
+
+def uninstall(tables=TRACKED_TABLES, pool=None):
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        for table_name in tables:
+            for event in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS `{_trigger_name(table_name, event)}`;")
+
+
+def tracked_tables(pool=None): #tabele, dla których istnieją wyzwalacze dziennika
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT EVENT_OBJECT_TABLE FROM information_schema.TRIGGERS "
+            "WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME LIKE %s;", (f"{TRIGGER_PREFIX}%",))
+        return {row[0] for row in cursor.fetchall()}
+
+
+def watermark(pool=None): #id ostatniego wpisu w dzienniku (0, gdy pusty)
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(`id`), 0) FROM `{CHANGE_LOG_TABLE}`;")
+        return cursor.fetchone()[0]
+
+
+def prune(days, pool=None): #usuwa wpisy starsze niż `days` dni; zwraca liczbę usuniętych
+    pool = pool or get_pool()
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM `{CHANGE_LOG_TABLE}` WHERE `zmieniono` < NOW() - INTERVAL %s DAY;", (days,))
+            connection.commit()
+            return cursor.rowcount
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dziennik zmian wierszy dla odświeżania na żywo.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--install", nargs="*", metavar="TABELA", help="utwórz dziennik i wyzwalacze")
+    group.add_argument("--uninstall", nargs="*", metavar="TABELA", help="usuń wyzwalacze")
+    group.add_argument("--prune", type=int, metavar="DNI", help="usuń wpisy starsze niż DNI dni")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.install is not None:
+            tables = args.install or TRACKED_TABLES
+            install(tables)
+            print(f"Utworzono dziennik {CHANGE_LOG_TABLE} i wyzwalacze dla tabel: {', '.join(tables)}.")
+        elif args.uninstall is not None:
+            tables = args.uninstall or TRACKED_TABLES
+            uninstall(tables)
+            print(f"Usunięto wyzwalacze dziennika dla tabel: {', '.join(tables)}.")
+        else:
+            print(f"Usunięto {prune(args.prune)} wpisów z dziennika {CHANGE_LOG_TABLE}.")
+    except ValueError as e:
+        print(e)
+        return 2
+    except Error as e:
+        print(f"Błąd bazy danych: {e}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Masowy import wierszy z pliku CSV do dowolnej tabeli.
+
+    python csv_import.py <tabela> <plik.csv> [--batch-size N] [--delimiter ;] [--encoding utf-8]
+
+Pierwszy wiersz pliku to nazwy kolumn tabeli. Plik czytany jest strumieniowo, a wiersze
+wstawiane partiami (executemany) - każda partia w osobnej transakcji. Błędny wiersz nie przerywa
+importu: partia z błędem jest wstawiana ponownie wiersz po wierszu, a błędy zbierane w wyniku.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from mysql.connector import Error
+from dotenv import load_dotenv
+from db_pool import get_pool
+from schema_catalog import SchemaCatalog
+import report_cache
+
+load_dotenv()
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000")) #liczba wierszy w jednym executemany i jednej transakcji
+MAX_REPORTED_ERRORS = 1000 #tyle błędów wierszy jest zapamiętywanych (liczone są wszystkie)
+
+
+class ImportResult:
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.rows_read = 0
+        self.rows_inserted = 0
+        self.error_count = 0
+        self.errors = [] #pary (numer wiersza w pliku, komunikat)
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_inserted / self.seconds if self.seconds > 0 else 0.0
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def summary(self):
+        return (f"Wstawiono {self.rows_inserted} z {self.rows_read} wierszy do tabeli {self.table_name} "
+                f"w {self.seconds:.1f} s ({self.rows_per_second:.0f} wierszy/s), błędnych wierszy: {self.error_count}.")
+
+
+def map_columns(schema, table_name, header):
+    """
+    Dopasowuje nagłówek CSV do kolumn tabeli (wielkość liter bez znaczenia).
+    Zwraca nazwy kolumn w kolejności pliku; nieznane kolumny i brak kolumn wymaganych to ValueError.
+    """
+    if not schema.has_table(table_name):
+        raise ValueError(f"Tabela {table_name} nie istnieje.")
+    columns = {column["name"].lower(): column for column in schema.columns(table_name)}
+
+    mapped, unknown = [], []
+    for name in header:
+        column = columns.get(name.strip().lower())
+        if column is None:
+            unknown.append(name)
+        else:
+            mapped.append(column["name"])
+    if unknown:
+        raise ValueError(f"Kolumny z pliku nie istnieją w tabeli {table_name}: {', '.join(unknown)}")
+
+    missing = [
+        column["name"] for column in columns.values()
+        if not column["nullable"] and column["default"] is None
+        and "auto_increment" not in column["extra"].lower() and column["name"] not in mapped
+    ]
+    if missing:
+        raise ValueError(f"W pliku brakuje wymaganych kolumn: {', '.join(missing)}")
+    return mapped
+
+
+def _insert_batch(pool, query, batch, result):
+    """Wstawia partię w jednej transakcji; przy błędzie wstawia ją ponownie wiersz po wierszu."""
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            try:
+                cursor.executemany(query, [values for _, values in batch])
+                connection.commit()
+                result.rows_inserted += len(batch)
+                return
+            except Error:
+                connection.rollback()
+
+            #pojedyncze wiersze - dobre trafiają do bazy, złe do listy błędów
+            for line_number, values in batch:
+                try:
+                    cursor.execute(query, values)
+                    result.rows_inserted += 1
+                except Error as e:
+                    result.add_error(line_number, str(e))
+            connection.commit()
+
+
+def import_csv(table_name, path, batch_size=IMPORT_BATCH_SIZE, delimiter=None, encoding="utf-8-sig",
+               pool=None, schema=None, progress=None, cancel_event=None):
+    """
+    Importuje plik CSV do tabeli. `progress(wynik)` wywoływana jest po każdej partii,
+    `cancel_event` (threading.Event) przerywa import po bieżącej partii. Zwraca ImportResult.
+    """
+    pool = pool or get_pool()
+    schema = schema or SchemaCatalog(pool)
+    result = ImportResult(table_name)
+    started = time.perf_counter()
+
+    with open(path, newline="", encoding=encoding) as f:
+        if delimiter is None:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter if sample else ","
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("Plik CSV jest pusty.")
+        columns = map_columns(schema, table_name, header)
+
+        column_list = ", ".join(f"`{column}`" for column in columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        query = f"INSERT INTO `{table_name}` ({column_list}) VALUES ({placeholders})"
+
+        batch = []
+        for row in reader:
+            if not row:
+                continue
+            result.rows_read += 1
+            line_number = reader.line_num
+            if len(row) != len(columns):
+                result.add_error(line_number, f"Oczekiwano {len(columns)} wartości, jest {len(row)}.")
+                continue
+            #puste pole oznacza NULL
+            batch.append((line_number, [value if value != "" else None for value in row]))
+            if len(batch) >= batch_size:
+                _insert_batch(pool, query, batch, result)
+                batch = []
+                result.seconds = time.perf_counter() - started
+                if progress is not None:
+                    progress(result)
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        else:
+            if batch:
+                _insert_batch(pool, query, batch, result)
+
+    result.seconds = time.perf_counter() - started
+    if result.rows_inserted:
+        report_cache.cache.invalidate_tables({table_name})
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import wierszy z pliku CSV do tabeli.")
+    parser.add_argument("table")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--delimiter", default=None, help="separator pól (domyślnie wykrywany z pliku)")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    args = parser.parse_args(argv)
+
+    def print_progress(result):
+        print(f"\r{result.rows_read} wierszy, {result.rows_per_second:.0f} wierszy/s", end="", flush=True)
+
+    try:
+        result = import_csv(args.table, args.path, args.batch_size, args.delimiter, args.encoding,
+                            progress=print_progress)
+    except (OSError, ValueError, csv.Error, Error) as e:
+        print(f"Import nie powiódł się: {e}")
+        return 2
+    print()
+    for line_number, message in result.errors:
+        print(f"Wiersz {line_number}: {message}")
+    if result.error_count > len(result.errors):
+        print(f"... i {result.error_count - len(result.errors)} kolejnych błędów.")
+    print(result.summary())
+    return 1 if result.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
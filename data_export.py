@@ -0,0 +1,237 @@
+"""
+Strumieniowy eksport tabel i danych raportów do CSV, XLSX i Parquet.
+
+    python data_export.py tabela <tabela> <plik.csv|.xlsx|.parquet> [--batch-size N]
+    python data_export.py raport <typ> <plik> [parametry raportu...]   #np. raport 2 dostawy.xlsx 2024-01-01 2024-12-31
+
+Wiersze czytane są niebuforowanym kursorem partiami po `batch_size` i od razu zapisywane do pliku
+(XLSX w trybie write_only, Parquet - jedna grupa wierszy na partię), więc zużycie pamięci nie zależy
+od liczby wierszy. Format wybierany jest po rozszerzeniu pliku. XLSX wymaga pakietu openpyxl, Parquet - pyarrow.
+"""
+import argparse
+import csv
+import datetime
+import decimal
+import os
+import sys
+import time
+from mysql.connector import Error, errorcode
+from mysql.connector.constants import FieldType
+from dotenv import load_dotenv
+from db_pool import get_pool
+from schema_catalog import SchemaCatalog
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000")) #wiersze w jednej partii (i jednej grupie wierszy Parquet)
+XLSX_MAX_ROWS = 1048576 #limit wierszy arkusza Excela - kolejne wiersze trafiają do następnego arkusza
+BINARY_CHARSET = 63 #numer zestawu znaków "binary" w opisie kolumny MySQL
+
+
+class ExportResult:
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.seconds = 0.0
+        self.cancelled = False
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        status = " (przerwano)" if self.cancelled else ""
+        return (f"Zapisano {self.rows} wierszy do pliku {self.path} w {self.seconds:.1f} s "
+                f"({self.rows_per_second:.0f} wierszy/s){status}.")
+
+
+class CsvWriter:
+    def __init__(self, path, description, delimiter=","):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, delimiter=delimiter)
+        self._writer.writerow([column[0] for column in description])
+
+    def write(self, rows): #NULL zapisywany jako puste pole (tak jak czyta go csv_import)
+        self._writer.writerows(["" if value is None else value for value in row] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxWriter:
+    _NATIVE = (str, int, float, bool, decimal.Decimal, datetime.date, datetime.datetime, datetime.time)
+
+    def __init__(self, path, description):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValueError("Eksport do XLSX wymaga pakietu openpyxl.")
+        self.path = path
+        self._header = [column[0] for column in description]
+        self._workbook = Workbook(write_only=True) #wiersze zapisywane od razu do pliku tymczasowego
+        self._sheet = None
+        self._sheet_rows = XLSX_MAX_ROWS
+
+    def write(self, rows):
+        for row in rows:
+            if self._sheet_rows >= XLSX_MAX_ROWS:
+                self._sheet = self._workbook.create_sheet()
+                self._sheet.append(self._header)
+                self._sheet_rows = 1
+            self._sheet.append([value if value is None or isinstance(value, self._NATIVE) else str(value)
+                                for value in row])
+            self._sheet_rows += 1
+
+    def close(self):
+        if self._sheet is None: #pusty wynik - sam nagłówek
+            self._workbook.create_sheet().append(self._header)
+        self._workbook.save(self.path)
+
+
+def _arrow_type(pa, column): #typ kolumny Parquet na podstawie typu kolumny MySQL z opisu kursora
+    type_code = column[1]
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                     FieldType.INT24, FieldType.YEAR, FieldType.BIT):
+        return pa.int64()
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DECIMAL, FieldType.NEWDECIMAL):
+        return pa.decimal128(38, 10)
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code == FieldType.TIME:
+        return pa.duration("us")
+    if (type_code in (FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB, FieldType.BLOB)
+            and len(column) > 8 and column[8] == BINARY_CHARSET):
+        return pa.binary()
+    return pa.string()
+
+
+class ParquetWriter:
+    def __init__(self, path, description):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Eksport do Parquet wymaga pakietu pyarrow.")
+        self._pa = pa
+        self._schema = pa.schema([(column[0], _arrow_type(pa, column)) for column in description])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows): #jedna partia wierszy = jedna grupa wierszy w pliku
+        columns = []
+        for i, field in enumerate(self._schema):
+            values = [row[i] for row in rows]
+            if self._pa.types.is_string(field.type):
+                values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+            columns.append(self._pa.array(values, type=field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {".csv": CsvWriter, ".xlsx": XlsxWriter, ".parquet": ParquetWriter}
+
+
+def export_format(path): #rozszerzenie pliku określające format (nieobsługiwane to ValueError)
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Nieobsługiwany format pliku {extension or path}. Dostępne: {', '.join(WRITERS)}")
+    return extension
+
+
+def export_query(query, params, path, batch_size=EXPORT_BATCH_SIZE, pool=None, progress=None, cancel_event=None):
+    """
+    Zapisuje wynik zapytania do pliku. `progress(wynik)` wywoływana jest po każdej partii,
+    `cancel_event` (threading.Event) przerywa eksport po bieżącej partii. Zwraca ExportResult.
+    """
+    writer_class = WRITERS[export_format(path)]
+    pool = pool or get_pool()
+    result = ExportResult(path)
+    started = time.perf_counter()
+    with pool.cursor(buffered=False) as cursor:
+        cursor.execute(query, params or None)
+        writer = writer_class(path, cursor.description)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.write(rows)
+                result.rows += len(rows)
+                result.seconds = time.perf_counter() - started
+                if progress is not None:
+                    progress(result)
+                if cancel_event is not None and cancel_event.is_set():
+                    result.cancelled = True #nieodczytany wynik - pula zamknie to połączenie
+                    break
+        finally:
+            writer.close()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def table_query(table_name, schema=None, pool=None): #SELECT * dla tabeli sprawdzonej w katalogu schematu
+    schema = schema or SchemaCatalog(pool or get_pool())
+    if not schema.has_table(table_name):
+        raise ValueError(f"Tabela {table_name} nie istnieje.")
+    return f"SELECT * FROM `{table_name}`;"
+
+
+def export_table(table_name, path, batch_size=EXPORT_BATCH_SIZE, pool=None, schema=None, progress=None, cancel_event=None):
+    return export_query(table_query(table_name, schema, pool), None, path, batch_size, pool, progress, cancel_event)
+
+
+def export_report_data(report_type, params, path, batch_size=EXPORT_BATCH_SIZE, pool=None, progress=None,
+                       cancel_event=None):
+    """Eksport danych raportu (to samo zapytanie co raport, bez układania PDF)."""
+    import raport
+
+    if report_type not in raport.REPORT_DATASETS:
+        raise ValueError(f"Nieznany typ raportu: {report_type}")
+    query, fallback_query, param_names = raport.REPORT_DATASETS[report_type]
+    if len(params) != len(param_names):
+        raise ValueError(f"Raport {report_type} wymaga parametrów: {', '.join(param_names) or 'brak'}")
+    try:
+        return export_query(query, params, path, batch_size, pool, progress, cancel_event)
+    except Error as e:
+        if fallback_query is None or e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        return export_query(fallback_query, params, path, batch_size, pool, progress, cancel_event)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eksport tabeli albo danych raportu do CSV, XLSX lub Parquet.")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    sources = parser.add_subparsers(dest="source", required=True)
+    table_parser = sources.add_parser("tabela", help="eksport całej tabeli")
+    table_parser.add_argument("table")
+    table_parser.add_argument("path")
+    report_parser = sources.add_parser("raport", help="eksport danych raportu (1, 2 lub 3)")
+    report_parser.add_argument("report_type")
+    report_parser.add_argument("path")
+    report_parser.add_argument("params", nargs="*")
+    args = parser.parse_args(argv)
+
+    def print_progress(result):
+        print(f"\r{result.rows} wierszy, {result.rows_per_second:.0f} wierszy/s", end="", flush=True)
+
+    try:
+        if args.source == "tabela":
+            result = export_table(args.table, args.path, args.batch_size, progress=print_progress)
+        else:
+            result = export_report_data(args.report_type, args.params, args.path, args.batch_size,
+                                        progress=print_progress)
+    except (OSError, ValueError, Error) as e:
+        print(f"Eksport nie powiódł się: {e}")
+        return 2
+    print()
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+from dotenv import load_dotenv
+import metrics
+
+load_dotenv()
+
+DEFAULT_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DEFAULT_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) #ile sekund czekać na wolne połączenie
+HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK", "30")) #po ilu sekundach bezczynności sprawdzać połączenie
+
+
+class ConnectionPool:
+    """
+    Pula połączeń MySQL współdzielona przez main.py i raport.py.
+    Połączenia tworzone są leniwie (maksymalnie `size`), a po zwolnieniu wracają do puli.
+    Połączenie nieużywane dłużej niż `health_check_interval` sekund jest sprawdzane
+    (ping) przed wydaniem i w razie potrzeby nawiązywane ponownie.
+    """
+
+    def __init__(self, host, port, user, password, database, size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_POOL_TIMEOUT, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.connect_args = dict(host=host, port=port, user=user, password=password, database=database)
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue() #pary (połączenie, czas ostatniego użycia)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return mysql.connector.connect(**self.connect_args)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self): #pobiera połączenie z puli (tworzy nowe, jeśli limit na to pozwala)
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._connect()
+                except Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                conn, last_used = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolError(f"Brak wolnego połączenia w puli po {self.timeout} s.")
+
+        #sprawdzenie połączenia, które długo czekało w puli (serwer mógł je zamknąć)
+        if time.monotonic() - last_used > self.health_check_interval:
+            try:
+                conn.ping(reconnect=True, attempts=2, delay=0)
+            except Error:
+                self._discard(conn)
+                with self._lock:
+                    self._created += 1
+                try:
+                    return self._connect()
+                except Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        return conn
+
+    def release(self, conn): #zwraca połączenie do puli
+        #nieodczytany wynik (np. przerwany odczyt strumieniowy) mógłby mieć miliony wierszy -
+        #taniej zamknąć połączenie niż je doczytywać
+        if conn.unread_result:
+            self._discard(conn)
+            return
+        try:
+            #zakończenie otwartej transakcji, żeby kolejny użytkownik nie widział starego snapshotu
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        conn = self.acquire()
+        metrics.record_wait(time.perf_counter() - started)
+        try:
+            yield conn
+        except (InterfaceError, OperationalError):
+            #zerwane połączenie nie wraca do puli
+            self._discard(conn)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    @contextmanager
+    def cursor(self, **cursor_kwargs):
+        """
+        Kursor na połączeniu z puli; kursor jest zamykany, a połączenie zwracane po wyjściu z bloku.
+        Wyjście z bloku przed odczytaniem całego wyniku kursora niebuforowanego zamyka połączenie.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor(**cursor_kwargs)
+            try:
+                yield metrics.instrument_cursor(cursor)
+            finally:
+                #cursor.close() przy nieodczytanym wyniku (przerwany odczyt niebuforowany) zgłasza
+                #"Unread result found" - kursor zostaje, a release() zamyka całe połączenie
+                if not conn.unread_result:
+                    cursor.close()
+
+    def close(self): #zamyka wszystkie bezczynne połączenia
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host=None, port=None, user=None, password=None, database=None, size=None):
+    """
+    Zwraca wspólną pulę dla podanych parametrów połączenia (brakujące są brane z .env).
+    Ten sam zestaw parametrów zawsze daje tę samą pulę, więc GUI i raporty dzielą połączenia.
+    """
+    config = (
+        host or os.getenv("DB_HOST"),
+        int(port or os.getenv("DB_PORT")),
+        user or os.getenv("DB_USER"),
+        password or os.getenv("DB_PASSWORD"),
+        database or os.getenv("DB_NAME"),
+    )
+    with _pools_lock:
+        pool = _pools.get(config)
+        if pool is None:
+            pool = ConnectionPool(*config, size=size or DEFAULT_POOL_SIZE)
+            _pools[config] = pool
+        return pool
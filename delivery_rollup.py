@@ -0,0 +1,161 @@
+"""
+Dzienne podsumowanie zakończonych dostaw dla każdego kuriera (tabela dostawy_dzienne).
+
+    python delivery_rollup.py --install    #tworzy tabelę i wyzwalacze, wypełnia tabelę z realizacja_dostawy
+    python delivery_rollup.py --rebuild    #przelicza tabelę od nowa (np. po imporcie z wyłączonymi wyzwalaczami)
+    python delivery_rollup.py --check      #porównuje tabelę z realizacja_dostawy, kod wyjścia 1 przy różnicach
+
+Tabela jest aktualizowana na bieżąco przez wyzwalacze na realizacja_dostawy: zakończenie dostawy
+(ustawienie data_zakonczenia), zmiana kuriera lub daty i usunięcie wiersza zmieniają licznik
+w jednym wierszu (kurier, dzień). Raport z wykresem czyta tę tabelę, więc jego koszt zależy
+od liczby kurierów i dni w zakresie, a nie od liczby dostaw.
+"""
+import argparse
+import sys
+from mysql.connector import Error
+from db_pool import get_pool
+import report_cache
+
+ROLLUP_TABLE = "dostawy_dzienne"
+
+CREATE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS `{ROLLUP_TABLE}` (
+    `ID_kuriera` int(10) NOT NULL,
+    `dzien` date NOT NULL,
+    `liczba_dostaw` int NOT NULL DEFAULT 0,
+    PRIMARY KEY (`ID_kuriera`, `dzien`)
+)"""
+
+#zakończona dostawa liczy się w dniu DATE(data_zakonczenia), tak jak COUNT(rd.ID_przesyłki) w raporcie
+_ADD = f"""
+        INSERT INTO `{ROLLUP_TABLE}` (`ID_kuriera`, `dzien`, `liczba_dostaw`)
+        VALUES (NEW.ID_kuriera, DATE(NEW.data_zakonczenia), 1)
+        ON DUPLICATE KEY UPDATE `liczba_dostaw` = `liczba_dostaw` + 1;"""
+_REMOVE = f"""
+        UPDATE `{ROLLUP_TABLE}` SET `liczba_dostaw` = `liczba_dostaw` - 1
+        WHERE `ID_kuriera` = OLD.ID_kuriera AND `dzien` = DATE(OLD.data_zakonczenia);"""
+_NEW_COMPLETED = "NEW.data_zakonczenia IS NOT NULL AND NEW.ID_przesyłki IS NOT NULL"
+_OLD_COMPLETED = "OLD.data_zakonczenia IS NOT NULL AND OLD.ID_przesyłki IS NOT NULL"
+
+TRIGGERS = {
+    "trg_dostawy_dzienne_insert": f"""
+    CREATE TRIGGER `trg_dostawy_dzienne_insert` AFTER INSERT ON `realizacja_dostawy`
+    FOR EACH ROW
+    BEGIN
+        IF {_NEW_COMPLETED} THEN{_ADD}
+        END IF;
+    END""",
+    "trg_dostawy_dzienne_update": f"""
+    CREATE TRIGGER `trg_dostawy_dzienne_update` AFTER UPDATE ON `realizacja_dostawy`
+    FOR EACH ROW
+    BEGIN
+        IF NOT (OLD.ID_kuriera <=> NEW.ID_kuriera
+                AND DATE(OLD.data_zakonczenia) <=> DATE(NEW.data_zakonczenia)
+                AND (OLD.ID_przesyłki IS NULL) <=> (NEW.ID_przesyłki IS NULL)) THEN
+            IF {_OLD_COMPLETED} THEN{_REMOVE}
+            END IF;
+            IF {_NEW_COMPLETED} THEN{_ADD}
+            END IF;
+        END IF;
+    END""",
+    "trg_dostawy_dzienne_delete": f"""
+    CREATE TRIGGER `trg_dostawy_dzienne_delete` AFTER DELETE ON `realizacja_dostawy`
+    FOR EACH ROW
+    BEGIN
+        IF {_OLD_COMPLETED} THEN{_REMOVE}
+        END IF;
+    END""",
+}
+
+REBUILD_QUERY = f"""
+INSERT INTO `{ROLLUP_TABLE}` (`ID_kuriera`, `dzien`, `liczba_dostaw`)
+SELECT ID_kuriera, DATE(data_zakonczenia), COUNT(ID_przesyłki)
+FROM realizacja_dostawy
+WHERE data_zakonczenia IS NOT NULL
+GROUP BY ID_kuriera, DATE(data_zakonczenia)
+HAVING COUNT(ID_przesyłki) > 0;
+"""
+
+#wiersze (kurier, dzień), w których tabela różni się od liczenia wprost z realizacja_dostawy
+CHECK_QUERY = f"""
+SELECT src.ID_kuriera, src.dzien, src.liczba_dostaw, COALESCE(dd.liczba_dostaw, 0) AS w_podsumowaniu
+FROM (
+    SELECT ID_kuriera, DATE(data_zakonczenia) AS dzien, COUNT(ID_przesyłki) AS liczba_dostaw
+    FROM realizacja_dostawy
+    WHERE data_zakonczenia IS NOT NULL
+    GROUP BY ID_kuriera, DATE(data_zakonczenia)
+) src
+LEFT JOIN `{ROLLUP_TABLE}` dd ON dd.ID_kuriera = src.ID_kuriera AND dd.dzien = src.dzien
+WHERE src.liczba_dostaw <> COALESCE(dd.liczba_dostaw, 0)
+UNION ALL
+SELECT dd.ID_kuriera, dd.dzien, 0, dd.liczba_dostaw
+FROM `{ROLLUP_TABLE}` dd
+WHERE dd.liczba_dostaw <> 0 AND NOT EXISTS (
+    SELECT 1 FROM realizacja_dostawy rd
+    WHERE rd.ID_kuriera = dd.ID_kuriera AND DATE(rd.data_zakonczenia) = dd.dzien AND rd.ID_przesyłki IS NOT NULL
+);
+"""
+
+
+def rebuild(pool=None):
+    """Przelicza całą tabelę w jednej transakcji (odczyt widzi albo stary, albo nowy stan). Zwraca liczbę wierszy."""
+    pool = pool or get_pool()
+    with pool.connection() as connection:
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(f"DELETE FROM `{ROLLUP_TABLE}`;")
+                cursor.execute(REBUILD_QUERY)
+                connection.commit()
+            except Error:
+                connection.rollback()
+                raise
+            count = cursor.rowcount
+    report_cache.cache.invalidate_tables({ROLLUP_TABLE})
+    return count
+
+
+def install(pool=None):
+    """Tworzy tabelę i wyzwalacze (istniejące wyzwalacze są zastępowane), a potem wypełnia tabelę."""
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for name, statement in TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS `{name}`;")
+            cursor.execute(statement)
+    return rebuild(pool)
+
+
+def check(pool=None): #lista różnic (kurier, dzień, liczba w realizacja_dostawy, liczba w podsumowaniu)
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        cursor.execute(CHECK_QUERY)
+        return cursor.fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dzienne podsumowanie dostaw kurierów.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--install", action="store_true", help="utwórz tabelę i wyzwalacze, wypełnij tabelę")
+    group.add_argument("--rebuild", action="store_true", help="przelicz tabelę od nowa")
+    group.add_argument("--check", action="store_true", help="porównaj tabelę z realizacja_dostawy")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.install:
+            print(f"Utworzono tabelę {ROLLUP_TABLE} i wyzwalacze, zapisano {install()} wierszy.")
+        elif args.rebuild:
+            print(f"Przeliczono tabelę {ROLLUP_TABLE}, zapisano {rebuild()} wierszy.")
+        else:
+            differences = check()
+            for courier_id, day, expected, actual in differences:
+                print(f"Kurier {courier_id}, {day}: realizacja_dostawy {expected}, {ROLLUP_TABLE} {actual}")
+            print(f"Różnic: {len(differences)}.")
+            return 1 if differences else 0
+    except Error as e:
+        print(f"Błąd bazy danych: {e}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
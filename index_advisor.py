@@ -0,0 +1,265 @@
+"""
+Sprawdzanie planów zapytań raportów (EXPLAIN FORMAT=JSON) i podpowiadanie indeksów.
+
+    python index_advisor.py            #raport z planów i propozycje indeksów
+    python index_advisor.py --apply    #dodatkowo tworzy brakujące proponowane indeksy
+    python index_advisor.py --check    #kod wyjścia 1, jeśli któreś zapytanie ma pełny skan albo filesort
+
+Sprawdzane są wszystkie zapytania z raport.REPORT_QUERIES. Pełne skany i sortowania (filesort)
+zgłaszane są tylko dla tabel z co najmniej `--min-rows` wierszami, żeby małe słowniki nie dawały fałszywych alarmów.
+"""
+import argparse
+import json
+import re
+import sys
+from mysql.connector import Error
+from db_pool import get_pool
+import raport
+
+MIN_TABLE_ROWS = 1000 #mniejsze tabele można skanować w całości bez szkody
+
+#dla każdego zapytania: indeksy, które je wspierają, oraz skany / sortowania wynikające z samej treści raportu
+ADVISOR_RULES = {
+    "grupowanie": {
+        #raport wypisuje wszystkich pracowników - pełny odczyt jest zamierzony, ale sortowanie można oddać
+        #indeksowi pokrywającemu (odczyt indeksu w kolejności zamiast filesort)
+        "indexes": [("pracownik", "idx_pracownik_stanowisko",
+                     ("stanowisko", "nazwisko", "imię", "numer_tel", "pensja"))],
+        "full_scans": {"pracownik"},
+        "filesort": False,
+    },
+    "wykres": {
+        #zakres dni dla każdego kuriera czytany z klucza głównego dostawy_dzienne (ID_kuriera, dzien)
+        "indexes": [],
+        "full_scans": {"pracownik", "kurier"},
+        "filesort": True, #ORDER BY liczba_dostaw (agregat) - sortowane są tylko wiersze kurierów
+    },
+    "wykres_bez_podsumowania": {
+        #dla każdego kuriera zakres dat w obrębie jego dostaw; indeks pokrywa też COUNT(ID_przesyłki)
+        #i przeliczanie podsumowania (delivery_rollup.py --rebuild)
+        "indexes": [("realizacja_dostawy", "idx_realizacja_kurier_zakonczenie",
+                     ("ID_kuriera", "data_zakonczenia", "ID_przesyłki"))],
+        "full_scans": {"pracownik", "kurier"},
+        "filesort": True,
+    },
+    "formularz": {
+        #MAX(data_zmiany_stanu) dla jednej przesyłki czytane z końca zakresu indeksu
+        "indexes": [("opis_stanu_przesylki", "idx_opis_przesylka_data", ("ID_przesyłki", "data_zmiany_stanu"))],
+        "full_scans": set(),
+        "filesort": False,
+    },
+    "formularz_zbiorczy": {
+        "indexes": [("opis_stanu_przesylki", "idx_opis_przesylka_data", ("ID_przesyłki", "data_zmiany_stanu"))],
+        "full_scans": set(),
+        "filesort": False,
+    },
+}
+
+_ALIAS_PATTERN = re.compile(
+    r"\b(?:FROM|JOIN)\s+`?(\w+)`?"
+    r"(?:\s+(?:AS\s+)?(?!ON\b|JOIN\b|WHERE\b|LEFT\b|INNER\b|ORDER\b|GROUP\b|LIMIT\b)(\w+))?",
+    re.IGNORECASE,
+)
+
+
+def table_aliases(query): #alias -> nazwa tabeli (EXPLAIN podaje aliasy)
+    aliases = {}
+    for table, alias in _ALIAS_PATTERN.findall(query):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def table_sizes(cursor): #szacunkowe liczby wierszy tabel (information_schema, bez COUNT(*))
+    cursor.execute("""
+    SELECT TABLE_NAME, TABLE_ROWS
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE();
+    """)
+    return {name: rows or 0 for name, rows in cursor.fetchall()}
+
+
+def existing_indexes(cursor): #tabela -> lista krotek kolumn kolejnych indeksów
+    cursor.execute("""
+    SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;
+    """)
+    indexes = {}
+    for table, index, column in cursor.fetchall():
+        indexes.setdefault((table, index), []).append(column)
+    result = {}
+    for (table, _), columns in indexes.items():
+        result.setdefault(table, []).append(tuple(columns))
+    return result
+
+
+def has_index(indexes, table, columns): #czy istnieje indeks zaczynający się od podanych kolumn
+    return any(index[:len(columns)] == tuple(columns) for index in indexes.get(table, []))
+
+
+def _walk(node, accesses, flags, prefix=None):
+    """
+    Przechodzi plan EXPLAIN FORMAT=JSON (MySQL i MariaDB). Dopisuje dostępy do tabel
+    (alias, typ dostępu, indeks, wiersze czytane na jedno wykonanie, szacunek wszystkich czytanych wierszy)
+    i ustawia flags["filesort"], jeśli gdziekolwiek w planie jest sortowanie.
+    """
+    if isinstance(node, list):
+        for item in node:
+            prefix = _walk(item, accesses, flags, prefix)
+        return prefix
+    if not isinstance(node, dict):
+        return prefix
+
+    if node.get("using_filesort") or "filesort" in node:
+        flags["filesort"] = True
+
+    table = node.get("table")
+    if isinstance(table, dict) and "table_name" in table:
+        per_scan = table.get("rows_examined_per_scan", table.get("rows", 0)) or 0
+        loops = prefix or 1
+        accesses.append({
+            "alias": table["table_name"],
+            "access_type": table.get("access_type"),
+            "key": table.get("key"),
+            "rows_per_scan": per_scan,
+            "rows_examined": per_scan * loops,
+        })
+        #liczba wierszy po złączeniu z tą tabelą = liczba wykonań dla następnej tabeli w pętli
+        if "rows_produced_per_join" in table:
+            prefix = table["rows_produced_per_join"]
+        else:
+            prefix = loops * per_scan * float(table.get("filtered", 100)) / 100
+        for value in table.values():
+            if isinstance(value, (dict, list)):
+                _walk(value, accesses, flags)
+        return prefix
+
+    for key, value in node.items():
+        if key in ("nested_loop", "query_block"):
+            prefix = _walk(value, accesses, flags, prefix)
+        elif isinstance(value, (dict, list)):
+            _walk(value, accesses, flags)
+    return prefix
+
+
+def explain(cursor, query, params):
+    cursor.execute("EXPLAIN FORMAT=JSON " + query.strip().rstrip(";"), params or None)
+    return json.loads(cursor.fetchone()[0])
+
+
+def analyze_query(cursor, name, query, params, sizes, indexes, min_rows=MIN_TABLE_ROWS):
+    """
+    Plan jednego zapytania: dostępy do tabel, wykryte problemy i proponowane (brakujące) indeksy.
+    Problemy (pełne skany i filesort w dużych tabelach) powodują niepowodzenie --check, propozycje nie.
+    """
+    rules = ADVISOR_RULES.get(name, {"indexes": [], "full_scans": set(), "filesort": False})
+    aliases = table_aliases(query)
+    accesses, flags = [], {"filesort": False}
+    _walk(explain(cursor, query, params), accesses, flags)
+
+    problems = []
+    for access in accesses:
+        access["table"] = aliases.get(access["alias"], access["alias"])
+        access["table_rows"] = sizes.get(access["table"])
+        if access["table_rows"] is None: #tabela pochodna / zmaterializowane podzapytanie
+            continue
+        if (access["access_type"] in ("ALL", "index") and access["table_rows"] >= min_rows
+                and access["table"] not in rules["full_scans"]):
+            kind = "pełny skan tabeli" if access["access_type"] == "ALL" else "pełny skan indeksu"
+            problems.append(f"{kind} {access['table']} ({access['table_rows']} wierszy)")
+
+    rows_examined = sum(access["rows_examined"] for access in accesses)
+    if flags["filesort"] and not rules["filesort"] and rows_examined >= min_rows:
+        problems.append(f"sortowanie (filesort) przy ok. {rows_examined:.0f} czytanych wierszach")
+
+    #zalecane indeksy proponowane są zawsze, gdy ich brakuje - także zanim plan się pogorszy
+    proposals = [
+        (table, index_name, columns) for table, index_name, columns in rules["indexes"]
+        if sizes.get(table) is not None and not has_index(indexes, table, columns)
+    ]
+
+    return {
+        "name": name,
+        "accesses": accesses,
+        "rows_examined": rows_examined,
+        "problems": problems,
+        "proposals": proposals,
+    }
+
+
+def create_index_sql(table, index_name, columns):
+    column_list = ", ".join(f"`{column}`" for column in columns)
+    return f"ALTER TABLE `{table}` ADD INDEX `{index_name}` ({column_list});"
+
+
+def analyze_all(pool=None, min_rows=MIN_TABLE_ROWS):
+    pool = pool or get_pool()
+    with pool.cursor() as cursor:
+        sizes = table_sizes(cursor)
+        indexes = existing_indexes(cursor)
+        return [
+            analyze_query(cursor, name, query, params, sizes, indexes, min_rows)
+            for name, (query, params) in raport.REPORT_QUERIES.items()
+        ]
+
+
+def apply_indexes(results, pool=None): #tworzy proponowane indeksy (każdy najwyżej raz)
+    pool = pool or get_pool()
+    created = []
+    with pool.cursor() as cursor:
+        for result in results:
+            for table, index_name, columns in result["proposals"]:
+                if (table, index_name) in created:
+                    continue
+                cursor.execute(create_index_sql(table, index_name, columns))
+                created.append((table, index_name))
+    return created
+
+
+def print_report(results):
+    for result in results:
+        print(f"== {result['name']} (szacunkowo {result['rows_examined']:.0f} czytanych wierszy)")
+        for access in result["accesses"]:
+            table_rows = access["table_rows"] if access["table_rows"] is not None else "-"
+            print(f"   {access['alias']:>10} {access['table']:25} {str(access['access_type']):8} "
+                  f"indeks: {access['key'] or '-':35} czyta {access['rows_examined']:.0f} / {table_rows}")
+        for problem in result["problems"]:
+            print(f"   ! {problem}")
+        for table, index_name, columns in result["proposals"]:
+            print(f"   + {create_index_sql(table, index_name, columns)}")
+        if not result["problems"]:
+            print("   OK")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sprawdzenie planów zapytań raportów i propozycje indeksów.")
+    parser.add_argument("--apply", action="store_true", help="utwórz proponowane indeksy")
+    parser.add_argument("--check", action="store_true", help="zakończ z kodem 1, jeśli są problemy")
+    parser.add_argument("--min-rows", type=int, default=MIN_TABLE_ROWS,
+                        help="pomijaj skany i sortowania w tabelach mniejszych niż ta liczba wierszy")
+    args = parser.parse_args(argv)
+
+    try:
+        results = analyze_all(min_rows=args.min_rows)
+        print_report(results)
+        if args.apply:
+            created = apply_indexes(results)
+            for table, index_name in created:
+                print(f"Utworzono indeks {index_name} na tabeli {table}.")
+            if created:
+                results = analyze_all(min_rows=args.min_rows)
+                print_report(results)
+    except Error as e:
+        print(f"Błąd bazy danych: {e}")
+        return 2
+
+    if args.check and any(result["problems"] for result in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
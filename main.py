@@ -1,54 +1,228 @@
 import os
-import mysql.connector
+import bisect
+import queue
+import threading
 from mysql.connector import Error
 import tkinter as tk
-from tkinter import ttk, messagebox
-import subprocess
+from tkinter import ttk, messagebox, filedialog
+from collections import deque
 from dotenv import load_dotenv
+from db_pool import get_pool
+from schema_catalog import SchemaCatalog
+import raport
+from report_queue import ReportQueue
+import report_cache
+import csv_import
+import data_export
+from query_executor import QueryExecutor, QueryGroup
+import change_log
+import metrics
 
 load_dotenv()
 
+PAGE_SIZE = 200 #liczba wierszy pobieranych jednym zapytaniem podczas przeglądania tabeli
+MAX_WINDOW_ROWS = 1000 #maksymalna liczba wierszy trzymanych jednocześnie w TreeView
+FK_PICKER_LIMIT = 20 #liczba podpowiedzi wyświetlanych w polu wyboru klucza obcego
+FK_PICKER_DEBOUNCE_MS = 250 #opóźnienie wyszukiwania po ostatnim naciśnięciu klawisza
+BULK_BATCH_SIZE = 500 #liczba kluczy w jednym DELETE / UPDATE ... WHERE klucz IN (...)
+RELATED_ROWS_LIMIT = 50 #maksymalna liczba wierszy pokazywanych dla jednego powiązania
+FILTER_OPERATORS = ("<=", ">=", "<>", "!=", "=", "<", ">") #operatory na początku tekstu filtra (dłuższe najpierw)
+LIVE_REFRESH_INTERVAL = float(os.getenv("LIVE_REFRESH_SECONDS", "5")) #co ile sekund odświeżać otwartą tabelę na żywo
+TEXT_TYPES = ("char", "varchar", "tinytext", "text", "mediumtext", "longtext", "enum", "set") #filtr po początku tekstu
+
+#kolumny opisujące rekord w podpowiedziach kluczy obcych; pierwsza kolumna służy do wyszukiwania po tekście
+FK_LABEL_COLUMNS = {
+    "nadawca": ["nazwisko", "imię", "miasto"],
+    "adresat": ["nazwisko", "imię", "miasto"],
+    "pracownik": ["nazwisko", "imię", "stanowisko"],
+    "kurier": ["obszar_działania"],
+    "magazyn": ["miasto", "ulica"],
+    "magazynier": ["strefa_zarządzania"],
+    "pojazd": ["nr_rejestracyjny", "typ_pojazdu"],
+    "stan_przesyłki": ["stan"],
+    "rachunek": ["status_platnosci", "kwota"],
+    "przesylka": ["rozmiar", "waga"],
+}
+
+@metrics.instrument_class("DatabaseManager") #pomiary czasu każdej metody (włączane METRICS_ENABLED)
 class DatabaseManager:
-    def __init__(self, host, port, user, password, database): #nawiązanie połączenia z bazą
-        self.connection = None
+    def __init__(self, host, port, user, password, database, pool_size=None): #nawiązanie połączenia z bazą
+        #połączenia pobierane są ze wspólnej puli (ta sama pula obsługuje raport.py)
+        self.pool = get_pool(host, port, user, password, database, size=pool_size)
+        self.queries = QueryExecutor(self.pool) #niezależne zapytania wykonywane równolegle (okno powiązań)
+        self.schema = None
+        self._tracked_tables = None #tabele z wyzwalaczami dziennika zmian (change_log), wczytywane przy pierwszym użyciu
         try:
-            self.connection = mysql.connector.connect(
-                host=host,
-                port=port,
-                user=user,
-                password=password,
-                database=database
-            )
-            if self.connection.is_connected():
-                print("Połączono z bazą danych.")
+            with self.pool.connection() as connection:
+                if connection.is_connected():
+                    print("Połączono z bazą danych.")
+            #metadane schematu wczytywane raz, a potem serwowane z pamięci
+            self.schema = SchemaCatalog(self.pool)
         except Error as e:
             messagebox.showerror("Błąd połączenia", f"Nie udało się połączyć z bazą danych: {e}")
 
-    def get_tables(self): #pobiera listę tabel w bazie danych
+    def get_tables(self): #pobiera listę tabel w bazie danych (z katalogu schematu)
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SHOW TABLES;")
-            tables = [table[0] for table in cursor.fetchall()]
-            return tables
+            self.schema.refresh_if_changed()
+            return self.schema.table_names()
         except Error as e:
             messagebox.showerror("Błąd", f"Nie udało się pobrać tabel: {e}")
             return []
 
     def get_data(self, table_name): #pobiera wszystkie dane z wybranej tabeli
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"SELECT * FROM {table_name};")
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
+            with self.pool.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {table_name};")
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
             return columns, rows
         except Error as e:
             messagebox.showerror("Błąd", f"Nie udało się pobrać danych z tabeli {table_name}: {e}")
             return [], []
 
-    def update_data(self, table_name, columns, values, primary_key_column, primary_key_value): #aktualizuje istniejący rekord w tabeli
+    def get_columns(self, table_name): #opis kolumn tabeli z katalogu schematu
+        return self.schema.columns(table_name)
+
+    def get_primary_key(self, table_name): #zwraca kolumnę jednokolumnowego klucza głównego albo None
+        primary_key = self.schema.primary_key(table_name)
+        #stronicowanie i edycja po kluczu wymagają klucza złożonego z jednej kolumny
+        if len(primary_key) != 1:
+            return None
+        return primary_key[0]
+
+    def build_filter(self, table_name, filters):
+        """
+        Zamienia filtry kolumn ({kolumna: tekst}) na warunek WHERE z parametrami: (sql, params).
+        Nazwy kolumn sprawdzane są w katalogu schematu (nieznana kolumna to ValueError), wartości trafiają do parametrów.
+        Tekst filtra: "NULL" / "!NULL", porównanie ("=5", ">=2024-01-01", "<>x"), wzorzec z * ("*ski")
+        albo sam tekst - początek wartości dla kolumn tekstowych (LIKE 'tekst%', korzysta z indeksu), równość dla pozostałych.
+        """
+        columns = {column["name"]: column for column in self.schema.columns(table_name)}
+        conditions, params = [], []
+        for column_name, text in (filters or {}).items():
+            text = text.strip()
+            if not text:
+                continue
+            if column_name not in columns:
+                raise ValueError(f"Kolumna {column_name} nie istnieje w tabeli {table_name}.")
+            column = f"`{column_name}`"
+            if text.upper() == "NULL":
+                conditions.append(f"{column} IS NULL")
+                continue
+            if text.upper() == "!NULL":
+                conditions.append(f"{column} IS NOT NULL")
+                continue
+            operator = next((op for op in FILTER_OPERATORS if text.startswith(op)), None)
+            if operator is not None:
+                conditions.append(f"{column} {'<>' if operator == '!=' else operator} %s")
+                params.append(text[len(operator):].strip())
+                continue
+            pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            if "*" in text:
+                conditions.append(f"{column} LIKE %s")
+                params.append(pattern.replace("*", "%"))
+            elif columns[column_name]["data_type"].lower() in TEXT_TYPES:
+                conditions.append(f"{column} LIKE %s")
+                params.append(pattern + "%")
+            else:
+                conditions.append(f"{column} = %s")
+                params.append(text)
+        return " AND ".join(conditions), params
+
+    def check_sort_column(self, table_name, sort_column): #kolumna sortowania musi istnieć w tabeli (ORDER BY nie przyjmuje parametrów)
+        if sort_column is not None and sort_column not in [column["name"] for column in self.schema.columns(table_name)]:
+            raise ValueError(f"Kolumna {sort_column} nie istnieje w tabeli {table_name}.")
+
+    @staticmethod
+    def _keyset_condition(sort_column, key_column, position, greater):
+        """
+        Warunek "wiersz leży za / przed pozycją (wartość sortowania, klucz)" w porządku rosnącym,
+        w którym (jak w MySQL) NULL jest przed wszystkimi wartościami. Zwraca (sql, params).
+        """
+        value, key = position
+        sort, pk = f"`{sort_column}`", f"`{key_column}`"
+        if greater:
+            if value is None:
+                return f"(({sort} IS NULL AND {pk} > %s) OR {sort} IS NOT NULL)", [key]
+            return f"({sort}, {pk}) > (%s, %s)", [value, key]
+        if value is None:
+            return f"({sort} IS NULL AND {pk} < %s)", [key]
+        return f"({sort} IS NULL OR ({sort}, {pk}) < (%s, %s))", [value, key]
+
+    def get_page(self, table_name, key_column, after=None, before=None, limit=PAGE_SIZE,
+                 sort_column=None, descending=False, filters=None):
+        """
+        Pobiera jedną stronę danych metodą keyset (WHERE klucz > ostatni ORDER BY klucz LIMIT n).
+        `after` - strona następująca po podanym kluczu, `before` - strona poprzedzająca podany klucz.
+        Koszt zapytania nie zależy od rozmiaru tabeli ani od pozycji strony.
+        Wiersze są zawsze zwracane w kolejności wyświetlania.
+
+        Przy sortowaniu po innej kolumnie (`sort_column`) porządek to (kolumna, klucz), a `after` / `before`
+        to pary (wartość sortowania, klucz). `filters` to filtry kolumn w postaci przyjmowanej przez build_filter.
+        """
         try:
-            cursor = self.connection.cursor()
+            self.check_sort_column(table_name, sort_column)
+            where, params = self.build_filter(table_name, filters)
+            conditions = [where] if where else []
+            if sort_column is None or sort_column == key_column:
+                order_columns = [key_column]
+                #strona "przed" czytana jest w odwrotnym porządku i odwracana po pobraniu
+                if before is not None:
+                    conditions.append(f"`{key_column}` {'>' if descending else '<'} %s")
+                    params.append(before)
+                elif after is not None:
+                    conditions.append(f"`{key_column}` {'<' if descending else '>'} %s")
+                    params.append(after)
+            else:
+                order_columns = [sort_column, key_column]
+                if before is not None or after is not None:
+                    greater = (after is not None) != descending
+                    condition, condition_params = self._keyset_condition(
+                        sort_column, key_column, after if after is not None else before, greater)
+                    conditions.append(condition)
+                    params += condition_params
+            reverse = (before is not None) != descending
+            order_by = ", ".join(f"`{column}` {'DESC' if reverse else 'ASC'}" for column in order_columns)
+            query = f"SELECT * FROM `{table_name}`"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += f" ORDER BY {order_by} LIMIT %s;"
+            params.append(limit)
+            with self.pool.cursor() as cursor:
+                cursor.execute(query, params)
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+            if before is not None:
+                rows.reverse()
+            return columns, rows
+        except (Error, ValueError) as e:
+            messagebox.showerror("Błąd", f"Nie udało się pobrać danych z tabeli {table_name}: {e}")
+            return [], []
 
+    def get_page_by_offset(self, table_name, offset, limit=PAGE_SIZE, sort_column=None, descending=False, filters=None):
+        """Stronicowanie tabel bez klucza głównego (LIMIT / OFFSET), z opcjonalnym sortowaniem i filtrami."""
+        try:
+            self.check_sort_column(table_name, sort_column)
+            where, params = self.build_filter(table_name, filters)
+            query = f"SELECT * FROM `{table_name}`"
+            if where:
+                query += f" WHERE {where}"
+            #pozostałe kolumny rozstrzygają remisy - bez tego kolejność równych wierszy może się zmieniać
+            #między zapytaniami, a strony powtarzać lub pomijać wiersze
+            order = [f"`{sort_column}` {'DESC' if descending else 'ASC'}"] if sort_column is not None else []
+            order += [f"`{column}`" for column in self.schema.column_names(table_name) if column != sort_column]
+            query += f" ORDER BY {', '.join(order)}"
+            with self.pool.cursor() as cursor:
+                cursor.execute(query + " LIMIT %s OFFSET %s;", params + [limit, offset])
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+            return columns, rows
+        except (Error, ValueError) as e:
+            messagebox.showerror("Błąd", f"Nie udało się pobrać danych z tabeli {table_name}: {e}")
+            return [], []
+
+    def update_data(self, table_name, columns, values, primary_key_column, primary_key_value): #aktualizuje istniejący rekord w tabeli
+        try:
             #zamiana wartości None na NULL
             processed_values = [value if value is not None and value != "" else None for value in values]
 
@@ -56,74 +230,267 @@ class DatabaseManager:
             query = f"UPDATE {table_name} SET {set_clause} WHERE {primary_key_column} = %s;"
 
             #wykonaj zapytanie
-            cursor.execute(query, processed_values + [primary_key_value])
-            self.connection.commit()
+            with self.pool.connection() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query, processed_values + [primary_key_value])
+                connection.commit()
+            report_cache.cache.invalidate_tables({table_name})
 
             messagebox.showinfo("Sukces", "Rekord został zaktualizowany.")
+            return True
         except Error as e:
             messagebox.showerror("Błąd", f"Nie udało się zaktualizować rekordu: {e}")
+            return False
+
+    def execute_write(self, query, params=None, return_last_id=False):
+        """
+        Wykonuje zapytanie modyfikujące i zatwierdza transakcję (błędy przekazuje dalej).
+        Zwraca liczbę zmienionych wierszy albo - przy `return_last_id` - wartość AUTO_INCREMENT nowego wiersza.
+        """
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+                affected = cursor.lastrowid if return_last_id else cursor.rowcount
+            connection.commit()
+        #zapamiętane dane raportów zależne od zmienionej tabeli są nieaktualne
+        report_cache.cache.invalidate_query(query)
+        return affected
+
+    def delete_many(self, table_name, key_column, keys, batch_size=BULK_BATCH_SIZE):
+        """
+        Usuwa wiersze o podanych wartościach klucza głównego zapytaniami DELETE ... WHERE klucz IN (...)
+        po `batch_size` kluczy; wszystkie partie w jednej transakcji. Zwraca liczbę usuniętych wierszy
+        (błędy przekazuje dalej - wtedy nic nie zostaje usunięte).
+        """
+        keys = list(keys)
+        deleted = 0
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                for start in range(0, len(keys), batch_size):
+                    batch = keys[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(f"DELETE FROM `{table_name}` WHERE `{key_column}` IN ({placeholders});", batch)
+                    deleted += cursor.rowcount
+            connection.commit()
+        report_cache.cache.invalidate_tables({table_name})
+        return deleted
+
+    def update_many(self, table_name, key_column, keys, changes, batch_size=BULK_BATCH_SIZE):
+        """
+        Ustawia te same wartości (`changes`: kolumna -> wartość) we wszystkich wierszach o podanych kluczach:
+        UPDATE ... SET ... WHERE klucz IN (...) partiami w jednej transakcji. Zwraca liczbę zmienionych wierszy.
+        """
+        keys = list(keys)
+        set_clause = ", ".join(f"`{column}` = %s" for column in changes)
+        updated = 0
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                for start in range(0, len(keys), batch_size):
+                    batch = keys[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(
+                        f"UPDATE `{table_name}` SET {set_clause} WHERE `{key_column}` IN ({placeholders});",
+                        list(changes.values()) + batch,
+                    )
+                    updated += cursor.rowcount
+            connection.commit()
+        report_cache.cache.invalidate_tables({table_name})
+        return updated
+
+    def delete_rows_by_values(self, table_name, columns, rows):
+        """
+        Usuwa wiersze tabeli bez klucza głównego - każdy wskazany kompletem wartości (DELETE ... LIMIT 1),
+        wszystkie w jednej transakcji. Zwraca liczbę usuniętych wierszy.
+        """
+        deleted = 0
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                for row_values in rows:
+                    conditions = [
+                        f"`{column}` IS NULL" if value is None else f"`{column}` = %s"
+                        for column, value in zip(columns, row_values)
+                    ]
+                    query = f"DELETE FROM `{table_name}` WHERE {' AND '.join(conditions)} LIMIT 1;"
+                    cursor.execute(query, [value for value in row_values if value is not None])
+                    deleted += cursor.rowcount
+            connection.commit()
+        report_cache.cache.invalidate_tables({table_name})
+        return deleted
+
+    def get_rows_by_keys(self, table_name, key_column, keys, batch_size=BULK_BATCH_SIZE, filters=None):
+        """
+        Wiersze o podanych wartościach klucza głównego (SELECT ... WHERE klucz IN (...)); zwraca kolumny i słownik klucz -> wiersz.
+        Z `filters` zwracane są tylko wiersze spełniające filtry (pozostałe znikają z widoku tak jak usunięte).
+        """
+        keys = list(keys)
+        columns, result = [], {}
+        where, filter_params = self.build_filter(table_name, filters)
+        with self.pool.cursor() as cursor:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                placeholders = ", ".join(["%s"] * len(batch))
+                query = f"SELECT * FROM `{table_name}` WHERE `{key_column}` IN ({placeholders})"
+                if where:
+                    query += f" AND {where}"
+                cursor.execute(query + ";", batch + filter_params)
+                columns = [col[0] for col in cursor.description]
+                key_index = columns.index(key_column)
+                for row in cursor.fetchall():
+                    result[row[key_index]] = row
+        return columns, result
+
+    def get_change_watermark(self, table_name, key_column):
+        """
+        Znacznik postępu dla odświeżania na żywo: ("log", id ostatniego wpisu dziennika zmian) dla tabel
+        z wyzwalaczami change_log, ("key", największy klucz) dla klucza AUTO_INCREMENT (tylko nowe wiersze),
+        albo None, gdy tabeli nie da się odświeżać przyrostowo.
+        """
+        if self._tracked_tables is None:
+            try:
+                self._tracked_tables = change_log.tracked_tables(self.pool)
+            except Error:
+                self._tracked_tables = set()
+        if table_name in self._tracked_tables:
+            return "log", change_log.watermark(self.pool)
+        column = next((column for column in self.get_columns(table_name) if column["name"] == key_column), None)
+        if column is None or "auto_increment" not in column["extra"].lower():
+            return None
+        with self.pool.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MAX(`{key_column}`), 0) FROM `{table_name}`;")
+            return "key", cursor.fetchone()[0]
+
+    @staticmethod
+    def changes_query(table_name, key_column, watermark, limit=change_log.CHANGES_LIMIT):
+        """Zapytanie o klucze zmienione po znaczniku: wiersze (nowy znacznik, klucz) rosnąco po znaczniku."""
+        kind, value = watermark
+        if kind == "log":
+            return change_log.CHANGES_QUERY, (table_name, value, limit)
+        return (f"SELECT `{key_column}`, `{key_column}` FROM `{table_name}` WHERE `{key_column}` > %s "
+                f"ORDER BY `{key_column}` LIMIT %s;", (value, limit))
+
+    def call_procedure(self, name, args): #wywołuje procedurę składowaną i zatwierdza transakcję (błędy przekazuje dalej)
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.callproc(name, args)
+            connection.commit()
+        report_cache.cache.invalidate_procedure(name)
+
+    def get_label_columns(self, table_name, key_column): #kolumny opisowe dla podpowiedzi kluczy obcych
+        if table_name in FK_LABEL_COLUMNS:
+            return [col for col in FK_LABEL_COLUMNS[table_name] if self.schema.has_column(table_name, col)]
+        #domyślnie dwie pierwsze kolumny tekstowe tabeli
+        return [
+            col["name"] for col in self.get_columns(table_name)
+            if col["data_type"] in ("varchar", "char", "text") and col["name"] != key_column
+        ][:2]
+
+    def search_foreign_key_options(self, table_name, column_name, text="", limit=FK_PICKER_LIMIT):
+        """
+        Zwraca do `limit` par (wartość klucza, opis) dla kolumny będącej kluczem obcym.
+        Cyfry wyszukiwane są zakresem po kluczu (klucz >= tekst), inny tekst - prefiksem
+        pierwszej kolumny opisowej (LIKE 'tekst%'). Oba warianty mogą korzystać z indeksu,
+        więc koszt zapytania nie zależy od rozmiaru tabeli powiązanej.
+        """
+        result = self.schema.foreign_key(table_name, column_name)
+        if not result:
+            return []
+        referenced_table, referenced_column = result
+        label_columns = self.get_label_columns(referenced_table, referenced_column)
+
+        select_list = ", ".join(f"`{col}`" for col in [referenced_column] + label_columns)
+        query = f"SELECT {select_list} FROM `{referenced_table}`"
+        params = []
+        text = text.strip()
+        if text.isdigit() or not label_columns:
+            order_column = referenced_column
+            if text:
+                query += f" WHERE `{referenced_column}` >= %s"
+                params.append(text)
+        else:
+            order_column = label_columns[0]
+            query += f" WHERE `{order_column}` LIKE %s"
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(escaped + "%")
+        query += f" ORDER BY `{order_column}` LIMIT %s;"
+        params.append(limit)
 
-    def delete_data(self, table_name, column_name, value): #usuwa rekord z tabeli
         try:
-            cursor = self.connection.cursor()
-            query = f"DELETE FROM {table_name} WHERE {column_name} = %s;"
-            cursor.execute(query, (value,))
-            self.connection.commit()
-            messagebox.showinfo("Sukces", "Rekord został usunięty.")
+            with self.pool.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
         except Error as e:
-            messagebox.showerror("Błąd", f"Nie udało się usunąć rekordu: {e}")
-
-    def get_foreign_key_options(self, table_name,
-                                column_name):  # pobiera możliwe opcje dla kolumn będących kluczami obcymi
-        cursor = self.connection.cursor()
-        query = """
-        SELECT 
-            kcu.REFERENCED_TABLE_NAME, 
-            kcu.REFERENCED_COLUMN_NAME
-        FROM information_schema.KEY_COLUMN_USAGE kcu
-        WHERE kcu.TABLE_NAME = %s AND kcu.COLUMN_NAME = %s
-        AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
-        AND kcu.TABLE_SCHEMA = DATABASE();
-        """
-        cursor.execute(query, (table_name, column_name))
-        result = cursor.fetchone()
-
-        if result:
-            referenced_table, referenced_column = result
-            cursor.execute(f"SELECT {referenced_column} FROM {referenced_table}")
-            options = [row[0] for row in cursor.fetchall()]
-        else:
-            options = []
+            messagebox.showerror("Błąd", f"Nie udało się pobrać wartości z tabeli {referenced_table}: {e}")
+            return []
+        return [(row[0], ", ".join(str(value) for value in row[1:] if value is not None)) for row in rows]
 
-        cursor.close()
-        return options
+    @staticmethod
+    def referenced_rows_query(table_name, column_name, value, limit=RELATED_ROWS_LIMIT): #zapytanie i parametry dla get_referenced_rows
+        return f"SELECT * FROM `{table_name}` WHERE `{column_name}` = %s LIMIT %s;", (value, limit)
 
-    def get_foreign_keys(self, table_name):
+    def get_referenced_rows(self, table_name, column_name, value, limit=RELATED_ROWS_LIMIT):
+        """Wiersze tabeli, w których `column_name` = `value` (dla klucza obcego zwykle jeden wiersz, po kluczu głównym)."""
         try:
-            cursor = self.connection.cursor()
-            query = """
-            SELECT COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-            FROM information_schema.KEY_COLUMN_USAGE
-            WHERE TABLE_NAME = %s AND TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL;
-            """
-            cursor.execute(query, (table_name,))
-            foreign_keys = cursor.fetchall()
-            return foreign_keys
+            with self.pool.cursor() as cursor:
+                cursor.execute(*self.referenced_rows_query(table_name, column_name, value, limit))
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
+            return columns, rows
         except Error as e:
-            messagebox.showerror("Błąd", f"Nie udało się pobrać kluczy obcych z tabeli {table_name}: {e}")
-            return []
+            messagebox.showerror("Błąd", f"Nie udało się pobrać danych z tabeli {table_name}: {e}")
+            return [], []
+
+    def get_foreign_keys(self, table_name): #klucze obce tabeli: (kolumna, tabela powiązana, kolumna powiązana)
+        return self.schema.foreign_keys(table_name)
 
-    def insert_data(self, table_name, columns, values): #dodaje nowy rekord do tabeli
+    def insert_data(self, table_name, columns, values): #dodaje nowy rekord do tabeli (zwraca nowy identyfikator, False przy błędzie)
         try:
-            cursor = self.connection.cursor()
             placeholders = ", ".join(["%s"] * len(values))
             columns_str = ", ".join(columns)
             query = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-            cursor.execute(query, values)
-            self.connection.commit()
+            new_id = self.execute_write(query, values, return_last_id=True)
             messagebox.showinfo("Sukces", "Rekord został dodany pomyślnie.")
+            return new_id or None #identyfikator AUTO_INCREMENT (None, jeśli tabela go nie ma)
         except Error as e:
             messagebox.showerror("Błąd", f"Nie udało się dodać rekordu: {e}")
+            return False
+
+class ForeignKeyPicker(ttk.Combobox):
+    """
+    Pole wyboru wartości klucza obcego z podpowiedziami wyszukiwanymi w bazie podczas pisania.
+    Zapytanie wysyłane jest dopiero po FK_PICKER_DEBOUNCE_MS od ostatniego klawisza
+    i zwraca najwyżej FK_PICKER_LIMIT wierszy. Metoda get() zwraca samą wartość klucza.
+    """
+
+    def __init__(self, master, db_manager, table_name, column_name, **kwargs):
+        super().__init__(master, postcommand=self.search, **kwargs)
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.column_name = column_name
+        self.options = {} #tekst podpowiedzi -> wartość klucza
+        self._search_id = None
+        self.bind("<KeyRelease>", self._on_key)
+
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._search_id is not None:
+            self.after_cancel(self._search_id)
+        self._search_id = self.after(FK_PICKER_DEBOUNCE_MS, self.search)
+
+    def search(self):
+        self._search_id = None
+        text = super().get()
+        if text in self.options: #wybrana podpowiedź - szukamy po samej wartości klucza
+            text = str(self.options[text])
+        results = self.db_manager.search_foreign_key_options(self.table_name, self.column_name, text)
+        self.options = {f"{key} — {label}" if label else str(key): key for key, label in results}
+        self["values"] = list(self.options)
+
+    def get(self):
+        text = super().get()
+        if text in self.options:
+            return self.options[text]
+        return text.strip() #wartość klucza wpisana ręcznie
 
 #interfejs graficzny aplikacji umożliwiający przeglądanie i modyfikowanie danych
 class DataManagementApp:
@@ -133,19 +500,51 @@ class DataManagementApp:
         self.db_manager = db_manager
         self.current_table = None
 
+        #stan przeglądania tabeli: klucze wierszy aktualnie widocznych w TreeView
+        self.key_column = None
+        self.window_keys = deque()
+        self.has_more_before = False
+        self.has_more_after = False
+        self.loading_page = False
+
+        #sortowanie i filtry wykonywane w bazie (ORDER BY / WHERE), łączone ze stronicowaniem
+        self.sort_column = None
+        self.sort_descending = False
+        self.sort_values = {} #klucz wiersza -> wartość kolumny sortowania (pozycja dla następnej strony)
+        self.filters = {}
+        self.filter_entries = {}
+
+        #odświeżanie na żywo: znacznik postępu (change_log albo klucz AUTO_INCREMENT) i zaplanowane odpytanie
+        self.live_refresh = tk.BooleanVar(value=False)
+        self.live_watermark = None
+        self.live_refresh_id = None
+        self.live_generation = 0 #zwiększane przy każdym wczytaniu tabeli - spóźnione wyniki są pomijane
+
         self.root.title("Zarządzanie danymi w bazie")
         style = ttk.Style()
         style.theme_use("clam")
 
         # UI: Wybór tabeli
-        self.table_selector = ttk.Combobox(root, state="readonly")
+        self.table_selector = ttk.Combobox(root, state="readonly", postcommand=self.refresh_table_list)
         self.table_selector['values'] = self.db_manager.get_tables()
         self.table_selector.bind("<<ComboboxSelected>>", self.load_table_data)
         self.table_selector.pack(pady=10)
 
-        # UI: Tabela danych
-        self.tree = ttk.Treeview(root, show="headings")
-        self.tree.pack(fill=tk.BOTH, expand=True, pady=10)
+        # UI: Filtry kolumn (Enter stosuje filtry; podpowiedź składni w etykiecie)
+        self.filter_frame = tk.Frame(root)
+        self.filter_frame.pack(fill=tk.X, padx=10)
+
+        # UI: Tabela danych (wiersze doładowywane stronami podczas przewijania)
+        tree_frame = tk.Frame(root)
+        tree_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        self.tree = ttk.Treeview(tree_frame, show="headings")
+        self.tree_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        #Ctrl+A zaznacza wszystkie wczytane wiersze (operacje zbiorcze)
+        self.tree.bind("<Control-a>", self.select_all_rows)
+        self.tree.pack(side="left", fill=tk.BOTH, expand=True)
+        self.tree_scrollbar.pack(side="right", fill="y")
 
         # UI: Przyciski
         button_frame = tk.Frame(root)
@@ -166,6 +565,31 @@ class DataManagementApp:
         self.report_button = tk.Button(button_frame, text="Wygeneruj raport", command=self.open_report_window)
         self.report_button.grid(row=0, column=4, padx=5)
 
+        self.import_button = tk.Button(button_frame, text="Importuj CSV", command=self.import_csv)
+        self.import_button.grid(row=0, column=5, padx=5)
+
+        self.export_button = tk.Button(button_frame, text="Eksportuj", command=self.export_table_data)
+        self.export_button.grid(row=0, column=6, padx=5)
+
+        self.live_refresh_button = tk.Checkbutton(button_frame, text="Odświeżaj na żywo", variable=self.live_refresh,
+                                                  command=self.toggle_live_refresh)
+        self.live_refresh_button.grid(row=0, column=7, padx=5)
+
+        #raporty generowane w tle, aby okno nie zawieszało się podczas tworzenia PDF
+        self.report_queue = ReportQueue(root)
+        self.live_queries = QueryGroup(root, self.db_manager.queries)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def refresh_table_list(self): #przy rozwinięciu listy tabel uwzględnij ewentualne zmiany schematu
+        self.table_selector['values'] = self.db_manager.get_tables()
+
+    def on_close(self): #zamknięcie aplikacji anuluje raporty i zapytania w toku
+        self.report_queue.shutdown()
+        if self.live_refresh_id is not None:
+            self.root.after_cancel(self.live_refresh_id)
+        self.db_manager.queries.shutdown()
+        self.root.destroy()
+
     def open_report_window(self):
         def open_param_window(report_type):
             """Otwarcie okna do wprowadzania parametrów dla raportu."""
@@ -189,10 +613,19 @@ class DataManagementApp:
                         messagebox.showerror("Błąd", "Wprowadź obie daty.")
                         return
                     param_window.destroy()
-                    subprocess.run(["python", "raport.py", "2", start_date, end_date])  # Wywołanie raportu z wykresem
-                    messagebox.showinfo("Sukces", "Raport został zapisany jako \"liczba_dostaw.pdf\".")
+                    self.run_report("2", start_date, end_date)  # Wywołanie raportu z wykresem
+
+                def export_params():
+                    start_date = start_date_entry.get().strip()
+                    end_date = end_date_entry.get().strip()
+                    if not start_date or not end_date:
+                        messagebox.showerror("Błąd", "Wprowadź obie daty.")
+                        return
+                    param_window.destroy()
+                    self.export_report_data("2", start_date, end_date)
 
                 tk.Button(param_window, text="Wygeneruj raport", command=submit_params).pack(pady=10)
+                tk.Button(param_window, text="Eksportuj dane", command=export_params).pack()
 
             elif report_type == "Formularz":
                 tk.Label(param_window, text="ID przesyłki:").pack(pady=5)
@@ -205,14 +638,21 @@ class DataManagementApp:
                         messagebox.showerror("Błąd", "Podaj ID przesyłki.")
                         return
                     param_window.destroy()
-                    subprocess.run(["python", "raport.py", "3", przesylka_id])  # Wywołanie raportu w formie formularza
-                    messagebox.showinfo("Sukces", "Raport został zapisany jako \"szczegoly_przesylki.pdf\".")
+                    self.run_report("3", przesylka_id)  # Wywołanie raportu w formie formularza
+
+                def export_params():
+                    przesylka_id = przesylka_id_entry.get().strip()
+                    if not przesylka_id:
+                        messagebox.showerror("Błąd", "Podaj ID przesyłki.")
+                        return
+                    param_window.destroy()
+                    self.export_report_data("3", przesylka_id)
 
                 tk.Button(param_window, text="Wygeneruj raport", command=submit_params).pack(pady=10)
+                tk.Button(param_window, text="Eksportuj dane", command=export_params).pack()
 
         def generate_grouped_report():
-            subprocess.run(["python", "raport.py", "1"])  # Wywołanie raportu z grupowaniem
-            messagebox.showinfo("Sukces", "Raport został zapisany jako \"lista_pracownikow.pdf\".")
+            self.run_report("1")  # Wywołanie raportu z grupowaniem
 
         #główne okno wyboru raportu
         report_window = tk.Toplevel(self.root)
@@ -223,33 +663,427 @@ class DataManagementApp:
 
         tk.Button(report_window, text="Lista pracowników na danych stanowiskach",
                   command=lambda: [report_window.destroy(), generate_grouped_report()]).pack(pady=5)
+        tk.Button(report_window, text="Eksportuj dane listy pracowników",
+                  command=lambda: [report_window.destroy(), self.export_report_data("1")]).pack(pady=5)
         tk.Button(report_window, text="Realizacja dostaw przez kurierów w określonym czasie",
                   command=lambda: [report_window.destroy(), open_param_window("Wykres")]).pack(pady=5)
         tk.Button(report_window, text="Szczegóły przesyłki",
                   command=lambda: [report_window.destroy(), open_param_window("Formularz")]).pack(pady=5)
 
-    def load_table_data(self, event=None): #Ładuje dane z wybranej tabeli.
-        self.current_table = self.table_selector.get()
-        columns, rows = self.db_manager.get_data(self.current_table)
+    def run_report(self, report_type, *params): #zleca raport do kolejki w tle i pokazuje okno postępu
+        phases = list(raport.REPORT_PHASES)
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(raport.REPORTS[report_type][1])
+        phase_label = tk.Label(progress_window, text="Oczekiwanie w kolejce...", width=40)
+        phase_label.pack(padx=10, pady=5)
+        progress_bar = ttk.Progressbar(progress_window, maximum=len(phases), length=250)
+        progress_bar.pack(padx=10, pady=5)
+
+        def close_window():
+            if progress_window.winfo_exists():
+                progress_window.destroy()
+
+        def on_progress(phase):
+            if not progress_window.winfo_exists():
+                return
+            if phase in raport.REPORT_NOTICES: #komunikat, a nie etap - pasek postępu bez zmian
+                phase_label.config(text=raport.REPORT_NOTICES[phase])
+                return
+            phase_label.config(text=raport.REPORT_PHASES[phase])
+            progress_bar['value'] = phases.index(phase)
+
+        def on_done(output_path):
+            close_window()
+            if output_path is None:
+                messagebox.showinfo("Informacja", "Brak danych dla podanych parametrów raportu.")
+            else:
+                messagebox.showinfo("Sukces", f"Raport został zapisany jako \"{output_path}\".")
+
+        def on_error(error):
+            close_window()
+            messagebox.showerror("Błąd", f"Nie udało się wygenerować raportu: {error}")
+
+        job = self.report_queue.submit(report_type, *params, on_progress=on_progress, on_done=on_done,
+                                       on_error=on_error, on_cancelled=close_window)
+
+        tk.Button(progress_window, text="Anuluj", command=job.cancel).pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", job.cancel)
+
+    def import_csv(self): #masowy import wierszy z pliku CSV do wybranej tabeli (w tle, z postępem)
+        if not self.current_table:
+            messagebox.showerror("Błąd", "Najpierw wybierz tabelę.")
+            return
+        path = filedialog.askopenfilename(
+            title=f"Import do tabeli {self.current_table}",
+            filetypes=[("Pliki CSV", "*.csv"), ("Wszystkie pliki", "*.*")],
+        )
+        if not path:
+            return
+
+        table_name = self.current_table
+        events = queue.Queue()
+        cancel_event = threading.Event()
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(f"Import CSV: {table_name}")
+        status_label = tk.Label(progress_window, text="Wczytywanie pliku...", width=50)
+        status_label.pack(padx=10, pady=10)
+        tk.Button(progress_window, text="Przerwij", command=cancel_event.set).pack(pady=5)
+
+        def worker():
+            try:
+                result = csv_import.import_csv(
+                    table_name, path, pool=self.db_manager.pool, schema=self.db_manager.schema,
+                    progress=lambda result: events.put(("progress", result.rows_read, result.rows_per_second)),
+                    cancel_event=cancel_event,
+                )
+                events.put(("done", result))
+            except Exception as e: #każdy błąd musi dotrzeć do okna postępu, inaczej poll() czekałby bez końca
+                events.put(("error", e))
+
+        def show_result(result):
+            messagebox.showinfo("Import CSV", result.summary())
+            if result.errors:
+                errors_window = tk.Toplevel(self.root)
+                errors_window.title("Błędne wiersze")
+                text = tk.Text(errors_window, width=100, height=25)
+                text.pack(fill=tk.BOTH, expand=True)
+                for line_number, message in result.errors:
+                    text.insert(tk.END, f"Wiersz {line_number}: {message}\n")
+                text.configure(state="disabled")
+            if self.current_table == table_name:
+                self.load_table_data()
+
+        def poll(): #komunikaty z wątku importu odbierane w wątku Tk
+            try:
+                while True:
+                    event = events.get_nowait()
+                    if event[0] == "progress":
+                        status_label.config(text=f"Wstawiono {event[1]} wierszy ({event[2]:.0f} wierszy/s)")
+                    elif event[0] == "done":
+                        progress_window.destroy()
+                        show_result(event[1])
+                        return
+                    else:
+                        progress_window.destroy()
+                        messagebox.showerror("Błąd", f"Import nie powiódł się: {event[1]}")
+                        return
+            except queue.Empty:
+                pass
+            self.root.after(100, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        poll()
+
+    def _ask_export_path(self, name):
+        return filedialog.asksaveasfilename(
+            title=f"Eksport: {name}",
+            initialfile=f"{name}.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx"), ("Parquet", "*.parquet")],
+        )
+
+    def export_table_data(self): #eksport bieżącej tabeli z aktywnymi filtrami i sortowaniem
+        if not self.current_table:
+            messagebox.showerror("Błąd", "Najpierw wybierz tabelę.")
+            return
+        path = self._ask_export_path(self.current_table)
+        if not path:
+            return
+        try:
+            where, params = self.db_manager.build_filter(self.current_table, self.filters)
+            self.db_manager.check_sort_column(self.current_table, self.sort_column)
+        except ValueError as e:
+            messagebox.showerror("Błąd", str(e))
+            return
+        query = f"SELECT * FROM `{self.current_table}`"
+        if where:
+            query += f" WHERE {where}"
+        if self.sort_column:
+            query += f" ORDER BY `{self.sort_column}` {'DESC' if self.sort_descending else 'ASC'}"
+        self.run_export(self.current_table, lambda progress, cancel_event: data_export.export_query(
+            query, params, path, pool=self.db_manager.pool, progress=progress, cancel_event=cancel_event))
+
+    def export_report_data(self, report_type, *params): #eksport danych raportu bez tworzenia PDF
+        path = self._ask_export_path(os.path.splitext(raport.REPORTS[report_type][2])[0])
+        if not path:
+            return
+        self.run_export(raport.REPORTS[report_type][1], lambda progress, cancel_event: data_export.export_report_data(
+            report_type, params, path, pool=self.db_manager.pool, progress=progress, cancel_event=cancel_event))
+
+    def run_export(self, name, export): #eksport w tle z oknem postępu; export(progress, cancel_event) zwraca ExportResult
+        events = queue.Queue()
+        cancel_event = threading.Event()
+
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title(f"Eksport: {name}")
+        status_label = tk.Label(progress_window, text="Wykonywanie zapytania...", width=50)
+        status_label.pack(padx=10, pady=10)
+        tk.Button(progress_window, text="Przerwij", command=cancel_event.set).pack(pady=5)
+
+        def worker():
+            try:
+                result = export(lambda result: events.put(("progress", result.rows, result.rows_per_second)),
+                                cancel_event)
+                events.put(("done", result))
+            except Exception as e: #każdy błąd (także pyarrow / openpyxl) musi zamknąć okno postępu
+                events.put(("error", e))
+
+        def poll(): #komunikaty z wątku eksportu odbierane w wątku Tk
+            try:
+                while True:
+                    event = events.get_nowait()
+                    if event[0] == "progress":
+                        status_label.config(text=f"Zapisano {event[1]} wierszy ({event[2]:.0f} wierszy/s)")
+                    elif event[0] == "done":
+                        progress_window.destroy()
+                        messagebox.showinfo("Eksport", event[1].summary())
+                        return
+                    else:
+                        progress_window.destroy()
+                        messagebox.showerror("Błąd", f"Eksport nie powiódł się: {event[1]}")
+                        return
+            except queue.Empty:
+                pass
+            self.root.after(100, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        poll()
+
+    def load_table_data(self, event=None): #Ładuje pierwszą stronę danych z wybranej tabeli.
+        if self.table_selector.get() != self.current_table: #nowa tabela - bez sortowania i filtrów
+            self.current_table = self.table_selector.get()
+            self.sort_column = None
+            self.sort_descending = False
+            self.filters = {}
+            self.build_filter_bar()
+        self.key_column = self.db_manager.get_primary_key(self.current_table)
+        self.window_keys = deque()
+        self.sort_values = {}
+        self.has_more_before = False
+        self.loading_page = False
+        #znacznik odczytany przed stroną - zmiana w trakcie wczytywania zostanie najwyżej odczytana drugi raz
+        self.live_generation += 1
+        self.live_watermark = self.db_manager.get_change_watermark(self.current_table, self.key_column) \
+            if self.key_column else None
+
+        columns, rows = self._fetch_rows()
+        self.has_more_after = len(rows) == PAGE_SIZE
 
         # Czyszczenie tabeli
         self.tree.delete(*self.tree.get_children())
         self.tree['columns'] = columns
 
-        # Ustawianie nagłówków
+        # Ustawianie nagłówków (kliknięcie sortuje: rosnąco, malejąco, bez sortowania)
         for col in columns:
-            self.tree.heading(col, text=col)
+            text = col
+            if col == self.sort_column:
+                text += " ▼" if self.sort_descending else " ▲"
+            self.tree.heading(col, text=text, command=lambda c=col: self.sort_by(c))
             self.tree.column(col, width=100, anchor=tk.W)
 
         # Dodanie danych do tabeli
-        for row in rows:
-            self.tree.insert("", "end", values=row)
+        for key, row in rows:
+            self.tree.insert("", "end", iid=str(key), values=row)
+            self.window_keys.append(key)
+
+    def toggle_live_refresh(self):
+        if self.live_refresh_id is not None:
+            self.root.after_cancel(self.live_refresh_id)
+            self.live_refresh_id = None
+        if not self.live_refresh.get():
+            return
+        if self.current_table and self.live_watermark is None:
+            messagebox.showinfo("Informacja", "Tej tabeli nie można odświeżać na żywo (brak klucza AUTO_INCREMENT "
+                                              "i wyzwalaczy dziennika zmian - patrz change_log.py).")
+            self.live_refresh.set(False)
+            return
+        self._schedule_live_refresh()
+
+    def _schedule_live_refresh(self, delay_ms=None):
+        if delay_ms is None:
+            delay_ms = int(LIVE_REFRESH_INTERVAL * 1000)
+        self.live_refresh_id = self.root.after(delay_ms, self.poll_changes)
+
+    def poll_changes(self):
+        """
+        Odświeżenie na żywo: pobiera klucze zmienione po znaczniku (zapytanie w tle), a potem same te
+        wiersze - nowe, zmienione i usunięte są podmieniane w TreeView przez refresh_rows.
+        """
+        self.live_refresh_id = None
+        if not self.live_refresh.get():
+            return
+        if self.live_watermark is None or self.loading_page:
+            self._schedule_live_refresh()
+            return
+        generation = self.live_generation
+        table_name, key_column, watermark = self.current_table, self.key_column, self.live_watermark
+
+        def on_done(columns, rows):
+            if generation != self.live_generation: #w międzyczasie wczytano inną tabelę albo inne filtry
+                self._schedule_live_refresh()
+                return
+            if rows:
+                try:
+                    self.refresh_rows([key for _, key in rows])
+                except Error as e:
+                    on_error(e)
+                    return
+                self.live_watermark = (watermark[0], rows[-1][0])
+            #pełna partia zmian - kolejne odczytywane od razu, bez czekania na następny cykl
+            self._schedule_live_refresh(1 if len(rows) >= change_log.CHANGES_LIMIT else None)
+
+        def on_error(error):
+            self.live_refresh.set(False)
+            messagebox.showerror("Błąd", f"Odświeżanie na żywo zostało wyłączone: {error}")
+
+        self.live_queries.submit(*self.db_manager.changes_query(table_name, key_column, watermark),
+                                 on_done=on_done, on_error=on_error)
+
+    def _fetch_rows(self, direction=None):
+        """
+        Pobiera stronę sąsiadującą z aktualnym oknem wierszy ("next" / "prev") albo pierwszą stronę.
+        Zwraca kolumny i listę par (klucz, wiersz). Kluczem jest wartość klucza głównego,
+        a dla tabel bez klucza głównego - numer wiersza (stronicowanie przez OFFSET).
+        """
+        sort_column = self.sort_column if self.sort_column != self.key_column else None
+        if self.key_column:
+            after = self._page_position(self.window_keys[-1]) if direction == "next" else None
+            before = self._page_position(self.window_keys[0]) if direction == "prev" else None
+            columns, rows = self.db_manager.get_page(self.current_table, self.key_column, after=after, before=before,
+                                                     sort_column=sort_column, descending=self.sort_descending,
+                                                     filters=self.filters)
+            key_index = columns.index(self.key_column) if columns else 0
+            if sort_column and columns: #pusta lista kolumn - błąd zapytania (już zgłoszony)
+                sort_index = columns.index(sort_column)
+                self.sort_values.update((row[key_index], row[sort_index]) for row in rows)
+            return columns, [(row[key_index], row) for row in rows]
+
+        if direction == "next":
+            offset, limit = self.window_keys[-1] + 1, PAGE_SIZE
+        elif direction == "prev":
+            offset = max(self.window_keys[0] - PAGE_SIZE, 0)
+            limit = self.window_keys[0] - offset
+        else:
+            offset, limit = 0, PAGE_SIZE
+        columns, rows = self.db_manager.get_page_by_offset(self.current_table, offset, limit, self.sort_column,
+                                                           self.sort_descending, self.filters)
+        return columns, [(offset + i, row) for i, row in enumerate(rows)]
+
+    def _page_position(self, key): #pozycja wiersza dla stronicowania: klucz albo (wartość sortowania, klucz)
+        if self.sort_column and self.sort_column != self.key_column:
+            return self.sort_values[key], key
+        return key
+
+    def build_filter_bar(self): #pole filtra dla każdej kolumny bieżącej tabeli
+        for widget in self.filter_frame.winfo_children():
+            widget.destroy()
+        self.filter_entries = {}
+        columns = [column["name"] for column in self.db_manager.get_columns(self.current_table)]
+        for i, column in enumerate(columns):
+            tk.Label(self.filter_frame, text=column).grid(row=0, column=i, sticky="w")
+            entry = tk.Entry(self.filter_frame, width=12)
+            entry.grid(row=1, column=i, padx=2, sticky="ew")
+            entry.bind("<Return>", self.apply_filters)
+            self.filter_entries[column] = entry
+        tk.Button(self.filter_frame, text="Filtruj", command=self.apply_filters).grid(row=1, column=len(columns), padx=2)
+        tk.Button(self.filter_frame, text="Wyczyść", command=self.clear_filters).grid(row=1, column=len(columns) + 1, padx=2)
+        tk.Label(self.filter_frame, text="tekst = początek wartości, *fragment*, =, <, >, <=, >=, <>, NULL, !NULL",
+                 fg="gray").grid(row=2, column=0, columnspan=len(columns) + 2, sticky="w")
+
+    def apply_filters(self, event=None):
+        filters = {column: entry.get().strip() for column, entry in self.filter_entries.items() if entry.get().strip()}
+        try:
+            self.db_manager.build_filter(self.current_table, filters) #sprawdzenie przed zapisaniem filtrów
+        except ValueError as e:
+            messagebox.showerror("Błąd", str(e))
+            return
+        self.filters = filters
+        self.load_table_data()
+
+    def clear_filters(self):
+        for entry in self.filter_entries.values():
+            entry.delete(0, tk.END)
+        self.filters = {}
+        self.load_table_data()
+
+    def sort_by(self, column): #kolejne kliknięcia nagłówka: rosnąco, malejąco, bez sortowania
+        if column != self.sort_column:
+            self.sort_column, self.sort_descending = column, False
+        elif not self.sort_descending:
+            self.sort_descending = True
+        else:
+            self.sort_column, self.sort_descending = None, False
+        self.load_table_data()
+
+    def on_tree_scroll(self, first, last): #doładowanie strony, gdy widok zbliża się do krawędzi okna wierszy
+        self.tree_scrollbar.set(first, last)
+        if self.loading_page or not self.window_keys:
+            return
+        if float(last) >= 0.9 and self.has_more_after:
+            self.loading_page = True
+            self.root.after_idle(self.load_next_page)
+        elif float(first) <= 0.1 and self.has_more_before:
+            self.loading_page = True
+            self.root.after_idle(self.load_previous_page)
+
+    def load_next_page(self):
+        try:
+            _, rows = self._fetch_rows("next")
+            self.has_more_after = len(rows) == PAGE_SIZE
+            top_index = self.tree.yview()[0] * len(self.window_keys)
+            for key, row in rows:
+                self.tree.insert("", "end", iid=str(key), values=row)
+                self.window_keys.append(key)
+
+            #usunięcie najstarszych wierszy z góry, aby okno miało stały rozmiar
+            excess = len(self.window_keys) - MAX_WINDOW_ROWS
+            if excess > 0:
+                self.tree.delete(*[str(self.window_keys.popleft()) for _ in range(excess)])
+                self._forget_sort_values()
+                self.has_more_before = True
+                self.tree.yview_moveto(max(top_index - excess, 0) / len(self.window_keys))
+        finally:
+            self.loading_page = False
+
+    def load_previous_page(self):
+        try:
+            _, rows = self._fetch_rows("prev")
+            self.has_more_before = len(rows) == PAGE_SIZE
+            if not rows:
+                return
+            top_index = self.tree.yview()[0] * len(self.window_keys)
+            for key, row in reversed(rows):
+                self.tree.insert("", 0, iid=str(key), values=row)
+                self.window_keys.appendleft(key)
+
+            #usunięcie wierszy z dołu okna
+            excess = len(self.window_keys) - MAX_WINDOW_ROWS
+            if excess > 0:
+                self.tree.delete(*[str(self.window_keys.pop()) for _ in range(excess)])
+                self._forget_sort_values()
+                self.has_more_after = True
+            self.tree.yview_moveto((top_index + len(rows)) / len(self.window_keys))
+        finally:
+            self.loading_page = False
 
     def show_related_data(self):
+        """
+        Dane powiązane z zaznaczonym rekordem: dla każdego klucza obcego tylko wiersz, na który
+        wskazuje jego wartość (jedno zapytanie po kluczu na powiązanie). Zapytania wszystkich powiązań
+        jednego wiersza wykonywane są równolegle w tle, a wynik trafia do gałęzi po jej rozwinięciu.
+        Każdy wiersz można rozwijać dalej - po kluczach obcych jego tabeli. Zamknięcie okna anuluje zapytania.
+        """
         if not self.current_table:
             messagebox.showerror("Błąd", "Najpierw wybierz tabelę.")
             return
 
+        selected_item = self.tree.selection()
+        if not selected_item:
+            messagebox.showerror("Błąd", "Wybierz rekord, dla którego mają zostać pokazane powiązane dane.")
+            return
+
         # Pobieranie kluczy obcych tabeli
         foreign_keys = self.db_manager.get_foreign_keys(self.current_table)
 
@@ -257,87 +1091,99 @@ class DataManagementApp:
             messagebox.showinfo("Informacja", "Brak powiązań kluczy obcych w tej tabeli.")
             return
 
-        # Sprawdzanie, czy jedna z powiązanych tabel to 'przesyłka'
-        related_tables = [ref_table for _, ref_table, _ in foreign_keys]
-        if 'przesyłka' in related_tables:
-            # Dodanie nadawcy i adresata, jeśli przesyłka jest powiązana
-            related_tables.extend(['nadawca', 'adresat'])
+        #wartości zaznaczonego wiersza (dla tabel z kluczem głównym odczytane z bazy, z właściwymi typami)
+        record = dict(zip(self.tree["columns"], self.tree.item(selected_item[0])['values']))
+        keys = self._selected_keys(selected_item[:1]) if self.key_column else []
+        if keys:
+            try:
+                columns, rows = self.db_manager.get_rows_by_keys(self.current_table, self.key_column, keys)
+            except Error as e:
+                messagebox.showerror("Błąd", f"Nie udało się pobrać rekordu: {e}")
+                return
+            if keys[0] in rows:
+                record = dict(zip(columns, rows[keys[0]]))
 
         # Tworzenie nowego okna dialogowego
         related_window = tk.Toplevel(self.root)
-        related_window.title("Powiązane dane")
-        related_window.geometry("600x400")  # Ustawienie początkowych, mniejszych wymiarów
-        related_window.minsize(600, 400)
-
-        # Dodanie canvas i scrollbar
-        canvas = tk.Canvas(related_window)
-        scrollbar = ttk.Scrollbar(related_window, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side="left", fill="both", expand=True)
+        related_window.title(f"Powiązane dane: {self.current_table}")
+        related_window.geometry("800x400")
+        related_window.minsize(600, 300)
+
+        related_tree = ttk.Treeview(related_window, columns=("dane",), show="tree headings")
+        related_tree.heading("#0", text="Powiązanie")
+        related_tree.heading("dane", text="Dane")
+        related_tree.column("#0", width=280, anchor="w")
+        related_tree.column("dane", width=500, anchor="w")
+        scrollbar = ttk.Scrollbar(related_window, orient="vertical", command=related_tree.yview)
+        related_tree.configure(yscrollcommand=scrollbar.set)
+        related_tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
-        # Wyświetlanie danych powiązanych tabel
-        for i, (fk_column, ref_table, ref_column) in enumerate(foreign_keys):
-            tk.Label(scrollable_frame, text=f"Powiązane dane dla: {fk_column} → {ref_table} ({ref_column})",
-                     font=("Arial", 12, "bold")).pack(pady=5)
-
-            # Pobranie danych z tabeli powiązanej
-            columns, rows = self.db_manager.get_data(ref_table)
+        #węzły jeszcze niewczytane: iid -> ("fk", tabela) albo ("row", tabela, wiersz)
+        pending = {}
+        loaded = {} #wyniki zapytań powiązań: iid -> (kolumny, wiersze) albo wyjątek
+        queries = QueryGroup(related_window, self.db_manager.queries)
+
+        def describe(row): #wiersz jako "kolumna=wartość, ..."
+            return ", ".join(f"{column}={value}" for column, value in row.items())
+
+        def add_relationships(parent, table_name, row):
+            for fk_column, ref_table, ref_column in self.db_manager.get_foreign_keys(table_name):
+                value = row.get(fk_column)
+                text = f"{fk_column} → {ref_table} ({ref_column})"
+                if value is None or value == "":
+                    related_tree.insert(parent, "end", text=text, values=("brak (NULL)",))
+                    continue
+                node = related_tree.insert(parent, "end", text=text, values=(f"{ref_column}={value}",))
+                related_tree.insert(node, "end", text="...") #znacznik, dzięki któremu węzeł można rozwinąć
+                pending[node] = ("fk", ref_table)
+                #wszystkie powiązania pobierane od razu i równolegle, zanim użytkownik rozwinie gałąź
+                queries.submit(*self.db_manager.referenced_rows_query(ref_table, ref_column, value),
+                               on_done=lambda columns, rows, node=node: on_loaded(node, (columns, rows)),
+                               on_error=lambda error, node=node: on_loaded(node, error))
+
+        def on_loaded(node, result): #wątek Tk: wynik zapytania powiązania
+            loaded[node] = result
+            if related_tree.item(node, "open"): #gałąź rozwinięta przed nadejściem wyniku
+                fill(node)
+
+        def fill(node): #wstawienie wierszy powiązanej tabeli do gałęzi
+            entry = pending.pop(node, None)
+            if entry is None:
+                return
+            related_tree.delete(*related_tree.get_children(node))
+            if entry[0] == "row":
+                add_relationships(node, entry[1], entry[2])
+                return
 
+            ref_table = entry[1]
+            result = loaded.pop(node)
+            if isinstance(result, Exception):
+                related_tree.insert(node, "end", text="Błąd", values=(f"Nie udało się pobrać danych: {result}",))
+                return
+            columns, rows = result
             if not rows:
-                tk.Label(scrollable_frame, text="Brak danych w powiązanej tabeli").pack(pady=5)
-                continue
-
-            # Tworzenie TreeView dla danych
-            related_tree = ttk.Treeview(scrollable_frame, show="headings", height=8)
-            related_tree["columns"] = columns
-
-            for col in columns:
-                related_tree.heading(col, text=col)
-                related_tree.column(col, width=100, anchor="w")
-
-            for row in rows:
-                related_tree.insert("", "end", values=row)
-
-            related_tree.pack(fill="x", padx=10, pady=5)
-
-        # Sprawdzanie, czy 'przesyłka' była wśród powiązanych tabel
-        if 'przesylka' in related_tables:
-            # Dodatkowo pokazujemy dane nadawcy i adresata
-            for ref_table in ['nadawca', 'adresat']:
-                columns, rows = self.db_manager.get_data(ref_table)
-
-                if rows:
-                    tk.Label(scrollable_frame, text=f"Powiązane dane dla: {ref_table}",
-                             font=("Arial", 12, "bold")).pack(pady=5)
-
-                    related_tree = ttk.Treeview(scrollable_frame, show="headings", height=8)
-                    related_tree["columns"] = columns
-
-                    for col in columns:
-                        related_tree.heading(col, text=col)
-                        related_tree.column(col, width=100, anchor="w")
-
-                    for row in rows:
-                        related_tree.insert("", "end", values=row)
-
-                    related_tree.pack(fill="x", padx=10, pady=5)
+                related_tree.insert(node, "end", text="Brak danych w powiązanej tabeli")
+            for values in rows:
+                row = dict(zip(columns, values))
+                child = related_tree.insert(node, "end", text=ref_table, values=(describe(row),))
+                if self.db_manager.get_foreign_keys(ref_table):
+                    related_tree.insert(child, "end", text="...")
+                    pending[child] = ("row", ref_table, row)
+
+        def on_open(event=None): #wczytanie rozwijanej gałęzi (albo czekanie na wynik zapytania)
+            node = related_tree.focus()
+            entry = pending.get(node)
+            if entry is None:
+                return
+            if entry[0] == "fk" and node not in loaded:
+                for child in related_tree.get_children(node):
+                    related_tree.item(child, text="Wczytywanie...")
+                return
+            fill(node)
 
-        # Automatyczne dostosowanie rozmiaru do ekranu (mniejsze okno)
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        max_width = min(screen_width, 800)
-        max_height = min(screen_height, 600)
-        related_window.geometry(f"{max_width}x{max_height}")
+        related_tree.bind("<<TreeviewOpen>>", on_open)
+        add_relationships("", self.current_table, record)
 
     def add_record(self): #dodanie nowego rekordu do aktualnie wybranej tabeli.
         if not self.current_table:
@@ -345,14 +1191,12 @@ class DataManagementApp:
             return
 
         #pobierz informacje o kolumnach
-        cursor = self.db_manager.connection.cursor()
-        cursor.execute(f"SHOW COLUMNS FROM {self.current_table};")
-        columns_info = cursor.fetchall()
+        columns_info = self.db_manager.get_columns(self.current_table)
 
         #filtrujemy kolumny, które nie są AUTO_INCREMENT
         editable_columns = [
-            col[0] for col in columns_info if
-            "auto_increment" not in col[5].lower()
+            col["name"] for col in columns_info if
+            "auto_increment" not in col["extra"].lower()
         ]
         if self.current_table == "przesylka": #specjalne traktowanie tabeli przesylka
             form_window = tk.Toplevel(self.root)
@@ -371,7 +1215,10 @@ class DataManagementApp:
 
             for i, (label, column) in enumerate(labels_and_entries):
                 tk.Label(form_window, text=label).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
-                entry = tk.Entry(form_window, width=30)
+                if column in ("ID_nadawcy", "ID_adresata"):
+                    entry = ForeignKeyPicker(form_window, self.db_manager, self.current_table, column, width=40)
+                else:
+                    entry = tk.Entry(form_window, width=30)
                 entry.grid(row=i, column=1, padx=10, pady=5)
                 entries[column] = entry
 
@@ -387,12 +1234,12 @@ class DataManagementApp:
                     ]
 
                     # Wywołanie procedury Dodaj_Nowa_Przesylke
-                    cursor.callproc("Dodaj_Nowa_Przesylke", values)
-                    self.db_manager.connection.commit()
+                    self.db_manager.call_procedure("Dodaj_Nowa_Przesylke", values)
 
                     messagebox.showinfo("Sukces", "Rekord został dodany przez procedurę.")
                     form_window.destroy()
-                    self.load_table_data()
+                    #procedura nadaje przesyłce kolejny identyfikator - nowy wiersz jest na końcu tabeli
+                    self.show_appended_rows()
                 except Error as e:
                     messagebox.showerror("Błąd", f"Nie udało się dodać rekordu przez procedurę: {e}")
 
@@ -411,11 +1258,10 @@ class DataManagementApp:
                 tk.Label(form_window, text=column).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
 
                 # Obsługa kluczy obcych
-                options = self.db_manager.get_foreign_key_options(self.current_table, column)
-                if options:
-                    combobox = ttk.Combobox(form_window, values=options, state="readonly")
-                    combobox.grid(row=i, column=1, padx=10, pady=5)
-                    entries[column] = combobox
+                if self.db_manager.schema.foreign_key(self.current_table, column):
+                    picker = ForeignKeyPicker(form_window, self.db_manager, self.current_table, column, width=40)
+                    picker.grid(row=i, column=1, padx=10, pady=5)
+                    entries[column] = picker
                 else:
                     # Obsługa zwykłych pól tekstowych
                     entry = tk.Entry(form_window, width=30)
@@ -431,20 +1277,130 @@ class DataManagementApp:
                     return
 
                 # Wstaw nowy rekord do bazy danych
-                self.db_manager.insert_data(self.current_table, editable_columns, new_values)
+                new_id = self.db_manager.insert_data(self.current_table, editable_columns, new_values)
+                if new_id is False:
+                    return
                 form_window.destroy()
-                self.load_table_data()
+                if not self.key_column:
+                    self.load_table_data()
+                elif self.key_column in editable_columns: #klucz podany w formularzu
+                    self.refresh_rows([new_values[editable_columns.index(self.key_column)]])
+                else: #klucz AUTO_INCREMENT odczytany po wstawieniu
+                    self.refresh_rows([new_id])
 
             save_button = tk.Button(form_window, text="Zapisz rekord", command=save_record)
             save_button.grid(row=len(editable_columns), column=0, columnspan=2, pady=10)
 
             form_window.mainloop()
 
+    def select_all_rows(self, event=None):
+        self.tree.selection_set(self.tree.get_children())
+        return "break"
+
+    def _selected_keys(self, items): #wartości klucza głównego zaznaczonych wierszy (iid wiersza to str(klucz))
+        keys_by_iid = {str(key): key for key in self.window_keys}
+        return [keys_by_iid[item] for item in items if item in keys_by_iid]
+
+    def _remove_rows(self, keys): #usunięcie wierszy z TreeView bez ponownego wczytywania tabeli
+        removed = {str(key) for key in keys}
+        self.tree.delete(*[iid for iid in removed if self.tree.exists(iid)])
+        self.window_keys = deque(key for key in self.window_keys if str(key) not in removed)
+        if not self.window_keys and (self.has_more_after or self.has_more_before):
+            self.load_table_data()
+
+    def _forget_sort_values(self): #wartości sortowania tylko dla wierszy, które są w oknie
+        if self.sort_values:
+            self.sort_values = {key: self.sort_values[key] for key in self.window_keys if key in self.sort_values}
+
+    def _order_key(self, key): #porządek wiersza jak w ORDER BY (NULL przed wartościami, potem klucz)
+        if not self.sort_column or self.sort_column == self.key_column:
+            return (key,)
+        value = self.sort_values.get(key)
+        return (value is not None, value, key)
+
+    def _row_position(self, key): #miejsce nowego wiersza w oknie (None, jeśli wiersz leży poza wczytanym zakresem)
+        order = [self._order_key(window_key) for window_key in self.window_keys]
+        new = self._order_key(key)
+        if self.sort_descending: #porządek malejący - porównania odwrócone
+            order.reverse()
+        try:
+            if order:
+                if self.sort_descending:
+                    before_window, after_window = new > order[-1], new < order[0]
+                else:
+                    before_window, after_window = new < order[0], new > order[-1]
+                if before_window and self.has_more_before:
+                    return None
+                if after_window and self.has_more_after:
+                    return None
+            if self.sort_descending:
+                return len(order) - bisect.bisect_right(order, new)
+            return bisect.bisect_left(order, new)
+        except TypeError: #wartości nieporównywalne w Pythonie - wiersz pojawi się po przeładowaniu
+            return None
+
+    def refresh_rows(self, keys):
+        """
+        Ponowny odczyt wskazanych wierszy po zapisie (po kluczu głównym): istniejące są podmieniane,
+        nowe wstawiane w odpowiednim miejscu okna, a usunięte znikają - bez przeładowania tabeli.
+        Pozycja przewinięcia i zaznaczenie pozostają bez zmian.
+        """
+        columns, rows = self.db_manager.get_rows_by_keys(self.current_table, self.key_column, keys, filters=self.filters)
+        sort_index = columns.index(self.sort_column) if self.sort_column in columns else None
+        #klucze z formularzy są tekstem - porównanie po str(klucz), tak jak iid w TreeView
+        found = {str(key): (key, row) for key, row in rows.items()}
+        removed = []
+        for key in keys:
+            iid = str(key)
+            if iid not in found:
+                removed.append(key)
+                continue
+            db_key, row = found[iid]
+            moved = False
+            if sort_index is not None:
+                moved = self.tree.exists(iid) and self.sort_values.get(db_key) != row[sort_index]
+                self.sort_values[db_key] = row[sort_index]
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=row)
+                if not moved:
+                    continue
+                #zmieniona wartość sortowania - wiersz przenoszony na nowe miejsce (albo poza okno)
+                self.window_keys.remove(db_key)
+                position = self._row_position(db_key)
+                if position is None:
+                    self.tree.delete(iid)
+                else:
+                    self.tree.move(iid, "", position)
+                    self.window_keys.insert(position, db_key)
+                continue
+            position = self._row_position(db_key)
+            if position is not None:
+                self.tree.insert("", position, iid=iid, values=row)
+                self.window_keys.insert(position, db_key)
+        self._remove_rows(removed)
+
+    def show_appended_rows(self): #dołączenie wierszy dodanych na końcu tabeli (np. przez procedurę), jeśli koniec jest widoczny
+        if not self.key_column or not self.window_keys:
+            self.load_table_data()
+            return
+        if self.has_more_after: #nowe wiersze leżą za wczytanym oknem - pojawią się przy przewijaniu
+            return
+        if self.sort_column and self.sort_column != self.key_column: #nowe klucze nie muszą być na końcu porządku
+            self.load_table_data()
+            return
+        _, rows = self._fetch_rows("next")
+        for key, row in rows:
+            self.tree.insert("", "end", iid=str(key), values=row)
+            self.window_keys.append(key)
+
     def edit_record(self): #edycja rekordu
         selected_item = self.tree.selection()
         if not selected_item:
             messagebox.showerror("Błąd", "Wybierz rekord do edycji.")
             return
+        if len(selected_item) > 1:
+            self.edit_records(selected_item)
+            return
 
         selected_values = self.tree.item(selected_item[0])['values']
 
@@ -468,23 +1424,77 @@ class DataManagementApp:
                 entries[column].get() if entries[column].get() != "" else None
                 for column in self.tree["columns"]
             ]
-            primary_key_value = selected_values[0]  # Zakładamy, że pierwsza kolumna to klucz główny
+            columns_to_update = list(self.tree["columns"])
+            #klucz główny z katalogu schematu; bez niego - jak dotąd - pierwsza kolumna
+            primary_key_column = self.key_column or columns_to_update[0]
+            key_index = columns_to_update.index(primary_key_column)
+            primary_key_value = selected_values[key_index]
 
             if primary_key_value is None:
                 messagebox.showerror("Błąd", "Nie można edytować rekordu bez klucza głównego.")
                 return
 
-            columns_to_update = self.tree["columns"]
-            self.db_manager.update_data(self.current_table, columns_to_update, updated_values, columns_to_update[0],
-                                        primary_key_value)
+            updated = self.db_manager.update_data(self.current_table, columns_to_update, updated_values,
+                                                  primary_key_column, primary_key_value)
             form_window.destroy()
-            self.load_table_data()  # Odśwież tabelę
+            if not self.key_column:
+                self.load_table_data()  # Odśwież tabelę
+                return
+            if not updated:
+                return
+            #podmiana edytowanego wiersza; przy zmianie klucza stary wiersz znika, a nowy trafia na swoje miejsce
+            new_key = updated_values[key_index]
+            keys = [primary_key_value] if str(new_key) == str(primary_key_value) else [primary_key_value, new_key]
+            self.refresh_rows(keys)
+            if self.tree.exists(str(new_key)):
+                self.tree.selection_set(str(new_key))
 
         save_button = tk.Button(form_window, text="Zapisz zmiany", command=save_changes)
         save_button.grid(row=len(self.tree["columns"]), column=0, columnspan=2)
 
+    def edit_records(self, items):
+        """
+        Zbiorcza edycja zaznaczonych rekordów: wypełnione pola są ustawiane we wszystkich
+        wierszach jednym UPDATE ... WHERE klucz IN (...) (partiami, w jednej transakcji).
+        """
+        if not self.key_column:
+            messagebox.showerror("Błąd", "Zbiorcza edycja wymaga tabeli z kluczem głównym.")
+            return
+        keys = self._selected_keys(items)
 
-    def delete_record(self): #usuwanie wybranego rekordu
+        form_window = tk.Toplevel(self.root)
+        form_window.title(f"Edytuj {len(keys)} rekordów w tabeli: {self.current_table}")
+        hint = tk.Label(form_window, text="Wypełnij tylko pola, które mają zostać zmienione we wszystkich zaznaczonych rekordach.")
+        hint.grid(row=0, column=0, columnspan=2, padx=10, pady=5)
+
+        entries = {}
+        columns = [column for column in self.tree["columns"] if column != self.key_column]
+        for i, column in enumerate(columns, start=1):
+            tk.Label(form_window, text=column).grid(row=i, column=0, sticky=tk.W, padx=10)
+            entry = tk.Entry(form_window)
+            entry.grid(row=i, column=1, padx=10)
+            entries[column] = entry
+
+        def save_changes():
+            changes = {column: entry.get() for column, entry in entries.items() if entry.get() != ""}
+            if not changes:
+                messagebox.showerror("Błąd", "Nie wpisano żadnej zmiany.")
+                return
+            if not messagebox.askyesno("Potwierdzenie", f"Czy na pewno chcesz zmienić {len(keys)} rekordów?"):
+                return
+            try:
+                updated = self.db_manager.update_many(self.current_table, self.key_column, keys, changes)
+            except Error as e:
+                messagebox.showerror("Błąd", f"Nie udało się zaktualizować rekordów: {e}")
+                return
+            form_window.destroy()
+            self.refresh_rows(keys)
+            messagebox.showinfo("Sukces", f"Zaktualizowano {updated} rekordów.")
+
+        save_button = tk.Button(form_window, text="Zapisz zmiany", command=save_changes)
+        save_button.grid(row=len(columns) + 1, column=0, columnspan=2, pady=10)
+
+    def delete_record(self): #usuwanie zaznaczonych rekordów (jedno potwierdzenie dla całej operacji)
         if not self.current_table:
             messagebox.showerror("Błąd", "Najpierw wybierz tabelę.")
             return
@@ -494,74 +1504,58 @@ class DataManagementApp:
             messagebox.showerror("Błąd", "Wybierz rekord do usunięcia.")
             return
 
-        # Pobierz nazwę klucza głównego dla aktualnej tabeli
-        cursor = self.db_manager.connection.cursor()
-        cursor.execute(f"SHOW KEYS FROM {self.current_table} WHERE Key_name = 'PRIMARY';")
-        primary_key_info = cursor.fetchone()
-
-        selected_values = self.tree.item(selected_item[0])['values']
-        if primary_key_info:
-            # Usuwanie przy użyciu klucza głównego
-            primary_key_column = primary_key_info[4]  # Kolumna klucza głównego
-            primary_key_value = selected_values[
-                0]  # Zakładamy, że klucz główny jest w pierwszej kolumnie (zgodnej z TreeView)
-
-            confirmation = messagebox.askyesno(
-                "Potwierdzenie",
-                f"Czy na pewno chcesz usunąć rekord o wartości {primary_key_value}?"
-            )
-            if confirmation:
-                self.db_manager.delete_data(self.current_table, primary_key_column, primary_key_value)
-                self.load_table_data()  # Odśwież tabelę
+        if self.key_column:
+            # Usuwanie przy użyciu klucza głównego: DELETE ... WHERE klucz IN (...)
+            keys = self._selected_keys(selected_item)
+            if len(keys) == 1:
+                question = f"Czy na pewno chcesz usunąć rekord o wartości {keys[0]}?"
+            else:
+                question = f"Czy na pewno chcesz usunąć {len(keys)} zaznaczonych rekordów?"
+            if not messagebox.askyesno("Potwierdzenie", question):
+                return
+            try:
+                deleted = self.db_manager.delete_many(self.current_table, self.key_column, keys)
+            except Error as e:
+                messagebox.showerror("Błąd", f"Nie udało się usunąć rekordów: {e}")
+                return
+            self._remove_rows(keys)
+            messagebox.showinfo("Sukces", f"Usunięto rekordów: {deleted}.")
         else:
             # Obsługa tabeli bez klucza głównego
+            rows = [self.tree.item(item)['values'] for item in selected_item]
             confirmation = messagebox.askyesno(
                 "Potwierdzenie",
-                f"Nie znaleziono klucza głównego.\nCzy na pewno chcesz usunąć ten rekord?"
+                f"Nie znaleziono klucza głównego.\nCzy na pewno chcesz usunąć zaznaczone rekordy ({len(rows)})?"
             )
             if confirmation:
-                self.delete_data_without_primary_key(self.current_table, selected_values)
+                self.delete_data_without_primary_key(self.current_table, rows)
                 self.load_table_data()
 
-    def delete_data_without_primary_key(self, table_name, row_values):
+    def delete_data_without_primary_key(self, table_name, rows):
         """
-        Usuwa rekord z tabeli bez klucza głównego.
-        Tworzy zapytanie `DELETE` na podstawie wszystkich wartości z wiersza.
+        Usuwa rekordy z tabeli bez klucza głównego.
+        Każdy wiersz usuwany jest zapytaniem `DELETE` na podstawie wszystkich jego wartości (jedna transakcja).
         """
         try:
-            #pobierz kolumny tabeli
-            columns, _ = self.db_manager.get_data(table_name)
-
-            #utwórz zapytanie DELETE
-            conditions = []
-            for column, value in zip(columns, row_values):
-                if value is None:  # Obsługa wartości NULL
-                    conditions.append(f"`{column}` IS NULL")
-                else:
-                    conditions.append(f"`{column}` = %s")
-            condition_clause = " AND ".join(conditions)
-            query = f"DELETE FROM `{table_name}` WHERE {condition_clause} LIMIT 1;"
-
-            # Wykonaj zapytanie
-            cursor = self.db_manager.connection.cursor()
-            cursor.execute(query, [val for val in row_values if val is not None])
-            self.db_manager.connection.commit()
-
-            messagebox.showinfo("Sukces", "Rekord został usunięty.")
+            #pobierz kolumny tabeli (z katalogu schematu, bez odczytu danych)
+            columns = self.db_manager.schema.column_names(table_name)
+            deleted = self.db_manager.delete_rows_by_values(table_name, columns, rows)
+            messagebox.showinfo("Sukces", f"Usunięto rekordów: {deleted}.")
         except Error as e:
-            messagebox.showerror("Błąd", f"Nie udało się usunąć rekordu: {e}")
+            messagebox.showerror("Błąd", f"Nie udało się usunąć rekordów: {e}")
 
 
-host = os.getenv("DB_HOST")
-port = int(os.getenv("DB_PORT"))
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-database = os.getenv("DB_NAME")
+if __name__ == "__main__":
+    host = os.getenv("DB_HOST")
+    port = int(os.getenv("DB_PORT"))
+    user = os.getenv("DB_USER")
+    password = os.getenv("DB_PASSWORD")
+    database = os.getenv("DB_NAME")
 
-#tworzenie obiektu zarządzania bazą danych
-db_manager = DatabaseManager(host, port, user, password, database)
+    #tworzenie obiektu zarządzania bazą danych
+    db_manager = DatabaseManager(host, port, user, password, database)
 
-#tworzenie głównego okna aplikacji
-root = tk.Tk()
-app = DataManagementApp(root, db_manager)
-root.mainloop()
+    #tworzenie głównego okna aplikacji
+    root = tk.Tk()
+    app = DataManagementApp(root, db_manager)
+    root.mainloop()
@@ -0,0 +1,376 @@
+"""
+Pomiary czasu zapytań i generowania raportów.
+
+Włączane zmienną METRICS_ENABLED=1 (albo metrics.enable()). Wyłączone kosztują jedno sprawdzenie flagi
+na wywołanie, więc mogą zostać w kodzie produkcyjnym.
+
+    METRICS_ENABLED=1       #zbieranie pomiarów
+    METRICS_FILE=plik.jsonl #każdy pomiar dopisywany jako wiersz JSON (także z procesów roboczych)
+    SLOW_QUERY_MS=200       #zapytania wolniejsze niż próg trafiają do dziennika wolnych zapytań (stderr i METRICS_FILE)
+
+Mierzone są wywołania metod (czas, liczba wierszy, przybliżony rozmiar danych, czas oczekiwania na połączenie z puli),
+pojedyncze zapytania i etapy raportów (fetch, layout, chart, build). Podsumowanie pliku z pomiarami:
+
+    python metrics.py plik.jsonl               #zagregowane pomiary jako wiersze JSON
+    python metrics.py plik.jsonl --prometheus  #format tekstowy Prometheus
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import types
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("METRICS_FILE") or None
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "200")) / 1000
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) #granice histogramu (sekundy)
+MAX_LOGGED_QUERY = 500 #tyle znaków zapytania trafia do dziennika wolnych zapytań
+
+_local = threading.local()
+_file_lock = threading.Lock()
+_file = None
+
+
+def enable(path=None): #włączenie pomiarów w działającym procesie (opcjonalnie z zapisem do pliku JSON lines)
+    global ENABLED, METRICS_FILE
+    ENABLED = True
+    if path is not None:
+        METRICS_FILE = path
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def _emit(event): #dopisanie pomiaru do METRICS_FILE (jeden wiersz JSON)
+    global _file
+    if METRICS_FILE is None:
+        return
+    line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+    with _file_lock:
+        if _file is None or _file.name != METRICS_FILE:
+            _file = open(METRICS_FILE, "a", encoding="utf-8", buffering=1)
+        _file.write(line)
+
+
+class _Stats:
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "rows", "bytes", "wait", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.wait = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, seconds, rows=0, nbytes=0, wait=0.0, error=False):
+        self.count += 1
+        self.errors += bool(error)
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+        self.bytes += nbytes
+        self.wait += wait
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Registry:
+    """Zagregowane pomiary procesu: wywołania (nazwa) i etapy raportów (raport, etap)."""
+
+    def __init__(self):
+        self.calls = {}
+        self.phases = {}
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def record_call(self, name, seconds, rows=0, nbytes=0, wait=0.0, error=False):
+        with self._lock:
+            self.calls.setdefault(name, _Stats()).add(seconds, rows, nbytes, wait, error)
+
+    def record_phase(self, report, phase, seconds):
+        with self._lock:
+            self.phases.setdefault((report, phase), _Stats()).add(seconds)
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def add_event(self, event): #odtworzenie pomiaru z wiersza METRICS_FILE
+        if event["type"] == "call":
+            self.record_call(event["name"], event["seconds"], event.get("rows", 0), event.get("bytes", 0),
+                             event.get("wait", 0.0), event.get("error", False))
+        elif event["type"] == "phase":
+            self.record_phase(event["report"], event["phase"], event["seconds"])
+        elif event["type"] == "slow_query":
+            self.record_slow_query()
+
+    def snapshot(self): #lista słowników (jeden na metrykę) - do zapisu jako JSON lines
+        with self._lock:
+            result = []
+            for name, stats in sorted(self.calls.items()):
+                result.append({
+                    "type": "call", "name": name, "count": stats.count, "errors": stats.errors,
+                    "seconds": stats.seconds, "max_seconds": stats.max_seconds,
+                    "avg_seconds": stats.seconds / stats.count if stats.count else 0.0,
+                    "rows": stats.rows, "bytes": stats.bytes, "wait_seconds": stats.wait,
+                })
+            for (report, phase), stats in sorted(self.phases.items()):
+                result.append({
+                    "type": "phase", "report": report, "phase": phase, "count": stats.count,
+                    "seconds": stats.seconds, "max_seconds": stats.max_seconds,
+                })
+            result.append({"type": "slow_queries", "count": self.slow_queries, "threshold_seconds": SLOW_QUERY_SECONDS})
+            return result
+
+    def export_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for item in self.snapshot():
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _histogram(lines, metric, labels, stats):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {stats.count}')
+        lines.append(f"{metric}_sum{{{labels}}} {stats.seconds}")
+        lines.append(f"{metric}_count{{{labels}}} {stats.count}")
+
+    def prometheus_text(self): #format tekstowy Prometheus (exposition format 0.0.4)
+        with self._lock:
+            lines = ["# TYPE kurier_call_seconds histogram"]
+            for name, stats in sorted(self.calls.items()):
+                self._histogram(lines, "kurier_call_seconds", f'name="{name}"', stats)
+            for metric, attribute in (("kurier_call_errors_total", "errors"), ("kurier_call_rows_total", "rows"),
+                                      ("kurier_call_bytes_total", "bytes"), ("kurier_pool_wait_seconds_total", "wait")):
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in sorted(self.calls.items()):
+                    lines.append(f'{metric}{{name="{name}"}} {getattr(stats, attribute)}')
+            lines.append("# TYPE kurier_report_phase_seconds histogram")
+            for (report, phase), stats in sorted(self.phases.items()):
+                self._histogram(lines, "kurier_report_phase_seconds", f'report="{report}",phase="{phase}"', stats)
+            lines.append("# TYPE kurier_slow_queries_total counter")
+            lines.append(f"kurier_slow_queries_total {self.slow_queries}")
+            return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.phases.clear()
+            self.slow_queries = 0
+
+
+#pomiary bieżącego procesu
+registry = Registry()
+
+
+class _Call: #liczniki jednego mierzonego wywołania (zapytania wykonane w jego trakcie)
+    __slots__ = ("rows", "bytes", "wait")
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.wait = 0.0
+
+
+def _calls():
+    stack = getattr(_local, "calls", None)
+    if stack is None:
+        stack = _local.calls = []
+    return stack
+
+
+def timed(name):
+    """Dekorator: czas wywołania oraz wiersze, bajty i oczekiwanie na połączenie z zapytań wykonanych w jego trakcie."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            stack = _calls()
+            call = _Call()
+            stack.append(call)
+            error = False
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                stack.pop()
+                if stack: #wywołanie zagnieżdżone liczy się także do zewnętrznego
+                    stack[-1].rows += call.rows
+                    stack[-1].bytes += call.bytes
+                    stack[-1].wait += call.wait
+                registry.record_call(name, seconds, call.rows, call.bytes, call.wait, error)
+                _emit({"type": "call", "ts": time.time(), "name": name, "seconds": seconds, "rows": call.rows,
+                       "bytes": call.bytes, "wait": call.wait, "error": error})
+        return wrapper
+    return decorator
+
+
+def instrument_class(prefix):
+    """Dekorator klasy: `timed` dla każdej metody (oprócz metod specjalnych i statycznych)."""
+    def decorator(cls):
+        for attribute, value in list(vars(cls).items()):
+            if isinstance(value, types.FunctionType) and not attribute.startswith("__"):
+                setattr(cls, attribute, timed(f"{prefix}.{attribute}")(value))
+        return cls
+    return decorator
+
+
+def record_wait(seconds): #czas oczekiwania na połączenie z puli (db_pool)
+    if ENABLED:
+        stack = _calls()
+        if stack:
+            stack[-1].wait += seconds
+
+
+def _row_bytes(rows): #przybliżony rozmiar danych: długość tekstów i bajtów, 8 bajtów dla pozostałych wartości
+    total = 0
+    for row in rows:
+        for value in (row.values() if isinstance(row, dict) else row):
+            total += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+    return total
+
+
+def _record_rows(rows):
+    stack = _calls()
+    if stack:
+        stack[-1].rows += len(rows)
+        stack[-1].bytes += _row_bytes(rows)
+
+
+def _record_statement(query, seconds):
+    if seconds >= SLOW_QUERY_SECONDS:
+        registry.record_slow_query()
+        text = " ".join(str(query).split())[:MAX_LOGGED_QUERY]
+        print(f"Wolne zapytanie ({seconds * 1000:.0f} ms): {text}", file=sys.stderr)
+        _emit({"type": "slow_query", "ts": time.time(), "seconds": seconds, "query": text})
+
+
+class InstrumentedCursor:
+    """Kursor mierzący czas zapytań i liczący pobrane wiersze; pozostałe atrybuty przekazuje do kursora."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(query, *args, **kwargs)
+        finally:
+            _record_statement(query, time.perf_counter() - started)
+
+    def execute(self, query, *args, **kwargs):
+        return self._timed(self._cursor.execute, query, *args, **kwargs)
+
+    def executemany(self, query, *args, **kwargs):
+        return self._timed(self._cursor.executemany, query, *args, **kwargs)
+
+    def callproc(self, name, *args, **kwargs):
+        return self._timed(self._cursor.callproc, name, *args, **kwargs)
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        _record_rows(rows)
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        _record_rows(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            _record_rows([row])
+        return row
+
+
+def instrument_cursor(cursor): #kursor z pomiarami, gdy są włączone (inaczej ten sam obiekt)
+    return InstrumentedCursor(cursor) if ENABLED else cursor
+
+
+def report(name):
+    """Dekorator generatora raportu: etapy zgłaszane przez phase() są mierzone i zapisywane pod nazwą raportu."""
+    def decorator(func):
+        timed_func = timed(f"raport.{name}")(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            previous = getattr(_local, "report", None)
+            _local.report = [name, None, 0.0, {}] #raport, bieżący etap, początek etapu, etap -> suma czasu
+            started = time.perf_counter()
+            try:
+                return timed_func(*args, **kwargs)
+            finally:
+                phase(None)
+                durations = _local.report[3]
+                _local.report = previous
+                durations["total"] = time.perf_counter() - started
+                for phase_name, seconds in durations.items():
+                    registry.record_phase(name, phase_name, seconds)
+                    _emit({"type": "phase", "ts": time.time(), "report": name, "phase": phase_name, "seconds": seconds})
+        return wrapper
+    return decorator
+
+
+def phase(name):
+    """Koniec poprzedniego i początek kolejnego etapu bieżącego raportu (None kończy pomiar etapów)."""
+    if not ENABLED:
+        return
+    current = getattr(_local, "report", None)
+    if current is None:
+        return
+    now = time.perf_counter()
+    if current[1] is not None:
+        current[3][current[1]] = current[3].get(current[1], 0.0) + now - current[2]
+    current[1], current[2] = name, now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Podsumowanie pomiarów zapisanych w pliku JSON lines (METRICS_FILE).")
+    parser.add_argument("path")
+    parser.add_argument("--prometheus", action="store_true", help="wypisz w formacie tekstowym Prometheus")
+    args = parser.parse_args(argv)
+
+    summary = Registry()
+    with open(args.path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                summary.add_event(json.loads(line))
+    if args.prometheus:
+        print(summary.prometheus_text(), end="")
+    else:
+        for item in summary.snapshot():
+            print(json.dumps(item, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
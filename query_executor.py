@@ -0,0 +1,235 @@
+"""
+Współbieżne wykonywanie niezależnych zapytań SELECT na połączeniach z puli.
+
+Każde zapytanie wykonywane jest w osobnym wątku na własnym połączeniu z puli, więc czas
+kilku zapytań jest bliski czasowi najwolniejszego z nich, a nie ich sumie. Limit czasu
+pilnuje serwer (max_execution_time w MySQL, max_statement_time w MariaDB), a anulowanie
+przerywa zapytanie w toku przez KILL QUERY z osobnego połączenia. QueryGroup przekazuje wyniki do wątku Tk przez root.after().
+"""
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError
+import mysql.connector
+from mysql.connector import Error, errorcode
+from dotenv import load_dotenv
+from db_pool import get_pool
+import metrics
+
+load_dotenv()
+
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "4")) #zapytania wykonywane jednocześnie (nie więcej niż rozmiar puli)
+QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "30")) #domyślny limit czasu jednego zapytania w sekundach
+POLL_INTERVAL_MS = 50 #co ile milisekund wątek Tk odbiera wyniki zapytań
+ER_QUERY_TIMEOUT = 3024 #"maximum statement execution time exceeded" (brak w starszych errorcode)
+ER_STATEMENT_TIMEOUT = 1969 #to samo w MariaDB ("max_statement_time exceeded")
+
+
+def _timeout_statement(connection, seconds):
+    """
+    SET ustawiający limit czasu instrukcji na połączeniu (0 - bez limitu), zależnie od serwera:
+    MySQL ma max_execution_time w milisekundach, MariaDB - max_statement_time w sekundach.
+    """
+    if "mariadb" in connection.get_server_info().lower():
+        return "SET SESSION max_statement_time = %s;", (float(seconds),)
+    return "SET SESSION max_execution_time = %s;", (int(seconds * 1000),)
+
+
+class QueryTimeout(Exception):
+    """Zapytanie przekroczyło limit czasu."""
+
+
+class QueryCancelled(Exception):
+    """Zapytanie zostało anulowane (np. po zamknięciu okna)."""
+
+
+class QueryTask:
+    """Pojedyncze zapytanie zlecone do wykonania w tle; wynik to para (kolumny, wiersze)."""
+
+    def __init__(self, query, params, timeout, dictionary):
+        self.query = query
+        self.params = params
+        self.timeout = timeout
+        self.dictionary = dictionary
+        self.cancel_event = threading.Event()
+        self.connection_id = None #identyfikator wątku serwera, gdy zapytanie jest w toku
+        self.future = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def result(self, timeout=None):
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            raise QueryCancelled()
+
+
+class QueryExecutor:
+    """Pula wątków wykonująca zapytania równolegle na połączeniach z puli."""
+
+    def __init__(self, pool=None, max_workers=QUERY_WORKERS, timeout=QUERY_TIMEOUT):
+        self.pool = pool or get_pool()
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=min(max_workers, self.pool.size), thread_name_prefix="zapytanie")
+
+    def submit(self, query, params=None, timeout=None, dictionary=False):
+        """Zleca zapytanie i od razu zwraca QueryTask. `timeout` w sekundach (None - domyślny limit)."""
+        task = QueryTask(query, params, self.timeout if timeout is None else timeout, dictionary)
+        task.future = self.executor.submit(self._run, task)
+        return task
+
+    def _run(self, task): #wykonywane w wątku roboczym
+        if task.cancelled:
+            raise QueryCancelled()
+        with self.pool.connection() as connection:
+            cursor = metrics.instrument_cursor(connection.cursor(dictionary=task.dictionary))
+            try:
+                #limit dotyczy tylko instrukcji SELECT, a po zakończeniu połączenie wraca do puli bez niego
+                timeout_query, timeout_params = _timeout_statement(connection, task.timeout)
+                cursor.execute(timeout_query, timeout_params)
+                with task._lock:
+                    task.connection_id = connection.connection_id
+                try:
+                    if task.cancelled:
+                        raise QueryCancelled()
+                    cursor.execute(task.query, task.params)
+                    columns = [column[0] for column in cursor.description]
+                    return columns, cursor.fetchall()
+                except Error as e:
+                    if e.errno in (ER_QUERY_TIMEOUT, ER_STATEMENT_TIMEOUT):
+                        raise QueryTimeout(f"Zapytanie przekroczyło limit czasu {task.timeout:g} s.") from e
+                    if task.cancelled and e.errno in (errorcode.ER_QUERY_INTERRUPTED, errorcode.CR_SERVER_LOST):
+                        raise QueryCancelled() from e
+                    raise
+                finally:
+                    #po zwolnieniu blokady KILL QUERY nie trafi już w kolejne zapytanie na tym połączeniu
+                    with task._lock:
+                        task.connection_id = None
+                    try:
+                        cursor.execute(timeout_query.replace("%s", "DEFAULT"))
+                    except Error:
+                        pass #zerwane połączenie pula i tak zamknie
+            finally:
+                cursor.close()
+
+    def cancel(self, task):
+        """Anuluje zapytanie: czekające nie wystartuje, a trwające jest przerywane przez KILL QUERY."""
+        task.cancel_event.set()
+        task.future.cancel()
+        with task._lock:
+            connection_id = task.connection_id
+            if connection_id is None:
+                return
+            #osobne połączenie spoza puli - przy zajętej puli anulowanie nie może czekać na wolne połączenie
+            try:
+                connection = mysql.connector.connect(**self.pool.connect_args)
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"KILL QUERY {int(connection_id)};")
+                finally:
+                    connection.close()
+            except Error:
+                pass #zapytanie i tak zakończy się najpóźniej po upływie limitu czasu
+
+    def run_all(self, queries, timeout=None):
+        """
+        Wykonuje równolegle zapytania {nazwa: (zapytanie, parametry)} i czeka na wszystkie.
+        Zwraca {nazwa: (kolumny, wiersze)}; pierwszy błąd anuluje pozostałe zapytania i jest zgłaszany dalej.
+        """
+        tasks = {name: self.submit(query, params, timeout) for name, (query, params) in queries.items()}
+        try:
+            #dodatkowy margines po stronie klienta - serwer przerywa zapytanie po `timeout`
+            return {name: task.result(task.timeout + 5) for name, task in tasks.items()}
+        except TimeoutError:
+            raise QueryTimeout("Zapytanie przekroczyło limit czasu.")
+        finally:
+            for task in tasks.values():
+                if not task.future.done():
+                    self.cancel(task)
+
+    def shutdown(self): #anuluje zlecone zapytania i zatrzymuje pulę wątków
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class QueryGroup:
+    """
+    Zapytania należące do jednego okna Tk. Funkcje zwrotne wywoływane są w wątku Tk
+    (wyniki odbierane co POLL_INTERVAL_MS przez after()), a zamknięcie okna anuluje
+    wszystkie zapytania grupy, także te w toku.
+    """
+
+    def __init__(self, widget, executor):
+        self.widget = widget
+        self.executor = executor
+        self.events = queue.Queue()
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self._poll_id = None
+        self.closed = False
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    def submit(self, query, params=None, on_done=None, on_error=None, timeout=None):
+        """`on_done(kolumny, wiersze)` albo `on_error(wyjątek)` - w wątku Tk, o ile okno jest wciąż otwarte."""
+        if self.closed:
+            return None
+        task_id = next(self._ids)
+        task = self.executor.submit(query, params, timeout)
+        self.tasks[task_id] = (task, on_done, on_error)
+        task.future.add_done_callback(lambda future: self.events.put(task_id))
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+        return task
+
+    def _poll(self): #wątek Tk: przekazanie gotowych wyników do funkcji zwrotnych
+        self._poll_id = None
+        while not self.closed:
+            try:
+                task_id = self.events.get_nowait()
+            except queue.Empty:
+                break
+            task, on_done, on_error = self.tasks.pop(task_id)
+            try:
+                columns, rows = task.result()
+            except QueryCancelled:
+                continue
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                continue
+            if on_done is not None:
+                on_done(columns, rows)
+        if self.tasks and not self.closed:
+            self._poll_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self): #anulowanie wszystkich zapytań grupy
+        self.closed = True
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        tasks, self.tasks = self.tasks, {}
+        #KILL QUERY w tle - zamknięcie okna nie czeka na połączenie z serwerem
+        threading.Thread(target=lambda: [self.executor.cancel(task) for task, _, _ in tasks.values()],
+                         daemon=True).start()
+
+    def _on_destroy(self, event):
+        if event.widget is self.widget and not self.closed:
+            self.cancel()
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(pool=None):
+    """Wspólny wykonawca zapytań dla puli (domyślnie dla puli z parametrów w .env)."""
+    pool = pool or get_pool()
+    with _executors_lock:
+        executor = _executors.get(id(pool))
+        if executor is None:
+            executor = QueryExecutor(pool)
+            _executors[id(pool)] = executor
+        return executor
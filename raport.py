@@ -1,407 +1,1058 @@
-import mysql.connector
-import matplotlib.pyplot as plt #do stworzenia wykresu
 from reportlab.platypus import TableStyle, Image
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
 from collections import defaultdict
-from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+from itertools import chain, groupby
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak, Flowable
+from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.colors import HexColor
 from datetime import datetime
-import sys
+import functools
+import importlib.util
+import io
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from mysql.connector import Error, errorcode
+from db_pool import get_pool
+import report_cache
+import metrics
+import query_executor
 
 load_dotenv()
 
-#czcionka ktora obsluguje polskie znaki
-pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#czcionka ktora obsluguje polskie znaki (rejestrowana raz na proces)
+pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(BASE_DIR, 'DejaVuSans.ttf')))
+
+#etapy generowania raportu zgłaszane przez parametr `progress`
+REPORT_PHASES = {
+    "fetch": "Pobieranie danych",
+    "layout": "Układanie raportu",
+    "build": "Tworzenie pliku PDF",
+}
+
+#komunikaty zgłaszane przez `progress` obok etapów (bez wpływu na postęp i pomiary etapów)
+REPORT_NOTICES = {
+    "sequential": "Brak pakietu pypdf - raport składany w jednym procesie",
+}
+
+
+class ReportCancelled(Exception):
+    """Zgłaszany przez funkcję `progress`, gdy generowanie raportu zostało anulowane."""
+
+
+def _notify(progress, phase):
+    """Zgłasza rozpoczęcie etapu (albo komunikat z REPORT_NOTICES); `progress` może przerwać raport wyjątkiem ReportCancelled."""
+    if phase in REPORT_PHASES:
+        metrics.phase(phase)
+    if progress is not None:
+        progress(phase)
+
+
+def _write_output(target, content): #zapis gotowego PDF do ścieżki albo obiektu plikowego
+    if hasattr(target, "write"):
+        target.write(content)
+    else:
+        with open(target, "wb") as f:
+            f.write(content)
+
+
+def _pdf_cache_key(report_name, params, query, data):
+    """
+    Klucz gotowego PDF w pamięci podręcznej: raport, parametry, data (drukowana w nagłówku) i skrót danych,
+    oraz tabele, od których zależy. Ten sam klucz oznacza identyczny plik wynikowy.
+    """
+    today_date = datetime.today().strftime('%Y-%m-%d')
+    key = (report_name, tuple(params), today_date, report_cache.dataset_digest(data))
+    return key, report_cache.query_tables(query)
+
+
+def _serve_cached_pdf(output_path, pdf_cache, progress):
+    """Zapisuje PDF z pamięci podręcznej, jeśli dane raportu się nie zmieniły - układanie i doc.build są wtedy pomijane."""
+    content = report_cache.cache.get_pdf(pdf_cache[0])
+    if content is None:
+        return False
+    _notify(progress, "build")
+    _write_output(output_path, content)
+    return True
+
+
+def _build(doc, elements, progress, pdf_cache=None):
+    """
+    doc.build z raportowaniem postępu (i możliwością anulowania) po każdym elemencie.
+    `pdf_cache` - wynik _pdf_cache_key; gotowy plik jest zapisywany w pamięci podręcznej.
+    """
+    _notify(progress, "build")
+    if progress is not None:
+        doc.setProgressCallBack(lambda typ, value: progress("build"))
+    if pdf_cache is None:
+        doc.build(elements)
+        return
+
+    target = doc.filename
+    buffer = io.BytesIO()
+    doc.filename = buffer
+    doc.build(elements)
+    doc.filename = target
+    content = buffer.getvalue()
+    report_cache.cache.put_pdf(pdf_cache[0], pdf_cache[1], content)
+    _write_output(target, content)
 
-#funkcja do polaczenia z bazą MySQL i pobierania danych
+#funkcja do pobierania danych z bazy MySQL (połączenie ze wspólnej puli)
+@metrics.timed("raport.fetch_data")
 def fetch_data(query, params=None):
-    conn = mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        port = int(os.getenv("DB_PORT")),
-        user = os.getenv("DB_USER"),
-        password = os.getenv("DB_PASSWORD"),
-        database = os.getenv("DB_NAME"),
-    )
-    with conn.cursor(dictionary=True) as cursor:
+    with get_pool().cursor(dictionary=True) as cursor:
         cursor.execute(query, params)
         result = cursor.fetchall()
-    conn.close()
     return result
 
-#generowanie raportu z grupowaniem
+def fetch_cached_data(query, params=None): #fetch_data przez pamięć podręczną wyników (report_cache)
+    rows = report_cache.cache.get(query, params)
+    if rows is None:
+        rows = fetch_data(query, params)
+        report_cache.cache.put(query, params, rows)
+    return rows
 
-def generate_grouped_report():
-    today_date = datetime.today().strftime('%Y-%m-%d')
+def stream_data(query, params=None, batch_size=1000):
+    """
+    Generator wierszy czytanych niebuforowanym kursorem partiami po `batch_size`.
+    W pamięci klienta jest najwyżej jedna partia, niezależnie od liczby wierszy wyniku.
+    Połączenie z puli zajęte jest do wyczerpania (albo zamknięcia) generatora; zamknięcie przed
+    końcem wyniku (błąd w doc.build, przerwanie) zamyka połączenie zamiast doczytywać resztę wierszy.
+    """
+    with get_pool().cursor(dictionary=True, buffered=False) as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
 
-    date_style = ParagraphStyle(
-        'DateStyle',
-        fontName='DejaVuSans',
-        fontSize=10,
-        leading=16,
-        alignment=2,
-        spaceBefore=0,
-        spaceAfter=10,
-        backColor=HexColor("#20654E"),
-        textColor=HexColor("#FFFFFF"),
-    )
-
-    #tworzenie napisu z dzisiejszą datą
-    date_paragraph = Paragraph(f'Data: {today_date}', date_style)
-
-    query = """
-    SELECT imię, nazwisko, numer_tel, pensja, stanowisko
-    FROM pracownik
-    ORDER BY stanowisko, nazwisko, imię;
-    """
-    data = fetch_data(query)
-
-    doc = SimpleDocTemplate("lista_pracownikow.pdf", pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    styles['Normal'].fontName = 'DejaVuSans'
-
-    title_style = ParagraphStyle(
-        'Title',
-        fontName='DejaVuSans',
-        fontSize=18,
-        leading=24,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#FFFFFF"),
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        fontName='DejaVuSans',
-        fontSize=14,
-        leading=22,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#ABABAB"),
-    )
-    header_style = ParagraphStyle(
-        'HeaderStyle',
-        fontName='DejaVuSans',
-        fontSize=12,
-        leading=16,
-        alignment=0,  # Do lewej
-        spaceBefore=10,
-        spaceAfter=5,
-        textColor=HexColor("#20654E"),
-    )
-
-    #tytuł i podtytuł
-    title = Paragraph("Lista pracowników", title_style)
-    subtitle = Paragraph("według stanowisk", subtitle_style)
-
-    elements.append(title)
-    elements.append(subtitle)
-    elements.append(date_paragraph)
-
-    col_widths = [112, 112, 112, 112]  #szerokość kolumn w tabelce
-    #grupowanie danych według stanowiska
-    grouped_data = defaultdict(list)
-    for row in data:
-        grouped_data[row['stanowisko']].append(row)
-
-    for stanowisko, rows in grouped_data.items():
-        # Dodaj nagłówek dla stanowiska
-        header = Paragraph(f"Stanowisko: {stanowisko}", header_style)
-        elements.append(header)
-
-        # Tworzenie tabeli dla stanowiska
-        table_data = [["Imię", "Nazwisko", "Numer telefonu", "Pensja"]]
-        table_data += [[row['imię'], row['nazwisko'], row['numer_tel'], row['pensja']] for row in rows]
-        table = Table(table_data, colWidths=col_widths)
-        style = TableStyle([
+
+class _StreamingFlowables(list):
+    """
+    Lista elementów dla doc.build uzupełniana na bieżąco z generatora.
+    doc.build zdejmuje elementy z początku listy (i wkłada z powrotem części podzielonych tabel),
+    więc wystarczy trzymać kilka elementów naraz zamiast całego raportu.
+    """
+
+    def __init__(self, iterable, lookahead=8):
+        super().__init__()
+        self._source = iter(iterable)
+        self._lookahead = lookahead
+
+    def _fill(self, size):
+        while list.__len__(self) < size:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+
+    def __len__(self):
+        self._fill(self._lookahead)
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(max(index.stop or 0, self._lookahead))
+        elif index >= 0:
+            self._fill(index + 1)
+        return list.__getitem__(self, index)
+
+#wspólne style raportów - tworzone raz na proces i używane przez wszystkie raporty
+#(także przy renderowaniu zbiorczym i w usłudze, gdzie jeden proces tworzy wiele dokumentów)
+@functools.lru_cache(maxsize=None)
+def report_styles():
+    return {
+        "date": ParagraphStyle(
+            'DateStyle',
+            fontName='DejaVuSans',
+            fontSize=10,
+            leading=16,
+            alignment=2,  # Do prawej
+            spaceBefore=0,
+            spaceAfter=10,
+            backColor=HexColor("#20654E"),
+            textColor=HexColor("#FFFFFF"),
+        ),
+        "title": ParagraphStyle(
+            'Title',
+            fontName='DejaVuSans',
+            fontSize=18,
+            leading=24,
+            alignment=1,  # Wyśrodkowanie
+            spaceAfter=0,
+            backColor=HexColor("#000000"),
+            textColor=HexColor("#FFFFFF"),
+        ),
+        "subtitle": ParagraphStyle(
+            'Subtitle',
+            fontName='DejaVuSans',
+            fontSize=12,
+            leading=22,
+            alignment=1,  # Wyśrodkowanie
+            spaceAfter=0,
+            backColor=HexColor("#000000"),
+            textColor=HexColor("#ABABAB"),
+        ),
+        "subtitle_large": ParagraphStyle(
+            'SubtitleLarge',
+            fontName='DejaVuSans',
+            fontSize=14,
+            leading=22,
+            alignment=1,  # Wyśrodkowanie
+            spaceAfter=0,
+            backColor=HexColor("#000000"),
+            textColor=HexColor("#ABABAB"),
+        ),
+        "group_header": ParagraphStyle(
+            'HeaderStyle',
+            fontName='DejaVuSans',
+            fontSize=12,
+            leading=16,
+            alignment=0,  # Do lewej
+            spaceBefore=10,
+            spaceAfter=5,
+            textColor=HexColor("#20654E"),
+        ),
+        "text": ParagraphStyle(
+            'Text',
+            fontName='DejaVuSans',
+            fontSize=12,
+            leading=14,
+            spaceAfter=6
+        ),
+        "section_header": ParagraphStyle(
+            'SectionHeader',
+            fontName='DejaVuSans',
+            fontSize=14,
+            leading=18,
+            spaceBefore=6,
+            spaceAfter=6,
+            backColor=HexColor("#323232"),
+            textColor=HexColor("#FFFFFF")
+        ),
+        "table": TableStyle([
             ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),  # Nagłówek tabeli
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Wyśrodkowanie
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),  # Siatka tabeli
+        ]),
+        #kolejne części podzielonej tabeli (bez wiersza nagłówka)
+        "table_continuation": TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
             ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ])
+        ]),
+    }
+
+
+class ReportDefinition:
+    """
+    Deklaracja raportu: zapytanie z nazwami parametrów, nagłówek oraz treść - tabela kolumn (opcjonalnie
+    z grupowaniem i wykresem) albo sekcje formularza (po jednej serii sekcji na wiersz danych).
+    Każdy raport z rejestru ma tę samą obsługę: pamięć podręczną danych i PDF, tryb strumieniowy,
+    postęp z możliwością anulowania i pomiary etapów.
+
+    columns   - lista par (nagłówek kolumny, pole wiersza); col_widths - szerokości kolumn
+    group_by  - pole grupujące (zapytanie musi sortować po nim), group_label - napis nad grupą ("... {}")
+    chart     - słownik: label (pola nazwy słupka), value, xlabel, ylabel, title, top_n, dpi
+    sections  - lista (nagłówek sekcji, wiersze tekstu z polami {pole}, pole warunku albo None)
+    """
+
+    def __init__(self, key, report_type, name, output, query, params=(), fallback_query=None, title="", subtitle="",
+                 subtitle_style="subtitle", columns=None, col_widths=None, group_by=None, group_label="{}",
+                 chart=None, sections=None, require_data=False, empty_message=None):
+        self.key = key
+        self.report_type = report_type
+        self.name = name
+        self.output = output
+        self.query = query
+        self.params = tuple(params)
+        self.fallback_query = fallback_query
+        self.title = title
+        self.subtitle = subtitle
+        self.subtitle_style = subtitle_style
+        self.columns = columns or []
+        self.col_widths = col_widths
+        self.group_by = group_by
+        self.group_label = group_label
+        self.chart = chart
+        self.sections = sections
+        self.require_data = require_data
+        self.empty_message = empty_message
+        #generowanie z pomiarem etapów pod nazwą raportu
+        self.render = metrics.report(key)(functools.partial(_render_report, self))
+
+    def param_values(self, params): #parametry jako słownik nazwa -> wartość (do napisów nagłówka)
+        if len(params) != len(self.params):
+            raise ValueError(f"Raport {self.name} wymaga parametrów: {', '.join(self.params) or 'brak'}")
+        return dict(zip(self.params, params))
+
+
+def _header_elements(definition, params): #tytuł, podtytuł i data raportu
+    styles = report_styles()
+    values = definition.param_values(params)
+    today_date = datetime.today().strftime('%Y-%m-%d')
+    elements = [Paragraph(definition.title, styles["title"])]
+    if definition.subtitle:
+        elements.append(Paragraph(definition.subtitle.format(**values), styles[definition.subtitle_style]))
+    elements.append(Paragraph(f'Data: {today_date}', styles["date"]))
+    return elements
+
+
+def _table_flowables(definition, rows, rows_per_table=None):
+    """
+    Tabela kolumn raportu dla podanych wierszy. Przy `rows_per_table` dzielona na kolejne tabele
+    o tej liczbie wierszy; tabele kontynuacji nie mają wiersza nagłówka i stykają się krawędziami,
+    więc wyglądają jak jedna tabela.
+    """
+    styles = report_styles()
+    style = styles["table"]
+    table_data = [[header for header, _ in definition.columns]]
+    for row in rows:
+        table_data.append([row[field] for _, field in definition.columns])
+        if rows_per_table and len(table_data) >= rows_per_table:
+            table = Table(table_data, colWidths=definition.col_widths)
+            table.setStyle(style)
+            yield table
+            table_data, style = [], styles["table_continuation"]
+    if table_data:
+        table = Table(table_data, colWidths=definition.col_widths)
         table.setStyle(style)
-        elements.append(table)
-        elements.append(Spacer(1, 12))  # Odstęp między tabelami
+        yield table
+
+
+def _group_flowables(definition, group, rows, rows_per_table=None): #nagłówek, tabela i odstęp dla jednej grupy
+    yield Paragraph(definition.group_label.format(group), report_styles()["group_header"])
+    yield from _table_flowables(definition, rows, rows_per_table)
+    yield Spacer(1, 12)  # Odstęp między tabelami
+
+
+def _section_elements(definition, row): #sekcje formularza dla jednego wiersza danych
+    styles = report_styles()
+    sections = [section for section in definition.sections if section[2] is None or row[section[2]]]
+    elements = []
+    for i, (header, lines, _) in enumerate(sections):
+        elements.append(Paragraph(header, styles["section_header"]))
+        for line in lines:
+            elements.append(Paragraph(line.format(**row), styles["text"]))
+        if i < len(sections) - 1:
+            elements.append(Spacer(1, 12))
+    return elements
+
+
+def _body_flowables(definition, data, streaming=False):
+    """Treść raportu (bez nagłówka); w trybie strumieniowym tworzona na żądanie doc.build."""
+    rows_per_table = REPORT_ROWS_PER_TABLE if streaming else None
+    if definition.sections is not None:
+        yield Spacer(1, 12)
+        for row in data:
+            yield from _section_elements(definition, row)
+    elif definition.group_by is not None:
+        if streaming: #grupy kolejnych wierszy (zapytanie sortuje po polu grupującym)
+            groups = groupby(data, key=lambda row: row[definition.group_by])
+        else:
+            grouped_data = defaultdict(list)
+            for row in data:
+                grouped_data[row[definition.group_by]].append(row)
+            groups = grouped_data.items()
+        for group, rows in groups:
+            yield from _group_flowables(definition, group, rows, rows_per_table)
+    else:
+        yield Spacer(1, 12)
+        yield from _table_flowables(definition, data, rows_per_table)
+
+
+def _fetch(definition, params, streaming=False): #zwraca (zapytanie, wiersze); zapytanie zastępcze, gdy brak tabeli
+    try:
+        if streaming:
+            #pierwszy wiersz pobierany od razu, żeby błąd zapytania pojawił się tutaj, a nie w doc.build
+            rows = stream_data(definition.query, params)
+            first = next(rows, None)
+            return definition.query, chain([first], rows) if first is not None else iter(())
+        return definition.query, fetch_cached_data(definition.query, params)
+    except Error as e:
+        if definition.fallback_query is None or e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        if streaming:
+            return definition.fallback_query, stream_data(definition.fallback_query, params)
+        return definition.fallback_query, fetch_cached_data(definition.fallback_query, params)
+
+
+# Równoległe renderowanie raportów z grupowaniem
+PARALLEL_MIN_ROWS = 2000 #mniejsze raporty szybciej złożyć w jednym procesie niż uruchamiać pulę
+PARALLEL_CHUNKS_PER_WORKER = 2 #więcej części niż procesów wyrównuje czas pracy procesów
 
+
+class _PageMarker(Flowable):
+    """Niewidoczny element zapisujący numer strony (w obrębie części), na której został narysowany."""
+
+    def __init__(self, label, pages):
+        super().__init__()
+        self.label = label
+        self.pages = pages
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        self.pages.append((self.label, self.canv.getPageNumber()))
+
+
+def _split_groups(groups, parts):
+    """Dzieli kolejne grupy na `parts` ciągłych części o zbliżonej liczbie wierszy (tylko na granicach grup)."""
+    target = sum(len(rows) for _, rows in groups) / max(parts, 1)
+    chunks, chunk, size = [], [], 0
+    for group, rows in groups:
+        chunk.append((group, rows))
+        size += len(rows)
+        if size >= target:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _render_group_chunk(definition_key, groups):
+    """
+    Wywoływane w procesie roboczym: układa część grup w osobny PDF.
+    Zwraca (zawartość PDF, [(grupa, strona w części)], liczba stron).
+    """
+    definition = REPORT_DEFINITIONS[definition_key]
+    pages = []
+    elements = []
+    for group, rows in groups:
+        flowables = list(_group_flowables(definition, group, rows))
+        elements += [flowables[0], _PageMarker(group, pages)] + flowables[1:]
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
     doc.build(elements)
-    print("Raport z grupowaniem zapisano jako 'lista_pracownikow.pdf'.")
+    return buffer.getvalue(), pages, doc.page
 
 
-# Generowanie raportu z wykresem
-def generate_chart_report(start_date,end_date):
-    today_date = datetime.today().strftime('%Y-%m-%d')
+def _render_contents(definition, params, entries, first_page):
+    """Strona tytułowa ze spisem treści; numery stron grup przesunięte o `first_page` - 1. Zwraca (PDF, liczba stron)."""
+    styles = report_styles()
+    table_data = [[definition.group_by.capitalize(), "Strona"]]
+    table_data += [[group, page + first_page - 1] for group, page in entries]
+    table = Table(table_data, colWidths=[336, 112])
+    table.setStyle(styles["table"])
+    elements = _header_elements(definition, params) + [Paragraph("Spis treści", styles["group_header"]), table]
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc.build(elements)
+    return buffer.getvalue(), doc.page
+
+
+def _page_numbers(total): #PDF z samymi numerami stron "Strona i z n" do nałożenia na strony raportu
+    buffer = io.BytesIO()
+    page_canvas = canvas.Canvas(buffer, pagesize=letter)
+    for number in range(1, total + 1):
+        page_canvas.setFont('DejaVuSans', 9)
+        page_canvas.drawRightString(letter[0] - 72, 30, f"Strona {number} z {total}")
+        page_canvas.showPage()
+    page_canvas.save()
+    return buffer.getvalue()
+
+
+def _merge_parts(parts, toc, outline): #scalenie spisu treści i części z ciągłą numeracją stron i zakładkami grup
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for content in [toc] + parts:
+        writer.append(PdfReader(io.BytesIO(content)))
+    numbers = PdfReader(io.BytesIO(_page_numbers(len(writer.pages))))
+    for page, number in zip(writer.pages, numbers.pages):
+        page.merge_page(number)
+    for group, page in outline:
+        writer.add_outline_item(str(group), page - 1)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _render_parallel(definition, params, output_path, progress, workers):
+    """
+    Raport z grupowaniem renderowany w puli procesów: grupy dzielone są na części, każda część układana
+    osobno, a potem części scalane (pypdf) w jeden plik ze spisem treści i ciągłą numeracją stron.
+    Zwraca ścieżkę pliku albo None, gdy tryb równoległy nie ma sensu (mało danych, brak pypdf).
+    """
+    if importlib.util.find_spec("pypdf") is None:
+        _notify(progress, "sequential")
+        return None
+
+    _notify(progress, "fetch")
+    query, data = _fetch(definition, tuple(params))
+    if len(data) < PARALLEL_MIN_ROWS:
+        return None
+    pdf_cache = _pdf_cache_key(f"{definition.key}:równolegle", tuple(params), query, data)
+    if _serve_cached_pdf(output_path, pdf_cache, progress):
+        return output_path
+    _notify(progress, "layout")
+
+    grouped_data = defaultdict(list)
+    for row in data:
+        grouped_data[row[definition.group_by]].append(row)
+    workers = workers or os.cpu_count() or 1
+    chunks = _split_groups(list(grouped_data.items()), workers * PARALLEL_CHUNKS_PER_WORKER)
+    if len(chunks) < 2:
+        return None
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(_render_group_chunk, definition.key, chunk) for chunk in chunks]
+        try:
+            results = []
+            for future in futures:
+                results.append(future.result())
+                _notify(progress, "layout") #anulowanie sprawdzane po każdej gotowej części
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    _notify(progress, "build")
+    #numery stron grup w całym dokumencie (po spisie treści); spis budowany ponownie, jeśli zmieni liczbę stron
+    entries, offset = [], 0
+    for _, pages, page_count in results:
+        entries += [(group, offset + page) for group, page in pages]
+        offset += page_count
+    toc_pages = 1
+    while True:
+        toc, page_count = _render_contents(definition, params, entries, toc_pages + 1)
+        if page_count == toc_pages:
+            break
+        toc_pages = page_count
+    outline = [(group, page + toc_pages) for group, page in entries]
+    content = _merge_parts([part for part, _, _ in results], toc, outline)
+    report_cache.cache.put_pdf(pdf_cache[0], pdf_cache[1], content)
+    _write_output(output_path, content)
+    return output_path
+
+def _render_report(definition, params, output_path, progress=None, streaming=False, parallel=False, workers=None,
+                   **chart_options):
+    chart = dict(definition.chart, **chart_options) if definition.chart else None
+    if streaming and chart:
+        raise ValueError("Raport z wykresem wymaga wszystkich danych naraz - tryb strumieniowy jest niedostępny.")
+    if parallel and definition.group_by is None:
+        raise ValueError("Tryb równoległy dzieli raport na granicach grup - raport musi mieć grupowanie.")
+    if parallel and not streaming:
+        result = _render_parallel(definition, params, output_path, progress, workers)
+        if result is not None:
+            return result
+    header = _header_elements(definition, params)
+
+    _notify(progress, "fetch")
+    query, data = _fetch(definition, tuple(params), streaming)
+    if streaming:
+        _notify(progress, "layout")
+        doc = SimpleDocTemplate(output_path, pagesize=letter)
+        _build(doc, _StreamingFlowables(chain(header, _body_flowables(definition, data, streaming=True))), progress)
+        return output_path
+
+    if definition.require_data and not data:
+        if definition.empty_message:
+            print(definition.empty_message)
+        return None
+    cache_params = tuple(params) + tuple(sorted(chart_options.items()))
+    pdf_cache = _pdf_cache_key(definition.key, cache_params, query, data)
+    if _serve_cached_pdf(output_path, pdf_cache, progress):
+        return output_path
+    _notify(progress, "layout")
+
+    doc = SimpleDocTemplate(output_path, pagesize=letter)
+    elements = header + list(_body_flowables(definition, data))
+
+    if chart:
+        names = [" ".join(str(row[field]) for field in chart["label"]) for row in data]
+        values = [row[chart["value"]] for row in data]
+        metrics.phase("chart")
+        image = _render_bar_chart(*_top_n_with_others(names, values, chart.get("top_n")), dpi=chart["dpi"],
+                                  xlabel=chart["xlabel"], ylabel=chart["ylabel"], title=chart["title"])
+        metrics.phase("layout")
+        elements += [Spacer(1, 24), Image(image, width=500, height=300)]  # Spacer przed wykresem
+
+    _build(doc, elements, progress, pdf_cache)
+    return output_path
+
+
+def render_report(definition, *params, output_path=None, progress=None, streaming=False, parallel=False, workers=None,
+                  **chart_options):
+    """
+    Generuje raport z rejestru (obiekt ReportDefinition albo jego klucz) do pliku albo obiektu plikowego.
+    Zwraca ścieżkę zapisanego pliku albo None, jeśli raport wymaga danych, a ich brak.
+    `parallel` - raport z grupowaniem układany w `workers` procesach (patrz _render_parallel).
+    """
+    if not isinstance(definition, ReportDefinition):
+        definition = REPORT_DEFINITIONS[definition]
+    return definition.render(params, output_path or definition.output, progress, streaming, parallel, workers,
+                             **chart_options)
+
+
+REPORT_ROWS_PER_TABLE = 40 #tyle wierszy mieści się na stronie - w trybie strumieniowym dłuższe tabele są dzielone
+CHART_TOP_N = 20 #tylu kurierów ma osobny słupek, reszta trafia do słupka "Pozostali"
+CHART_DPI = 150 #rozdzielczość obrazka z wykresem
+
+def _top_n_with_others(names, values, top_n):
+    """Pierwsze `top_n` par (dane są posortowane malejąco) i jeden słupek z sumą pozostałych."""
+    if top_n is None or len(names) <= top_n:
+        return names, values
+    others = len(names) - top_n
+    return names[:top_n] + [f"Pozostali ({others})"], values[:top_n] + [sum(values[top_n:])]
+
+def _render_bar_chart(names, values, dpi=CHART_DPI, xlabel='Kurier', ylabel='Liczba dostaw',
+                      title='Liczba dostaw według pracowników'):
+    """
+    Wykres słupkowy jako PNG w pamięci (BytesIO) - bez pliku tymczasowego i globalnego stanu pyplot,
+    więc równoległe raporty sobie nie przeszkadzają. matplotlib (backend Agg) importowany dopiero tutaj.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-    date_style = ParagraphStyle(
-        'DateStyle',
-        fontName='DejaVuSans',
-        fontSize=10,
-        leading=16,
-        alignment=2,  # Wyśrodkowanie
-        spaceBefore=0,
-        spaceAfter=10,
-        backColor=HexColor("#20654E"),
-        textColor=HexColor("#FFFFFF"),
-    )
-
-    # Tworzenie napisu z dzisiejszą datą
-    date_paragraph = Paragraph(f'Data: {today_date}', date_style)
-    query = """
+    fig = Figure(figsize=(10, 6), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.bar(names, values, color='#20654E')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    buffer.seek(0)
+    return buffer
+
+
+GROUPED_REPORT_QUERY = """
+SELECT imię, nazwisko, numer_tel, pensja, stanowisko
+FROM pracownik
+ORDER BY stanowisko, nazwisko, imię;
+"""
+
+#liczby dostaw z dziennego podsumowania (delivery_rollup.py) - koszt zależy od liczby kurierów i dni,
+#a nie od liczby dostaw; warunek na datę jest w ON, więc kurierzy bez dostaw w zakresie mają 0
+CHART_REPORT_QUERY = """
+SELECT 
+    p.imię, 
+    p.nazwisko, 
+    p.pensja, 
+    COALESCE(SUM(dd.liczba_dostaw), 0) AS liczba_dostaw
+FROM 
+    pracownik p
+JOIN 
+    kurier k ON k.ID_kuriera = p.ID_pracownika
+LEFT JOIN 
+    dostawy_dzienne dd ON dd.ID_kuriera = k.ID_kuriera
+    AND dd.dzien BETWEEN %s AND %s
+GROUP BY 
+    p.ID_pracownika
+ORDER BY 
+    liczba_dostaw DESC;
+"""
+
+#to samo liczone wprost z realizacja_dostawy - gdy podsumowanie nie zostało jeszcze utworzone
+CHART_REPORT_SOURCE_QUERY = """
+SELECT 
+    p.imię, 
+    p.nazwisko, 
+    p.pensja, 
+    COUNT(rd.ID_przesyłki) AS liczba_dostaw
+FROM 
+    pracownik p
+JOIN 
+    kurier k ON k.ID_kuriera = p.ID_pracownika
+LEFT JOIN 
+    realizacja_dostawy rd ON rd.ID_kuriera = k.ID_kuriera
+    AND rd.data_zakonczenia >= %s AND rd.data_zakonczenia < %s + INTERVAL 1 DAY
+GROUP BY 
+    p.ID_pracownika
+ORDER BY 
+    liczba_dostaw DESC;
+"""
+
+FORM_REPORT_QUERY = """
     SELECT 
-        p.imię, 
-        p.nazwisko, 
-        p.pensja, 
-        COUNT(rd.ID_przesyłki) AS liczba_dostaw
+        p.ID_przesyłki, p.waga, p.rozmiar,
+        n.imię AS nadawca_imie, n.nazwisko AS nadawca_nazwisko, n.ulica AS nadawca_ulica, 
+        n.miasto AS nadawca_miasto, n.kod_pocztowy AS nadawca_kod_pocztowy, n.nr_tel AS nadawca_nr_tel,
+        a.imię AS adresat_imie, a.nazwisko AS adresat_nazwisko, a.ulica AS adresat_ulica, 
+        a.miasto AS adresat_miasto, a.kod_pocztowy AS adresat_kod_pocztowy, a.nr_tel AS adresat_nr_tel,
+        sp.stan, os.lokalizacja_paczki, os.data_zmiany_stanu, 
+        r.status_platnosci, r.forma_platnosci, r.data_wystawienia, r.kwota
     FROM 
-        pracownik p
+        przesylka p
     JOIN 
-        kurier k ON k.ID_kuriera = p.ID_pracownika
+        nadawca n ON p.ID_nadawcy = n.ID_nadawcy
+    JOIN 
+        adresat a ON p.ID_adresata = a.ID_adresata
+    JOIN 
+        opis_stanu_przesylki os ON p.ID_przesyłki = os.ID_przesyłki
+    JOIN 
+        stan_przesyłki sp ON os.ID_stanu = sp.ID_stanu
     LEFT JOIN 
-        realizacja_dostawy rd ON rd.ID_kuriera = k.ID_kuriera
+        rachunek r ON p.ID_rachunku = r.ID_rachunku
     WHERE 
-        rd.data_zakonczenia BETWEEN %s AND %s
-    GROUP BY 
-        p.ID_pracownika
-    ORDER BY 
-        liczba_dostaw DESC;
-    """
-    #start_date = input("Podaj datę początkową (YYYY-MM-DD): ")
-    #end_date = input("Podaj datę końcową (YYYY-MM-DD): ")
-    data = fetch_data(query, (start_date, end_date))
-
-    # Tworzenie stylów dla tytułu i podtytułu
-    title_style = ParagraphStyle(
-        'Title',
-        fontName='DejaVuSans',
-        fontSize=18,
-        leading=24,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#FFFFFF")
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        fontName='DejaVuSans',
-        fontSize=12,
-        leading=22,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#ABABAB"),
-    )
-    # Tytuł i podtytuł
-    title = Paragraph("Liczba zrealizowanych dostaw przez kurierów", title_style)
-    subtitle = Paragraph(f"w okresie: {start_date} - {end_date}", subtitle_style)
-
-    # Tworzenie tabeli z wynikami
-    table_data = [["Imię", "Nazwisko", "Pensja", "Liczba Dostaw"]]
-    table_data += [
-        [row['imię'], row['nazwisko'], row['pensja'], row['liczba_dostaw']] for row in data
-    ]
-    # Ustawienie proporcji szerokości kolumn
-    col_widths = [125, 125, 100, 100]  # Kolumny imię, nazwisko, pensja, liczba dostaw
-    table = Table(table_data, colWidths=col_widths)
-    table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),  # Nagłówek tabeli
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Wyśrodkowanie
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),  # Siatka tabeli
-    ]))
-
-    # Generowanie wykresu
-    names = [f"{row['imię']} {row['nazwisko']}" for row in data]
-    deliveries = [row['liczba_dostaw'] for row in data]
-    plt.figure(figsize=(10, 6))
-    plt.bar(names, deliveries, color='#20654E')
-    plt.xlabel('Kurier')
-    plt.ylabel('Liczba dostaw')
-    plt.title('Liczba dostaw według pracowników')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig('chart.png')
-    plt.close()
-
-    # Generowanie PDF
-    doc = SimpleDocTemplate("liczba_dostaw.pdf", pagesize=letter)
-    elements = [title, subtitle, date_paragraph, Spacer(1, 12), table, Spacer(1, 24)]  # Spacer przed wykresem
-
-    # Dodanie wykresu do PDF
-    img = Image("chart.png", width=500, height=300)
-    elements.append(img)
-
-    # Tworzenie dokumentu
-    doc.build(elements)
-    print("Raport z wykresem zapisano jako 'liczba_dostaw.pdf'.")
+        p.ID_przesyłki = %s
+        AND os.data_zmiany_stanu = (
+            SELECT MAX(os2.data_zmiany_stanu)
+            FROM opis_stanu_przesylki os2
+            WHERE os2.ID_przesyłki = p.ID_przesyłki
+        );
+"""
+
+#sekcje raportu o przesyłce: (nagłówek, wiersze tekstu, pole warunku - sekcja pomijana, gdy puste)
+FORM_SECTIONS = [
+    ("Szczegóły przesyłki", ["ID przesyłki: {ID_przesyłki}", "Waga: {waga} kg", "Rozmiar: {rozmiar}"], None),
+    ("Stan przesyłki", ["Aktualny stan: {stan}", "Lokalizacja: {lokalizacja_paczki}",
+                        "Data ostatniej zmiany stanu: {data_zmiany_stanu}"], None),
+    ("Nadawca", ["Imię i nazwisko: {nadawca_imie} {nadawca_nazwisko}",
+                 "Adres: {nadawca_ulica}, {nadawca_miasto}, {nadawca_kod_pocztowy}",
+                 "Numer telefonu: {nadawca_nr_tel}"], None),
+    ("Adresat", ["Imię i nazwisko: {adresat_imie} {adresat_nazwisko}",
+                 "Adres: {adresat_ulica}, {adresat_miasto}, {adresat_kod_pocztowy}",
+                 "Numer telefonu: {adresat_nr_tel}"], None),
+    ("Rachunek", ["Status płatności: {status_platnosci}", "Kwota: {kwota} PLN",
+                  "Data wystawienia: {data_wystawienia}"], "status_platnosci"),
+]
+
+#rejestr raportów - nowy raport to nowa deklaracja (klucz -> ReportDefinition)
+REPORT_DEFINITIONS = {definition.key: definition for definition in [
+    ReportDefinition(
+        "grupowanie", "1", "Raport z grupowaniem", "lista_pracownikow.pdf", GROUPED_REPORT_QUERY,
+        title="Lista pracowników", subtitle="według stanowisk", subtitle_style="subtitle_large",
+        columns=[("Imię", "imię"), ("Nazwisko", "nazwisko"), ("Numer telefonu", "numer_tel"), ("Pensja", "pensja")],
+        col_widths=[112, 112, 112, 112],
+        group_by="stanowisko", group_label="Stanowisko: {}",
+    ),
+    ReportDefinition(
+        "wykres", "2", "Raport z wykresem", "liczba_dostaw.pdf", CHART_REPORT_QUERY,
+        params=("start_date", "end_date"), fallback_query=CHART_REPORT_SOURCE_QUERY,
+        title="Liczba zrealizowanych dostaw przez kurierów", subtitle="w okresie: {start_date} - {end_date}",
+        columns=[("Imię", "imię"), ("Nazwisko", "nazwisko"), ("Pensja", "pensja"), ("Liczba Dostaw", "liczba_dostaw")],
+        col_widths=[125, 125, 100, 100],
+        chart={"label": ("imię", "nazwisko"), "value": "liczba_dostaw", "xlabel": "Kurier", "ylabel": "Liczba dostaw",
+               "title": "Liczba dostaw według pracowników", "top_n": CHART_TOP_N, "dpi": CHART_DPI},
+    ),
+    ReportDefinition(
+        "formularz", "3", "Raport", "szczegoly_przesylki.pdf", FORM_REPORT_QUERY, params=("id_przesylki",),
+        title="Przesyłka", subtitle="Zestawienie informacji o przesyłce", sections=FORM_SECTIONS,
+        require_data=True, empty_message="Brak danych dla podanego ID przesyłki.",
+    ),
+]}
+
+#generowanie raportu z grupowaniem
+def generate_grouped_report(output_path="lista_pracownikow.pdf", progress=None, streaming=False, parallel=False,
+                            workers=None):
+    """
+    Lista pracowników pogrupowana według stanowisk.
+    W trybie `streaming` wiersze czytane są niebuforowanym kursorem, a tabele grup tworzone
+    dopiero wtedy, gdy doc.build ich potrzebuje - zużycie pamięci nie rośnie z liczbą pracowników.
+    W trybie `parallel` stanowiska układane są w puli procesów, a plik ma spis treści i numery stron.
+    """
+    return render_report("grupowanie", output_path=output_path, progress=progress, streaming=streaming,
+                         parallel=parallel, workers=workers)
+
+# Generowanie raportu z wykresem
+def generate_chart_report(start_date, end_date, output_path="liczba_dostaw.pdf", progress=None,
+                          top_n=CHART_TOP_N, dpi=CHART_DPI):
+    return render_report("wykres", start_date, end_date, output_path=output_path, progress=progress,
+                         top_n=top_n, dpi=dpi)
 
 # Generowanie raportu w formie formularza
-def generate_form_report(id_przesylki):
-    today_date = datetime.today().strftime('%Y-%m-%d')
+def generate_form_report(id_przesylki, output_path="szczegoly_przesylki.pdf", progress=None):
+    return render_report("formularz", id_przesylki, output_path=output_path, progress=progress)
 
-    date_style = ParagraphStyle(
-        'DateStyle',
-        fontName='DejaVuSans',
-        fontSize=10,
-        leading=16,
-        alignment=2,  # Wyśrodkowanie
-        spaceBefore=0,
-        spaceAfter=10,
-        backColor=HexColor("#20654E"),
-        textColor=HexColor("#FFFFFF"),
-    )
-
-    # Tworzenie napisu z dzisiejszą datą
-    date_paragraph = Paragraph(f'Data: {today_date}', date_style)
-    # Pobranie danych
-    #id_przesylki = input("Podaj ID przesyłki: ")
-    query = """
-        SELECT 
-            p.ID_przesyłki, p.waga, p.rozmiar,
-            n.imię AS nadawca_imie, n.nazwisko AS nadawca_nazwisko, n.ulica AS nadawca_ulica, 
-            n.miasto AS nadawca_miasto, n.kod_pocztowy AS nadawca_kod_pocztowy, n.nr_tel AS nadawca_nr_tel,
-            a.imię AS adresat_imie, a.nazwisko AS adresat_nazwisko, a.ulica AS adresat_ulica, 
-            a.miasto AS adresat_miasto, a.kod_pocztowy AS adresat_kod_pocztowy, a.nr_tel AS adresat_nr_tel,
-            sp.stan, os.lokalizacja_paczki, os.data_zmiany_stanu, 
-            r.status_platnosci, r.forma_platnosci, r.data_wystawienia, r.kwota
-        FROM 
-            przesylka p
-        JOIN 
-            nadawca n ON p.ID_nadawcy = n.ID_nadawcy
-        JOIN 
-            adresat a ON p.ID_adresata = a.ID_adresata
-        JOIN 
-            opis_stanu_przesylki os ON p.ID_przesyłki = os.ID_przesyłki
-        JOIN 
-            stan_przesyłki sp ON os.ID_stanu = sp.ID_stanu
-        LEFT JOIN 
-            rachunek r ON p.ID_rachunku = r.ID_rachunku
-        WHERE 
-            p.ID_przesyłki = %s
-            AND os.data_zmiany_stanu = (
-                SELECT MAX(os2.data_zmiany_stanu)
-                FROM opis_stanu_przesylki os2
-                WHERE os2.ID_przesyłki = p.ID_przesyłki
-            );
-    """
-    data = fetch_data(query, (id_przesylki,))
-
-    if not data:
-        print("Brak danych dla podanego ID przesyłki.")
-        return
+# Zbiorczy raport o wielu przesyłkach
+#najnowszy stan każdej przesyłki wyznaczany jest jednym GROUP BY zamiast podzapytania skorelowanego
+FORM_BATCH_QUERY = """
+    SELECT 
+        p.ID_przesyłki, p.waga, p.rozmiar,
+        n.imię AS nadawca_imie, n.nazwisko AS nadawca_nazwisko, n.ulica AS nadawca_ulica, 
+        n.miasto AS nadawca_miasto, n.kod_pocztowy AS nadawca_kod_pocztowy, n.nr_tel AS nadawca_nr_tel,
+        a.imię AS adresat_imie, a.nazwisko AS adresat_nazwisko, a.ulica AS adresat_ulica, 
+        a.miasto AS adresat_miasto, a.kod_pocztowy AS adresat_kod_pocztowy, a.nr_tel AS adresat_nr_tel,
+        sp.stan, os.lokalizacja_paczki, os.data_zmiany_stanu, 
+        r.status_platnosci, r.forma_platnosci, r.data_wystawienia, r.kwota
+    FROM 
+        przesylka p
+    JOIN (
+        SELECT ID_przesyłki, MAX(data_zmiany_stanu) AS data_zmiany_stanu
+        FROM opis_stanu_przesylki
+        WHERE {filter}
+        GROUP BY ID_przesyłki
+    ) ostatni ON ostatni.ID_przesyłki = p.ID_przesyłki
+    JOIN 
+        opis_stanu_przesylki os ON os.ID_przesyłki = p.ID_przesyłki
+        AND os.data_zmiany_stanu = ostatni.data_zmiany_stanu
+    JOIN 
+        nadawca n ON p.ID_nadawcy = n.ID_nadawcy
+    JOIN 
+        adresat a ON p.ID_adresata = a.ID_adresata
+    JOIN 
+        stan_przesyłki sp ON os.ID_stanu = sp.ID_stanu
+    LEFT JOIN 
+        rachunek r ON p.ID_rachunku = r.ID_rachunku
+    ORDER BY 
+        p.ID_przesyłki;
+"""
 
-    # Styl tytułu i podtytułu
-    title_style = ParagraphStyle(
-        'Title',
-        fontName='DejaVuSans',
-        fontSize=18,
-        leading=24,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#FFFFFF")
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle',
-        fontName='DejaVuSans',
-        fontSize=12,
-        leading=22,
-        alignment=1,  # Wyśrodkowanie
-        spaceAfter=0,
-        backColor=HexColor("#000000"),
-        textColor=HexColor("#ABABAB"),
-    )
-    text_style = ParagraphStyle(
-        'Text',
-        fontName='DejaVuSans',
-        fontSize=12,
-        leading=14,
-        spaceAfter=6
-    )
-    section_header_style = ParagraphStyle(
-        'SectionHeader',
-        fontName='DejaVuSans',
-        fontSize=14,
-        leading=18,
-        spaceBefore=6,
-        spaceAfter=6,
-        backColor=HexColor("#323232"),
-        textColor=HexColor("#FFFFFF")
-    )
-
-    # Generowanie PDF
-    doc = SimpleDocTemplate("szczegoly_przesylki.pdf", pagesize=letter) #służy do tworzenia pdf
-    elements = []
-    elements.append(Paragraph("Przesyłka", title_style))
-    elements.append(Paragraph("Zestawienie informacji o przesyłce", subtitle_style))
-    elements.append(date_paragraph)
-    elements.append(Spacer(1, 12))
-    # Iteracja po wierszach danych
+def fetch_form_batch_data(ids=None, id_range=None, id_query=None):
+    """
+    Pobiera dane wielu przesyłek jednym zapytaniem. Przesyłki można wskazać listą ID,
+    zakresem (od, do) albo zapytaniem SQL zwracającym kolumnę ID przesyłek.
+    Zwraca listę par (ID przesyłki, wiersze) w kolejności ID.
+    """
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return []
+        filter_sql = f"ID_przesyłki IN ({', '.join(['%s'] * len(ids))})"
+        params = tuple(ids)
+    elif id_range is not None:
+        filter_sql = "ID_przesyłki BETWEEN %s AND %s"
+        params = tuple(id_range)
+    elif id_query is not None:
+        filter_sql = f"ID_przesyłki IN ({id_query.strip().rstrip(';')})"
+        params = None
+    else:
+        raise ValueError("Podaj listę ID, zakres ID albo zapytanie wybierające przesyłki.")
+
+    data = fetch_data(FORM_BATCH_QUERY.format(filter=filter_sql), params)
+    grouped = defaultdict(list)
     for row in data:
-        # Informacje o przesyłce
-        elements.append(Paragraph("Szczegóły przesyłki", section_header_style))
-        elements.append(Paragraph(f"ID przesyłki: {row['ID_przesyłki']}", text_style))
-        elements.append(Paragraph(f"Waga: {row['waga']} kg", text_style))
-        elements.append(Paragraph(f"Rozmiar: {row['rozmiar']}", text_style))
-        elements.append(Spacer(1, 12))
-        # Informacje o stanie przesyłki
-        elements.append(Paragraph("Stan przesyłki", section_header_style))
-        elements.append(Paragraph(f"Aktualny stan: {row['stan']}", text_style))
-        elements.append(Paragraph(f"Lokalizacja: {row['lokalizacja_paczki']}", text_style))
-        elements.append(Paragraph(f"Data ostatniej zmiany stanu: {row['data_zmiany_stanu']}", text_style))
-        elements.append(Spacer(1, 12))
-        # Informacje o nadawcy
-        elements.append(Paragraph("Nadawca", section_header_style))
-        elements.append(Paragraph(f"Imię i nazwisko: {row['nadawca_imie']} {row['nadawca_nazwisko']}", text_style))
-        elements.append(Paragraph(f"Adres: {row['nadawca_ulica']}, {row['nadawca_miasto']}, {row['nadawca_kod_pocztowy']}", text_style))
-        elements.append(Paragraph(f"Numer telefonu: {row['nadawca_nr_tel']}", text_style))
-        elements.append(Spacer(1, 12))
-        # Informacje o adresacie
-        elements.append(Paragraph("Adresat", section_header_style))
-        elements.append(Paragraph(f"Imię i nazwisko: {row['adresat_imie']} {row['adresat_nazwisko']}", text_style))
-        elements.append(Paragraph(f"Adres: {row['adresat_ulica']}, {row['adresat_miasto']}, {row['adresat_kod_pocztowy']}", text_style))
-        elements.append(Paragraph(f"Numer telefonu: {row['adresat_nr_tel']}", text_style))
-        elements.append(Spacer(1, 12))
-        # Informacje o rachunku
-        if row['status_platnosci']:
-            elements.append(Paragraph("Rachunek", section_header_style))
-            elements.append(Paragraph(f"Status płatności: {row['status_platnosci']}", text_style))
-            elements.append(Paragraph(f"Kwota: {row['kwota']} PLN", text_style))
-            elements.append(Paragraph(f"Data wystawienia: {row['data_wystawienia']}", text_style))
+        grouped[row['ID_przesyłki']].append(row)
+    return list(grouped.items())
 
-    doc.build(elements)
-    print("Raport zapisano jako 'szczegoly_przesylki.pdf'.")
+def _form_document(id_przesylki, rows): #nagłówek i sekcje raportu o jednej przesyłce (style z report_styles)
+    definition = REPORT_DEFINITIONS["formularz"]
+    return _header_elements(definition, (id_przesylki,)) + list(_body_flowables(definition, rows))
+
+def _render_form_documents(shipments, output_dir): #wywoływane w procesie roboczym: jeden PDF na przesyłkę
+    paths = []
+    for id_przesylki, rows in shipments:
+        path = os.path.join(output_dir, f"szczegoly_przesylki_{id_przesylki}.pdf")
+        elements = _form_document(id_przesylki, rows)
+        SimpleDocTemplate(path, pagesize=letter).build(elements)
+        paths.append(path)
+    return paths
+
+def generate_form_report_batch(ids=None, id_range=None, id_query=None, output_dir="szczegoly_przesylek",
+                               combined=False, workers=None, chunk_size=50):
+    """
+    Generuje raporty o wielu przesyłkach. Dane pobierane są jednym zapytaniem, a PDF-y
+    renderowane w puli procesów (po `chunk_size` przesyłek na zadanie) - jeden plik na przesyłkę.
+    Przy `combined=True` powstaje jeden dokument `szczegoly_przesylek.pdf` (każda przesyłka od nowej strony).
+    Zwraca słownik ze ścieżkami plików i statystykami przepustowości.
+    """
+    started = time.perf_counter()
+    shipments = fetch_form_batch_data(ids, id_range, id_query)
+    fetched = time.perf_counter()
+
+    os.makedirs(output_dir, exist_ok=True)
+    if combined:
+        elements = []
+        for id_przesylki, rows in shipments:
+            if elements:
+                elements.append(PageBreak())
+            elements += _form_document(id_przesylki, rows)
+        paths = []
+        if elements:
+            path = os.path.join(output_dir, "szczegoly_przesylek.pdf")
+            SimpleDocTemplate(path, pagesize=letter).build(elements)
+            paths.append(path)
+    else:
+        chunks = [shipments[i:i + chunk_size] for i in range(0, len(shipments), chunk_size)]
+        if len(chunks) <= 1:
+            #dla małej liczby przesyłek uruchamianie procesów kosztuje więcej niż samo renderowanie
+            paths = _render_form_documents(shipments, output_dir)
+        else:
+            paths = []
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for chunk_paths in executor.map(_render_form_documents, chunks, [output_dir] * len(chunks)):
+                    paths += chunk_paths
+    finished = time.perf_counter()
+
+    render_seconds = finished - fetched
+    return {
+        "paths": paths,
+        "shipments": len(shipments),
+        "fetch_seconds": fetched - started,
+        "render_seconds": render_seconds,
+        "total_seconds": finished - started,
+        "shipments_per_second": len(shipments) / render_seconds if render_seconds > 0 else 0.0,
+    }
+
+def _generator(definition): #funkcja generująca raport z rejestru: generate(*parametry, output_path=..., progress=...)
+    def generate(*params, output_path=definition.output, progress=None, **options):
+        return render_report(definition, *params, output_path=output_path, progress=progress, **options)
+    generate.__name__ = f"generate_{definition.key}_report"
+    return generate
+
+#typy raportów (CLI, GUI, usługa): typ -> (funkcja generująca, nazwa raportu, domyślny plik wynikowy)
+REPORTS = {
+    definition.report_type: (_generator(definition), definition.name, definition.output)
+    for definition in REPORT_DEFINITIONS.values()
+}
+
+#zapytania raportów z przykładowymi parametrami (sprawdzane przez index_advisor.py): nazwa -> (zapytanie, parametry)
+REPORT_QUERIES = {
+    "grupowanie": (GROUPED_REPORT_QUERY, ()),
+    "wykres": (CHART_REPORT_QUERY, ("2024-01-01", "2024-12-31")),
+    "wykres_bez_podsumowania": (CHART_REPORT_SOURCE_QUERY, ("2024-01-01", "2024-12-31")),
+    "formularz": (FORM_REPORT_QUERY, (1,)),
+    "formularz_zbiorczy": (FORM_BATCH_QUERY.format(filter="ID_przesyłki BETWEEN %s AND %s"), (1, 1000)),
+}
+
+#dane raportów do eksportu (data_export.py): typ -> (zapytanie, zapytanie zastępcze albo None, nazwy parametrów)
+REPORT_DATASETS = {
+    definition.report_type: (definition.query, definition.fallback_query, definition.params)
+    for definition in REPORT_DEFINITIONS.values()
+}
+
+def generate_report(report_type, *params, output_path=None, progress=None):
+    """
+    Generuje raport danego typu w bieżącym procesie (bez uruchamiania nowego interpretera).
+    Zwraca ścieżkę zapisanego pliku albo None, jeśli brak danych do raportu.
+    `progress(etap)` jest wywoływana na początku każdego etapu z REPORT_PHASES.
+    """
+    if report_type not in REPORTS:
+        raise ValueError(f"Nieznany typ raportu: {report_type}")
+    generate, _, default_path = REPORTS[report_type]
+    if output_path is None:
+        output_path = default_path
+    return generate(*params, output_path=output_path, progress=progress)
+
+def prefetch_reports(requests, executor=None):
+    """
+    Pobiera równolegle dane kilku raportów [(typ, parametry), ...] do pamięci podręcznej wyników,
+    tak aby czas pobierania był bliski czasowi najwolniejszego zapytania, a nie ich sumie.
+    """
+    definitions = {definition.report_type: definition for definition in REPORT_DEFINITIONS.values()}
+    executor = executor or query_executor.get_executor()
+    tasks = []
+    for report_type, params in requests:
+        definition = definitions[report_type]
+        params = tuple(params)
+        if report_cache.cache.get(definition.query, params) is None:
+            #bez limitu czasu (0) - jak przy pobieraniu po kolei; duże raporty nie mogą kończyć się błędem
+            tasks.append((definition, params, executor.submit(definition.query, params, timeout=0, dictionary=True)))
+    try:
+        for definition, params, task in tasks:
+            try:
+                _, rows = task.result()
+            except Error as e:
+                if definition.fallback_query is None or e.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                fetch_cached_data(definition.fallback_query, params) #brak tabeli pomocniczej - rzadki przypadek
+                continue
+            report_cache.cache.put(definition.query, params, rows)
+    finally:
+        for _, _, task in tasks:
+            if not task.future.done():
+                executor.cancel(task)
+
+def generate_reports(requests, progress=None):
+    """Generuje kilka raportów [(typ, parametry), ...] - dane wszystkich pobierane najpierw równolegle. Zwraca ścieżki."""
+    requests = [(report_type, tuple(params)) for report_type, params in requests]
+    prefetch_reports(requests)
+    return [generate_report(report_type, *params, progress=progress) for report_type, params in requests]
+
+def render_report_bytes(report_type, *params): #generuje raport w pamięci i zwraca zawartość PDF (albo None)
+    buffer = io.BytesIO()
+    if generate_report(report_type, *params, output_path=buffer) is None:
+        return None
+    return buffer.getvalue()
+
+def batch_main(args):
+    """
+    python raport.py 4 <przesyłki> [--combined] [--workers N] [--out KATALOG]
+    <przesyłki>: lista ID ("1,2,3"), zakres ("100-200") albo zapytanie ("SELECT ID_przesyłki FROM ...").
+    """
+    if not args:
+        print("Brak wymaganego parametru (lista ID, zakres od-do albo zapytanie) dla raportu zbiorczego.")
+        return
+    selection, options = args[0], args[1:]
+    kwargs = {"combined": "--combined" in options}
+    if "--workers" in options:
+        kwargs["workers"] = int(options[options.index("--workers") + 1])
+    if "--out" in options:
+        kwargs["output_dir"] = options[options.index("--out") + 1]
+
+    if selection.strip().upper().startswith("SELECT"):
+        kwargs["id_query"] = selection
+    elif "-" in selection:
+        start_id, end_id = selection.split("-", 1)
+        kwargs["id_range"] = (int(start_id), int(end_id))
+    else:
+        kwargs["ids"] = [int(value) for value in selection.split(",") if value.strip()]
+
+    stats = generate_form_report_batch(**kwargs)
+    print(f"Zapisano {len(stats['paths'])} plików dla {stats['shipments']} przesyłek.")
+    print(f"Pobieranie danych: {stats['fetch_seconds']:.2f} s, renderowanie: {stats['render_seconds']:.2f} s, "
+          f"razem: {stats['total_seconds']:.2f} s ({stats['shipments_per_second']:.1f} przesyłek/s).")
 
 def main():
     if len(sys.argv) < 2:
-        print("Brak argumentu określającego typ raportu. Wybierz 1, 2 lub 3.")
+        print("Brak argumentu określającego typ raportu. Wybierz 1, 2, 3 lub 4.")
         return
 
     choice = sys.argv[1]  # Typ raportu
+    if choice == "4":  # Zbiorczy raport o wielu przesyłkach
+        batch_main(sys.argv[2:])
+        return
+    if choice == "wszystkie":  #raporty 1, 2 i 3 naraz (dane pobierane równolegle): wszystkie <od> <do> <id_przesylki>
+        if len(sys.argv) < 5:
+            print("Brak wymaganych parametrów (start_date, end_date, id_przesylki) dla wszystkich raportów.")
+            return
+        requests = [("1", ()), ("2", (sys.argv[2], sys.argv[3])), ("3", (sys.argv[4],))]
+        for (report_type, _), output_path in zip(requests, generate_reports(requests)):
+            if output_path is not None:
+                print(f"{REPORTS[report_type][1]} zapisano jako '{output_path}'.")
+        return
     if choice == "1":  # Raport z grupowaniem
-        generate_grouped_report()
+        if "--stream" in sys.argv[2:]:  #tryb strumieniowy dla bardzo dużej liczby pracowników
+            output_path = generate_grouped_report(streaming=True)
+            print(f"{REPORTS[choice][1]} zapisano jako '{output_path}'.")
+            return
+        if "--parallel" in sys.argv[2:]:  #układanie stanowisk w wielu procesach: 1 --parallel [--workers N]
+            options = sys.argv[2:]
+            workers = int(options[options.index("--workers") + 1]) if "--workers" in options else None
+            def print_notice(phase):
+                if phase in REPORT_NOTICES:
+                    print(f"{REPORT_NOTICES[phase]}.")
+            output_path = generate_grouped_report(parallel=True, workers=workers, progress=print_notice)
+            print(f"{REPORTS[choice][1]} zapisano jako '{output_path}'.")
+            return
+        params = ()
     elif choice == "2":  # Raport z wykresem
         if len(sys.argv) < 4:  # Sprawdź, czy są przekazane daty
             print("Brak wymaganych parametrów (start_date, end_date) dla raportu z wykresem.")
             return
-        start_date = sys.argv[2]
-        end_date = sys.argv[3]
-        generate_chart_report(start_date, end_date)
+        params = (sys.argv[2], sys.argv[3])
     elif choice == "3":  # Raport w formie formularza
         if len(sys.argv) < 3:  #sprawdzenie, czy jest przekazane ID przesyłki
             print("Brak wymaganego parametru (id_przesylki) dla raportu w formie formularza.")
             return
-        id_przesylki = sys.argv[2]
-        generate_form_report(id_przesylki)
+        params = (sys.argv[2],)
     else:
-        print("Nieprawidłowy wybór. Wybierz 1, 2 lub 3.")
+        print("Nieprawidłowy wybór. Wybierz 1, 2, 3 lub 4.")
+        return
+
+    output_path = generate_report(choice, *params)
+    if output_path is not None:
+        print(f"{REPORTS[choice][1]} zapisano jako '{output_path}'.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300")) #po ilu sekundach wynik zapytania jest nieaktualny
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "64")) #maksymalna liczba zapamiętanych wyników zapytań
+REPORT_CACHE_PDF_SIZE = int(os.getenv("REPORT_CACHE_PDF_SIZE", "16")) #maksymalna liczba zapamiętanych plików PDF
+
+#tabele zmieniane przez procedury składowane (docs/dokumentacja_projektu.pdf)
+PROCEDURE_TABLES = {
+    "Dodaj_Nowa_Przesylke": {"rachunek", "przesylka", "opis_stanu_przesylki"},
+    "przypisz_kuriera_do_nadawcy": {"realizacja_dostawy"},
+    "przypisz_kuriera_do_adresata": {"realizacja_dostawy"},
+}
+#tabele zmieniane przez wyzwalacze po zapisie do danej tabeli
+TRIGGER_TABLES = {
+    "rachunek": {"opis_stanu_przesylki", "realizacja_dostawy"},
+    "realizacja_dostawy": {"opis_stanu_przesylki", "dostawy_dzienne"},
+    "opis_stanu_przesylki": {"realizacja_dostawy"},
+    "pracownik": {"kurier", "magazynier", "dostawca"},
+}
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|REPLACE\s+INTO)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def query_tables(query): #tabele, z których czyta zapytanie
+    return {table for table in _TABLE_PATTERN.findall(query)}
+
+
+def affected_tables(tables): #tabele zmieniane bezpośrednio oraz przez wyzwalacze
+    result = set()
+    pending = list(tables)
+    while pending:
+        table = pending.pop()
+        if table not in result:
+            result.add(table)
+            pending.extend(TRIGGER_TABLES.get(table, ()))
+    return result
+
+
+def dataset_digest(rows): #skrót danych raportu - ten sam zbiór wierszy daje ten sam skrót
+    payload = json.dumps(rows, default=str, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    Pamięć podręczna danych raportów (klucz: zapytanie i parametry) z czasem życia wpisu (TTL)
+    i usuwaniem najdawniej używanych wpisów (LRU). Wpis jest unieważniany, gdy aplikacja zapisze
+    coś do tabeli, z której czyta jego zapytanie. Osobno trzymane są gotowe pliki PDF
+    (klucz zawiera skrót danych), żeby przy niezmienionych danych nie wywoływać ponownie doc.build.
+    """
+
+    def __init__(self, ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_SIZE, max_pdfs=REPORT_CACHE_PDF_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_pdfs = max_pdfs
+        self._entries = OrderedDict() #klucz -> (czas zapisu, tabele, wiersze)
+        self._pdfs = OrderedDict() #klucz -> (tabele, zawartość PDF)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query, params):
+        return query, tuple(params) if params is not None else None
+
+    def get(self, query, params=None): #zapamiętane wiersze albo None
+        key = self._key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, _, rows = entry
+            if time.monotonic() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return rows
+
+    def put(self, query, params, rows):
+        key = self._key(query, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), query_tables(query), rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_pdf(self, key):
+        with self._lock:
+            entry = self._pdfs.get(key)
+            if entry is None:
+                return None
+            self._pdfs.move_to_end(key)
+            return entry[1]
+
+    def put_pdf(self, key, tables, content):
+        with self._lock:
+            self._pdfs[key] = (set(tables), content)
+            self._pdfs.move_to_end(key)
+            while len(self._pdfs) > self.max_pdfs:
+                self._pdfs.popitem(last=False)
+
+    def invalidate_tables(self, tables): #usuwa wpisy zależne od zmienionych tabel (i tabel zmienianych przez wyzwalacze)
+        tables = affected_tables(tables)
+        with self._lock:
+            for key in [key for key, (_, deps, _) in self._entries.items() if deps & tables]:
+                del self._entries[key]
+            for key in [key for key, (deps, _) in self._pdfs.items() if deps & tables]:
+                del self._pdfs[key]
+
+    def invalidate_query(self, query): #unieważnienie po zapytaniu INSERT / UPDATE / DELETE
+        match = _WRITE_PATTERN.match(query)
+        if match:
+            self.invalidate_tables({match.group(1)})
+        else:
+            self.clear()
+
+    def invalidate_procedure(self, name):
+        tables = PROCEDURE_TABLES.get(name)
+        if tables is None: #nieznana procedura może zmienić cokolwiek
+            self.clear()
+        else:
+            self.invalidate_tables(tables)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pdfs.clear()
+
+
+#wspólna pamięć podręczna procesu (GUI i raporty generowane w tym samym procesie)
+cache = ReportCache()
@@ -0,0 +1,114 @@
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import raport
+
+POLL_INTERVAL_MS = 100 #co ile milisekund wątek Tk odbiera zdarzenia z kolejki raportów
+
+
+class ReportJob:
+    """Pojedyncze zlecenie wygenerowania raportu w tle."""
+
+    def __init__(self, job_id, report_type, params, on_progress, on_done, on_error, on_cancelled):
+        self.id = job_id
+        self.report_type = report_type
+        self.params = params
+        self.phase = None
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self): #anulowanie: zadanie w kolejce nie wystartuje, a trwające przerwie się na najbliższym etapie
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+
+class ReportQueue:
+    """
+    Kolejka raportów generowanych w puli wątków, tak aby pętla Tk nie była blokowana.
+    Wątki robocze nie dotykają widżetów - zdarzenia (postęp, wynik, błąd) trafiają do
+    kolejki, którą wątek Tk odczytuje co POLL_INTERVAL_MS przez root.after().
+    Wszystkie funkcje zwrotne wywoływane są więc w wątku Tk.
+    """
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="raport")
+        self.events = queue.Queue()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def submit(self, report_type, *params, on_progress=None, on_done=None, on_error=None, on_cancelled=None):
+        job = ReportJob(next(self._ids), report_type, params, on_progress, on_done, on_error, on_cancelled)
+        self.jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job)
+
+        def on_future_done(future):
+            #zadanie anulowane przed startem nie wykona _run, więc zdarzenie trzeba wysłać tutaj
+            if future.cancelled():
+                self.events.put((job, "cancelled", None))
+
+        job.future.add_done_callback(on_future_done)
+        return job
+
+    def _run(self, job): #wykonywane w wątku roboczym
+        def progress(phase):
+            if job.cancelled:
+                raise raport.ReportCancelled()
+            if phase != job.phase:
+                job.phase = phase
+                self.events.put((job, "progress", phase))
+
+        #raport powstaje w pliku tymczasowym i dopiero gotowy zastępuje plik docelowy,
+        #dzięki czemu równoległe raporty tego samego typu nie psują sobie nawzajem wyniku
+        output_path = raport.REPORTS[job.report_type][2]
+        temp_path = f"{output_path}.{job.id}.part"
+        try:
+            progress("fetch")
+            result = raport.generate_report(job.report_type, *job.params, output_path=temp_path, progress=progress)
+            if result is not None:
+                os.replace(temp_path, output_path)
+                result = output_path
+            self.events.put((job, "done", result))
+        except raport.ReportCancelled:
+            self.events.put((job, "cancelled", None))
+        except Exception as e:
+            self.events.put((job, "error", e))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _poll(self): #wątek Tk: przekazanie zdarzeń do funkcji zwrotnych
+        while True:
+            try:
+                job, kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                callback = job.on_progress
+            else:
+                self.jobs.pop(job.id, None)
+                callback = {"done": job.on_done, "error": job.on_error, "cancelled": job.on_cancelled}[kind]
+            if callback is not None:
+                if kind == "cancelled":
+                    callback()
+                else:
+                    callback(value)
+        self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def shutdown(self): #anuluje wszystkie zadania i zatrzymuje pulę (przy zamykaniu aplikacji)
+        for job in list(self.jobs.values()):
+            job.cancel()
+        self.root.after_cancel(self._poll_id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
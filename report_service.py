@@ -0,0 +1,264 @@
+"""
+Usługa HTTP generująca raporty na żądanie (tylko lokalnie).
+
+    python report_service.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--queue 8]
+
+    GET /raport/grupowanie                          -> PDF (raport 1)
+    GET /raport/wykres?od=2024-01-01&do=2024-12-31  -> PDF (raport 2)
+    GET /raport/formularz?id=5                      -> PDF (raport 3)
+    GET /health                                     -> stan usługi (JSON)
+    GET /metrics                                    -> liczniki i czasy odpowiedzi (JSON)
+
+Raporty renderowane są w puli procesów o stałym rozmiarze, każdy do własnego pliku tymczasowego.
+Gdy wszystkie procesy są zajęte, a kolejka pełna, usługa od razu odpowiada 503 (z Retry-After),
+zamiast przyjmować kolejne zlecenia bez ograniczeń.
+
+Procesy robocze nie widzą unieważnień pamięci podręcznej z GUI ani z importu CSV, więc dane
+raportów są w nich zawsze pobierane z bazy. Zapamiętywane są tylko gotowe pliki PDF - ich klucz
+zawiera skrót danych, więc po zmianie danych raport powstaje od nowa.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVICE_HOST = os.getenv("REPORT_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("REPORT_SERVICE_PORT", "8765"))
+SERVICE_WORKERS = int(os.getenv("REPORT_SERVICE_WORKERS", str(os.cpu_count() or 2)))
+SERVICE_QUEUE_SIZE = int(os.getenv("REPORT_SERVICE_QUEUE", "8")) #zlecenia czekające ponad liczbę procesów
+REQUEST_TIMEOUT = float(os.getenv("REPORT_SERVICE_TIMEOUT", "120")) #maksymalny czas generowania jednego raportu
+LATENCY_WINDOW = 1000 #z ilu ostatnich żądań liczone są percentyle czasu odpowiedzi
+
+#endpoint -> (typ raportu z raport.REPORTS, wymagane parametry zapytania w kolejności argumentów)
+ENDPOINTS = {
+    "grupowanie": ("1", []),
+    "wykres": ("2", ["od", "do"]),
+    "formularz": ("3", ["id"]),
+}
+
+
+def _init_worker(): #proces roboczy: bez pamięci podręcznej danych (patrz opis modułu)
+    import report_cache
+
+    report_cache.cache.max_entries = 0
+
+
+def render_report(report_type, params, output_dir):
+    """
+    Wywoływane w procesie roboczym: generuje raport do unikalnego pliku, zwraca jego zawartość
+    (albo None, gdy brak danych) i usuwa plik. Współbieżne żądania nigdy nie piszą do tego samego pliku.
+    """
+    import raport
+
+    output_path = os.path.join(output_dir, f"{report_type}_{uuid.uuid4().hex}.pdf")
+    try:
+        if raport.generate_report(report_type, *params, output_path=output_path) is None:
+            return None
+        with open(output_path, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+
+class ServiceMetrics:
+    """Liczniki żądań i czasy odpowiedzi (dla każdego endpointu), bezpieczne dla wielu wątków."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _endpoint(self, name):
+        return self._endpoints.setdefault(name, {
+            "requests": 0, "ok": 0, "errors": 0, "rejected": 0, "latencies": deque(maxlen=LATENCY_WINDOW),
+        })
+
+    def record(self, name, outcome, seconds=None):
+        with self._lock:
+            endpoint = self._endpoint(name)
+            endpoint["requests"] += 1
+            endpoint[outcome] += 1
+            if seconds is not None:
+                endpoint["latencies"].append(seconds)
+
+    def change_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    @staticmethod
+    def _percentile(values, fraction):
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def snapshot(self):
+        with self._lock:
+            result = {"uptime_seconds": time.time() - self.started, "in_flight": self.in_flight, "endpoints": {}}
+            for name, endpoint in self._endpoints.items():
+                latencies = sorted(endpoint["latencies"])
+                result["endpoints"][name] = {
+                    "requests": endpoint["requests"],
+                    "ok": endpoint["ok"],
+                    "errors": endpoint["errors"],
+                    "rejected": endpoint["rejected"],
+                    "latency_p50": self._percentile(latencies, 0.5),
+                    "latency_p95": self._percentile(latencies, 0.95),
+                    "latency_max": latencies[-1] if latencies else None,
+                }
+            return result
+
+
+class ReportService:
+    """Pula procesów renderujących raporty z ograniczoną liczbą przyjętych zleceń."""
+
+    def __init__(self, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE, timeout=REQUEST_TIMEOUT):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.metrics = ServiceMetrics()
+        self.output_dir = tempfile.mkdtemp(prefix="raporty_")
+
+    def try_render(self, report_type, params):
+        """
+        Zwraca zawartość PDF (albo None przy braku danych). Jeśli usługa jest pełna, zwraca False
+        bez czekania. Przekroczenie czasu zgłaszane jest jako TimeoutError.
+        """
+        if not self.slots.acquire(blocking=False):
+            return False
+        self.metrics.change_in_flight(1)
+        try:
+            future = self.executor.submit(render_report, report_type, params, self.output_dir)
+        except BaseException:
+            self._finished(None)
+            raise
+        #miejsce zwalniane dopiero po faktycznym zakończeniu renderowania (także po przekroczeniu czasu),
+        #inaczej usługa przyjmowałaby więcej zleceń, niż pozwala `capacity`
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel() #zlecenie jeszcze w kolejce nie wystartuje; trwające kończy się w tle
+            raise
+
+    def _finished(self, future):
+        self.metrics.change_in_flight(-1)
+        self.slots.release()
+
+    def health(self):
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.metrics.in_flight,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    service = None #ReportService ustawiany przy starcie serwera
+
+    def _send(self, status, body, content_type="application/json; charset=utf-8", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+            content_type = "text/plain; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        if path == "/health":
+            self._send(200, self.service.health())
+            return
+        if path == "/metrics":
+            self._send(200, self.service.metrics.snapshot())
+            return
+        if not path.startswith("/raport/") or path[len("/raport/"):] not in ENDPOINTS:
+            self._send(404, f"Nieznany adres. Dostępne raporty: {', '.join(ENDPOINTS)}")
+            return
+
+        name = path[len("/raport/"):]
+        report_type, required = ENDPOINTS[name]
+        query = parse_qs(url.query)
+        missing = [param for param in required if not query.get(param)]
+        if missing:
+            self._send(400, f"Brak wymaganych parametrów: {', '.join(missing)}")
+            return
+        params = tuple(query[param][0] for param in required)
+
+        started = time.perf_counter()
+        try:
+            content = self.service.try_render(report_type, params)
+        except TimeoutError:
+            self.service.metrics.record(name, "errors", time.perf_counter() - started)
+            self._send(504, "Przekroczono czas generowania raportu.")
+            return
+        except Exception as e: #błąd w procesie roboczym (np. bazy danych) nie może zatrzymać usługi
+            self.service.metrics.record(name, "errors", time.perf_counter() - started)
+            self._send(500, f"Nie udało się wygenerować raportu: {e}")
+            return
+
+        if content is False:
+            self.service.metrics.record(name, "rejected")
+            self._send(503, "Usługa jest przeciążona, spróbuj ponownie później.", headers={"Retry-After": "1"})
+            return
+        self.service.metrics.record(name, "ok", time.perf_counter() - started)
+        if content is None:
+            self._send(404, "Brak danych do raportu.")
+            return
+        self._send(200, content, content_type="application/pdf",
+                   headers={"Content-Disposition": f'inline; filename="{name}.pdf"'})
+
+    def log_message(self, format, *args): #bez wypisywania każdego żądania na stderr
+        pass
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE):
+    service = ReportService(workers, queue_size)
+    handler = type("Handler", (ReportRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Usługa raportów działa na http://{host}:{port}/ ({workers} procesów, {service.capacity} miejsc).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Usługa HTTP generująca raporty PDF.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    parser.add_argument("--queue", type=int, default=SERVICE_QUEUE_SIZE)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.queue)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import time
+
+DDL_CHECK_INTERVAL = 60 #co ile sekund (najczęściej) sprawdzać, czy schemat bazy się zmienił
+
+
+class SchemaCatalog:
+    """
+    Metadane schematu bazy (tabele, kolumny, klucze główne i obce) trzymane w pamięci.
+    Ładowane jednym przebiegiem po information_schema przy starcie, a potem odświeżane
+    na żądanie (refresh) albo po wykryciu zmiany DDL (refresh_if_changed).
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.tables = {}
+        self._fingerprint = None
+        self._last_check = 0.0
+        self.refresh()
+
+    def _read_fingerprint(self, cursor):
+        #liczba tabel, kolumn i ograniczeń oraz czas ostatniego CREATE/ALTER zmieniają się przy każdym DDL
+        cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()),
+            (SELECT MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()),
+            (SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()),
+            (SELECT COUNT(*) FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = DATABASE());
+        """)
+        return cursor.fetchone()
+
+    def refresh(self): #ponowne wczytanie całego schematu
+        tables = {}
+        with self.pool.cursor() as cursor:
+            fingerprint = self._read_fingerprint(cursor)
+
+            cursor.execute("""
+            SELECT TABLE_NAME
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+            ORDER BY TABLE_NAME;
+            """)
+            for (table_name,) in cursor.fetchall():
+                tables[table_name] = {"columns": [], "primary_key": [], "foreign_keys": []}
+
+            cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            ORDER BY TABLE_NAME, ORDINAL_POSITION;
+            """)
+            for table_name, column_name, data_type, column_type, is_nullable, default, extra in cursor.fetchall():
+                if table_name not in tables:
+                    continue
+                tables[table_name]["columns"].append({
+                    "name": column_name,
+                    "data_type": data_type,
+                    "column_type": column_type,
+                    "nullable": is_nullable == "YES",
+                    "default": default,
+                    "extra": extra or "",
+                })
+
+            cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME, CONSTRAINT_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE()
+            ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION;
+            """)
+            for table_name, column_name, constraint_name, ref_table, ref_column in cursor.fetchall():
+                if table_name not in tables:
+                    continue
+                if constraint_name == "PRIMARY":
+                    tables[table_name]["primary_key"].append(column_name)
+                elif ref_table is not None:
+                    tables[table_name]["foreign_keys"].append((column_name, ref_table, ref_column))
+
+        #podmiana całego słownika naraz - odczyty nigdy nie widzą schematu w połowie wczytanego
+        self.tables = tables
+        self._fingerprint = fingerprint
+        self._last_check = time.monotonic()
+
+    def refresh_if_changed(self, force_check=False):
+        """
+        Odświeża katalog, jeśli od ostatniego wczytania zmienił się schemat bazy.
+        Sprawdzenie (jedno lekkie zapytanie) wykonywane jest najwyżej co DDL_CHECK_INTERVAL sekund.
+        Zwraca True, jeśli katalog został odświeżony.
+        """
+        if not force_check and time.monotonic() - self._last_check < DDL_CHECK_INTERVAL:
+            return False
+        with self.pool.cursor() as cursor:
+            fingerprint = self._read_fingerprint(cursor)
+        self._last_check = time.monotonic()
+        if fingerprint == self._fingerprint:
+            return False
+        self.refresh()
+        return True
+
+    def table_names(self):
+        return list(self.tables)
+
+    def has_table(self, table_name):
+        return table_name in self.tables
+
+    def columns(self, table_name): #lista słowników opisujących kolumny tabeli (w kolejności z tabeli)
+        return self.tables[table_name]["columns"]
+
+    def column_names(self, table_name):
+        return [column["name"] for column in self.columns(table_name)]
+
+    def has_column(self, table_name, column_name):
+        return table_name in self.tables and column_name in self.column_names(table_name)
+
+    def primary_key(self, table_name): #lista kolumn klucza głównego (pusta, jeśli tabela go nie ma)
+        return self.tables[table_name]["primary_key"]
+
+    def foreign_keys(self, table_name): #lista krotek (kolumna, tabela powiązana, kolumna powiązana)
+        return self.tables[table_name]["foreign_keys"]
+
+    def foreign_key(self, table_name, column_name): #(tabela powiązana, kolumna powiązana) albo None
+        for fk_column, ref_table, ref_column in self.foreign_keys(table_name):
+            if fk_column == column_name:
+                return ref_table, ref_column
+        return None
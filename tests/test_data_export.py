@@ -0,0 +1,90 @@
+import os
+import tempfile
+import threading
+import unittest
+from mysql.connector import errors
+from mysql.connector.constants import FieldType
+from db_pool import ConnectionPool
+import data_export
+
+
+class FakeCursor:
+    """Niebuforowany kursor: dopóki wynik nie jest doczytany, close() zgłasza błąd jak mysql.connector."""
+
+    def __init__(self, connection, rows):
+        self.connection = connection
+        self.rows = rows
+        self.description = [("id", FieldType.LONG), ("nazwa", FieldType.VAR_STRING)]
+
+    def execute(self, query, params=None):
+        self.connection.unread_result = True
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        if not batch:
+            self.connection.unread_result = False
+        return batch
+
+    def close(self):
+        if self.connection.unread_result:
+            raise errors.InternalError("Unread result found")
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.unread_result = False
+        self.in_transaction = False
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self, list(self.rows))
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, rows):
+        super().__init__("localhost", 3306, "test", "", "test", size=1)
+        self.rows = rows
+        self.connections = []
+
+    def _connect(self):
+        connection = FakeConnection(self.rows)
+        self.connections.append(connection)
+        return connection
+
+
+class ExportQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "eksport.csv")
+        self.pool = FakePool([(i, f"wiersz {i}") for i in range(10)])
+
+    def test_full_export_returns_connection_to_pool(self):
+        result = data_export.export_query("SELECT 1", None, self.path, batch_size=3, pool=self.pool)
+        self.assertEqual(result.rows, 10)
+        self.assertFalse(result.cancelled)
+        self.assertFalse(self.pool.connections[0].closed)
+        self.assertEqual(self.pool._idle.qsize(), 1)
+
+    def test_cancel_part_way_discards_connection(self):
+        cancel_event = threading.Event()
+
+        def progress(result):
+            if result.rows >= 3:
+                cancel_event.set()
+
+        result = data_export.export_query("SELECT 1", None, self.path, batch_size=3, pool=self.pool,
+                                          progress=progress, cancel_event=cancel_event)
+        self.assertTrue(result.cancelled)
+        self.assertEqual(result.rows, 3)
+        #połączenie z nieodczytanym wynikiem nie wraca do puli
+        self.assertTrue(self.pool.connections[0].closed)
+        self.assertEqual(self.pool._idle.qsize(), 0)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 4) #nagłówek i jedna partia
+
+
+if __name__ == "__main__":
+    unittest.main()